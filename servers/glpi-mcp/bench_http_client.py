@@ -0,0 +1,71 @@
+"""
+Latency comparison of GLPI calls with one connection per call (plain requests.get/put, as the
+tools did before the shared client) and with the pooled keep-alive GlpiHttpSession of glpi_http.py.
+
+    python bench_http_client.py --calls 1000 --threads 8
+
+Both runs read and update tickets on a local stand-in GLPI server (see mock_glpi.py).
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from glpi_http import GlpiHttpSession
+from mock_glpi import start_mock
+
+
+def percentile(latencies: list[float], p: float) -> float:
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+
+def run(client, glpi_url: str, calls: int, threads: int, tickets: int) -> dict:
+    """Reads and updates tickets through the given HTTP client and returns latency stats."""
+    response = client.get(f"{glpi_url}/apirest.php/initSession", headers={"Authorization": "Basic Z2xwaTpnbHBp"})
+    headers = {"Content-Type": "application/json", "Session-Token": response.json()["session_token"]}
+
+    def call(i: int) -> float:
+        start = time.perf_counter()
+        ticket_url = f"{glpi_url}/apirest.php/Ticket/{i % tickets + 1}"
+        if i % 4:
+            response = client.get(ticket_url, headers=headers)
+        else:
+            response = client.put(ticket_url, headers=headers, json={"input": {"content": f"Updated by call {i}"}})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = sorted(executor.map(call, range(calls)))
+    elapsed = time.perf_counter() - start
+    client.get(f"{glpi_url}/apirest.php/killSession", headers=headers)
+    return {
+        "calls/s": calls / elapsed,
+        "mean": statistics.mean(latencies),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call connections with the pooled GLPI HTTP client.")
+    parser.add_argument("--calls", type=int, default=1000, help="Tool calls per run (default: 1000).")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent callers (default: 8).")
+    parser.add_argument("--tickets", type=int, default=100, help="Tickets in the mock GLPI (default: 100).")
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay added by the mock GLPI to each call (default: 0).")
+    args = parser.parse_args()
+
+    mock, glpi_url = start_mock(tickets=args.tickets, latency=args.latency)
+    print(f"{args.calls} calls, {args.threads} threads, mock GLPI at {glpi_url}")
+    print(f"{'client':<18}{'calls/s':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, client in (("per-call requests", requests), ("pooled keep-alive", GlpiHttpSession(pool_size=args.threads))):
+        stats = run(client, glpi_url, args.calls, args.threads, args.tickets)
+        print(f"{name:<18}{stats['calls/s']:>10.0f}" + "".join(f"{stats[key] * 1000:>10.2f}" for key in ("mean", "p50", "p95", "p99")))
+    mock.shutdown()
+
+
+if __name__ == "__main__":
+    main()
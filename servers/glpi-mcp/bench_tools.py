@@ -0,0 +1,171 @@
+"""
+End-to-end benchmark of the GLPI MCP tools against a mock GLPI server (see mock_glpi.py).
+
+    python bench_tools.py --transport both --sessions 16 --calls 20 --latency 0.02
+
+Concurrent MCP sessions log in and call a mix of tools, in-process (fastmcp.Client on server.mcp)
+and over HTTP (server.py run as a streamable HTTP server in a subprocess). The report gives, per
+tool, the throughput, p50/p95/p99 latency and the mean size of the requests and responses.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from fastmcp import FastMCP
+
+import server
+from bench_http_client import percentile
+from load_test import connect
+from mock_glpi import start_mock
+
+# Tool calls of the benchmark: name -> function of (random generator, tickets) returning the arguments
+SCENARIOS = {
+    "glpi_get_ticket": lambda rng, tickets: {"ticket_id": rng.randint(1, tickets)},
+    "glpi_get_tickets": lambda rng, tickets: {
+        "ids": rng.sample(range(1, tickets + 1), min(20, tickets)), "fields": ["id", "name", "status", "date_mod"],
+    },
+    "glpi_list_tickets": lambda rng, tickets: {"offset": rng.randint(0, max(0, tickets - 50)), "limit": 50},
+    "glpi_search_tickets": lambda rng, tickets: {
+        "criteria": [{"field": "status", "searchtype": "equals", "value": str(rng.randint(1, 6))}],
+        "fields": ["id", "name", "status", "date_mod"],
+        "limit": 50,
+    },
+    "glpi_update_tickets": lambda rng, tickets: {
+        "updates": [{"ticket_id": ticket_id, "title": f"Benchmark update {rng.random():.6f}"}
+                    for ticket_id in rng.sample(range(1, tickets + 1), min(5, tickets))],
+    },
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_http_server(port: int, env: dict) -> subprocess.Popen:
+    """Runs server.py as a streamable HTTP MCP server, and waits until it accepts connections."""
+    code = f"import server; server.mcp.run(transport='http', host='127.0.0.1', port={port}, show_banner=False)"
+    process = subprocess.Popen(
+        [sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)), env={**os.environ, **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError("The HTTP MCP server exited on startup.")
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("The HTTP MCP server did not start within 30 seconds.")
+
+
+def content_size(result) -> int:
+    """Returns the size in bytes of the content of a tool result, as sent to the client."""
+    return sum(len(getattr(block, "text", "").encode()) for block in result.content)
+
+
+async def run(target: FastMCP | str, glpi_url: str, tools: list[str], sessions: int, calls: int, tickets: int, seed: int) -> dict:
+    """Opens concurrent MCP sessions calling the tools in turn, and returns the measures of each tool."""
+    measures = defaultdict(lambda: {"latencies": [], "request_bytes": 0, "response_bytes": 0, "errors": 0})
+
+    async def session(worker: int):
+        rng = random.Random(seed + worker)
+        async with connect(target) as client:
+            await client.call_tool("glpi_login", {"glpi_url": glpi_url, "username": "glpi", "password": "glpi"})
+            for i in range(calls):
+                tool = tools[(worker + i) % len(tools)]
+                arguments = SCENARIOS[tool](rng, tickets)
+                start = time.perf_counter()
+                result = await client.call_tool(tool, arguments, raise_on_error=False)
+                measure = measures[tool]
+                measure["latencies"].append(time.perf_counter() - start)
+                measure["request_bytes"] += len(json.dumps(arguments).encode())
+                measure["response_bytes"] += content_size(result)
+                measure["errors"] += result.is_error
+            await client.call_tool("glpi_logout", {})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(worker) for worker in range(sessions)))
+    elapsed = time.perf_counter() - start
+    stats = {}
+    for tool, measure in sorted(measures.items()):
+        latencies = sorted(measure["latencies"])
+        stats[tool] = {
+            "calls": len(latencies),
+            "errors": measure["errors"],
+            "calls/s": len(latencies) / elapsed,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "request_bytes": measure["request_bytes"] / len(latencies),
+            "response_bytes": measure["response_bytes"] / len(latencies),
+        }
+    stats["all"] = {
+        "calls": sum(tool_stats["calls"] for tool_stats in stats.values()),
+        "errors": sum(tool_stats["errors"] for tool_stats in stats.values()),
+        "calls/s": sum(len(measure["latencies"]) for measure in measures.values()) / elapsed,
+    }
+    return stats
+
+
+def report(name: str, stats: dict):
+    print(f"\n{name}: {stats['all']['calls']} calls, {stats['all']['errors']} errors, {stats['all']['calls/s']:.0f} calls/s")
+    print(f"{'tool':<22}{'calls':>7}{'errors':>7}{'calls/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req B':>8}{'resp B':>9}")
+    for tool, tool_stats in stats.items():
+        if tool == "all":
+            continue
+        print(
+            f"{tool:<22}{tool_stats['calls']:>7}{tool_stats['errors']:>7}{tool_stats['calls/s']:>9.1f}"
+            + "".join(f"{tool_stats[key] * 1000:>9.1f}" for key in ("p50", "p95", "p99"))
+            + f"{tool_stats['request_bytes']:>8.0f}{tool_stats['response_bytes']:>9.0f}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the GLPI MCP tools in-process and over HTTP against a mock GLPI.")
+    parser.add_argument("--transport", choices=["inprocess", "http", "both"], default="both", help="Transports to run (default: both).")
+    parser.add_argument("--sessions", type=int, default=16, help="Concurrent MCP sessions (default: 16).")
+    parser.add_argument("--calls", type=int, default=20, help="Tool calls per session (default: 20).")
+    parser.add_argument("--tools", default=",".join(SCENARIOS), help=f"Comma-separated tools to call in turn (default: {','.join(SCENARIOS)}).")
+    parser.add_argument("--tickets", type=int, default=1000, help="Tickets in the mock GLPI (default: 1000).")
+    parser.add_argument("--latency", type=float, default=0.02, help="Delay added by the mock GLPI to each call (default: 0.02).")
+    parser.add_argument("--cache", action="store_true", help="Keep the glpi_get_ticket cache (default: every call reaches GLPI).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the mock data and of the tool arguments (default: 0).")
+    args = parser.parse_args()
+    tools = args.tools.split(",")
+    unknown = [tool for tool in tools if tool not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown tools {', '.join(unknown)}, choose among {', '.join(SCENARIOS)}")
+
+    mock, glpi_url = start_mock(tickets=args.tickets, latency=args.latency, seed=args.seed)
+    print(f"{args.sessions} sessions x {args.calls} calls, {args.tickets} tickets, mock GLPI latency {args.latency * 1000:.0f} ms")
+    if args.transport in ("inprocess", "both"):
+        if not args.cache:
+            server.TICKET_CACHE.max_size = 0
+        stats = await run(server.mcp, glpi_url, tools, args.sessions, args.calls, args.tickets, args.seed)
+        report("in-process", stats)
+    if args.transport in ("http", "both"):
+        port = free_port()
+        process = start_http_server(port, {} if args.cache else {"GLPI_TICKET_CACHE_SIZE": "0"})
+        try:
+            stats = await run(f"http://127.0.0.1:{port}/mcp", glpi_url, tools, args.sessions, args.calls, args.tickets, args.seed)
+            report("HTTP", stats)
+        finally:
+            process.terminate()
+            process.wait()
+    mock.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
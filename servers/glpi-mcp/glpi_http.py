@@ -0,0 +1,213 @@
+"""
+Shared HTTP clients used by the GLPI tools.
+
+The tools are async and send their requests through one AsyncGlpiClient: a non-blocking,
+pooled httpx client, so a slow GLPI call never blocks the event loop serving the other MCP
+sessions, and connections to a GLPI instance are kept alive and reused between calls.
+GlpiHttpSession is the blocking equivalent, built on requests, for scripts.
+
+Every request has connect and read timeouts, so a slow GLPI node cannot hang a worker forever.
+The clients are tuned with environment variables:
+
+* GLPI_POOL_HOSTS: number of GLPI hosts with their own connection pool (default 10).
+* GLPI_POOL_SIZE: connections kept alive per host (default 10). Blocking requests beyond it wait for a free connection.
+* GLPI_MAX_CONCURRENCY: calls in flight per GLPI host with the async client (default 20). Calls beyond it wait.
+* GLPI_CONNECT_TIMEOUT / GLPI_READ_TIMEOUT: timeouts in seconds (default 5 and 30).
+
+The async client retries failed calls with jittered exponential backoff: idempotent calls (GET,
+PUT, DELETE) on 5xx responses and transport errors, and any call that could not connect, since
+GLPI never received it. A circuit breaker per host fails calls fast while GLPI is down:
+
+* GLPI_RETRIES: retries of a failed call (default 3, 0 disables them).
+* GLPI_RETRY_BACKOFF / GLPI_RETRY_MAX_BACKOFF: first and longest delay between tries, in seconds (default 0.2 and 5).
+* GLPI_BREAKER_FAILURES: consecutive failed tries opening the circuit of a host (default 5, 0 disables it).
+* GLPI_BREAKER_RESET: seconds before an open circuit lets a trial call through (default 30).
+"""
+import asyncio
+import os
+import random
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_HOSTS = int(os.getenv("GLPI_POOL_HOSTS", "10"))
+POOL_SIZE = int(os.getenv("GLPI_POOL_SIZE", "10"))
+MAX_CONCURRENCY = int(os.getenv("GLPI_MAX_CONCURRENCY", "20"))
+CONNECT_TIMEOUT = float(os.getenv("GLPI_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("GLPI_READ_TIMEOUT", "30"))
+RETRIES = int(os.getenv("GLPI_RETRIES", "3"))
+RETRY_BACKOFF = float(os.getenv("GLPI_RETRY_BACKOFF", "0.2"))
+RETRY_MAX_BACKOFF = float(os.getenv("GLPI_RETRY_MAX_BACKOFF", "5"))
+BREAKER_FAILURES = int(os.getenv("GLPI_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("GLPI_BREAKER_RESET", "30"))
+
+# Errors raised by the async client: transport failures, timeouts and raise_for_status()
+HttpError = httpx.HTTPError
+
+# Calls that can be sent twice without changing the outcome
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# Transport errors raised before the request reached GLPI, so any call can be sent again
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised without calling GLPI while the circuit breaker of its host is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after a number of consecutive failed calls to a host, and fails calls fast while open.
+
+    After reset_timeout, one trial call is let through (half-open): its success closes the
+    circuit, its failure opens it again for another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, reset_timeout: float = BREAKER_RESET, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_call(self, host: str):
+        """Raises CircuitOpenError unless the call may go to GLPI."""
+        state = self.state
+        if state == "open" or (state == "half-open" and self._trial):
+            retry_in = max(0.0, self.opened_at + self.reset_timeout - self.clock())
+            raise CircuitOpenError(f"GLPI at {host} is unavailable (circuit open after {self.failures} failures), retry in {retry_in:.0f}s")
+        self._trial = state == "half-open"
+
+    def abort(self):
+        """Ends a call with no outcome, like a cancelled one, freeing the trial of a half-open circuit."""
+        self._trial = False
+
+    def record(self, success: bool):
+        self._trial = False
+        if success:
+            self.failures = 0
+            self.opened_at = None
+        else:
+            self.failures += 1
+            if self.failure_threshold and (self.opened_at is not None or self.failures >= self.failure_threshold):
+                self.opened_at = self.clock()
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BACKOFF, cap: float = RETRY_MAX_BACKOFF) -> float:
+    """Full-jitter exponential backoff: a random delay up to base * 2**attempt, capped."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class GlpiHttpSession(requests.Session):
+    """requests.Session with per-host connection pools and default (connect, read) timeouts."""
+
+    def __init__(self, pool_hosts: int = POOL_HOSTS, pool_size: int = POOL_SIZE,
+                 timeout: tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT)):
+        super().__init__()
+        self.timeout = timeout
+        # The session is shared by every user: never store cookies set by GLPI
+        self.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        # pool_block caps the connections opened to a host at pool_size, instead of opening throwaway ones
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size, pool_block=True)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+class AsyncGlpiClient:
+    """
+    Non-blocking GLPI HTTP client with keep-alive connection pooling.
+
+    Concurrency is bounded per GLPI host by a semaphore, so a burst of tool calls queues in the
+    server instead of overloading the GLPI instance. Failed calls are retried with backoff, and
+    a circuit breaker per host fails them fast during an outage. The httpx client is created on
+    first use, in the event loop of the server.
+    """
+
+    def __init__(self, pool_hosts: int = POOL_HOSTS, pool_size: int = POOL_SIZE, max_concurrency: int = MAX_CONCURRENCY,
+                 timeout: tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT), retries: int = RETRIES):
+        self.limits = httpx.Limits(
+            max_connections=pool_hosts * max_concurrency, max_keepalive_connections=pool_hosts * pool_size
+        )
+        self.timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self._client = None
+        self._semaphores = {}
+        self.breakers = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            # The client is shared by every user: never store cookies set by GLPI
+            self._client.cookies.jar.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return self._client
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[host]
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker()
+        return self.breakers[host]
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Sends a request, retrying it on 5xx responses and transport errors when it is safe to."""
+        breaker = self.breaker(url)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            breaker.before_call(urlsplit(url).netloc)
+            try:
+                async with self._semaphore(url):
+                    response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                breaker.record(success=False)
+                if attempt >= self.retries or not (idempotent or isinstance(e, NOT_SENT_ERRORS)):
+                    raise
+            except BaseException:
+                breaker.abort()
+                raise
+            else:
+                breaker.record(success=response.status_code < 500)
+                if response.status_code < 500 or attempt >= self.retries or not idempotent:
+                    return response
+            # Wait outside the semaphore, so the slot serves other calls meanwhile
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Shared by all tools, so connections are reused across tool calls and MCP sessions
+HTTP = AsyncGlpiClient()
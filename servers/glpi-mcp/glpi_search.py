@@ -0,0 +1,82 @@
+"""
+Helpers for GLPI's search engine (apirest.php/search/:itemtype), which identifies fields by searchoption IDs.
+
+The searchoptions of an itemtype (apirest.php/listSearchOptions/:itemtype) map those IDs to
+fields. They only change when GLPI or its plugins are upgraded, so they are fetched once per
+GLPI instance and itemtype, and let tools accept readable field names.
+"""
+import asyncio
+
+
+class SearchOptions:
+    """Maps the field names of an itemtype to searchoption IDs, and back."""
+
+    def __init__(self, itemtype: str, options: dict):
+        self.itemtype = itemtype
+        # Option ID -> field name, e.g. '12' -> 'status' or '8' -> 'Group.completename'
+        self.names = {}
+        # Lowercase alias (name, uid, label or column) -> option ID
+        self.ids = {}
+        main_table = f"glpi_{itemtype.lower()}s"
+        for option_id, option in options.items():
+            # Section headers, like "common": "Characteristics", are not options
+            if not str(option_id).isdigit() or not isinstance(option, dict):
+                continue
+            option_id = str(option_id)
+            uid = option.get("uid") or f"{itemtype}.{option.get('field', option_id)}"
+            name = uid.removeprefix(f"{itemtype}.")
+            self.names[option_id] = name
+            self.ids[option_id] = option_id
+            aliases = [name, uid, option.get("name")]
+            if option.get("table") == main_table:
+                aliases.append(option.get("field"))
+            for alias in aliases:
+                if alias:
+                    # The first option wins, like the main column over a linked one
+                    self.ids.setdefault(alias.lower(), option_id)
+
+    def resolve(self, field: str | int) -> str:
+        """Returns the searchoption ID of a field given by name, uid, label or ID."""
+        option_id = self.ids.get(str(field).strip().lower())
+        if option_id is None:
+            raise ValueError(f"Unknown {self.itemtype} field '{field}'. Known fields: {', '.join(sorted(self.names.values()))}.")
+        return option_id
+
+    def fields(self) -> list[str]:
+        return sorted(self.names.values())
+
+
+class SearchOptionsCache:
+    """SearchOptions per (GLPI URL, itemtype), fetched once even when requested concurrently."""
+
+    def __init__(self):
+        self._options = {}
+        self._locks = {}
+
+    async def get(self, glpi_url: str, itemtype: str, fetch) -> SearchOptions:
+        """Returns the searchoptions of an itemtype, calling the fetch coroutine function on a miss."""
+        key = (glpi_url, itemtype)
+        if key not in self._options:
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            async with lock:
+                if key not in self._options:
+                    self._options[key] = SearchOptions(itemtype, await fetch())
+        return self._options[key]
+
+    def invalidate(self, glpi_url: str):
+        for key in [key for key in self._options if key[0] == glpi_url]:
+            del self._options[key]
+
+
+def search_params(criteria: list[dict], forcedisplay: list[str], sort: str | None, order: str, start: int, end: int) -> list[tuple]:
+    """Encodes a search as GLPI query string parameters (criteria[0][field]=12...)."""
+    params = []
+    for i, criterion in enumerate(criteria):
+        for key, value in criterion.items():
+            if value is not None and not (i == 0 and key == "link"):
+                params.append((f"criteria[{i}][{key}]", value))
+    params += [(f"forcedisplay[{i}]", option_id) for i, option_id in enumerate(forcedisplay)]
+    if sort:
+        params.append(("sort", sort))
+    params += [("order", order), ("range", f"{start}-{end}")]
+    return params
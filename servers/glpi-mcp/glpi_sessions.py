@@ -0,0 +1,130 @@
+"""
+GLPI sessions of the MCP sessions served by the server.
+
+Each MCP session logs in on its own, possibly to a different GLPI instance. A login opens one
+writable GLPI session (session_write=true), through which every write goes, and a few read-only
+sessions. GLPI closes the PHP session of read-only sessions right after loading it, so calls on
+them run in parallel, while calls on a writable session lock it until they end.
+
+The credentials of a login (Basic authorization or user_token) are kept in memory, so expired
+sessions are renewed without asking the user to log in again. MCP sessions may end without
+logging out, so logins left idle for too long are reaped.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from itertools import cycle
+
+
+class GlpiLogin:
+    """GLPI sessions of one MCP session: a writable session and a pool of read-only sessions."""
+
+    def __init__(self, glpi_url: str, app_token: str, authorization: str, write_token: str, read_tokens: list[str]):
+        self.glpi_url = glpi_url
+        self.app_token = app_token
+        # Authorization header of initSession: 'Basic ...' or 'user_token ...'
+        self.authorization = authorization
+        self.renewals = 0
+        # Set by the SessionStore on each use, to reap idle logins
+        self.last_used = 0.0
+        self._renew_lock = asyncio.Lock()
+        # Every writable session of the login, to tell which session a call failing after a renewal used
+        self._write_tokens = set()
+        self._set_tokens(write_token, read_tokens)
+
+    def _set_tokens(self, write_token: str, read_tokens: list[str]):
+        self._write_tokens.add(write_token)
+        self.write_token = write_token
+        self.read_tokens = read_tokens or [write_token]
+        self._next_read_token = cycle(self.read_tokens)
+
+    def read_token(self) -> str:
+        """Returns the next read-only session, round-robin."""
+        return next(self._next_read_token)
+
+    def tokens(self) -> list[str]:
+        """Returns every session token of the login, to kill them on logout."""
+        return [self.write_token] + [token for token in self.read_tokens if token != self.write_token]
+
+    async def renew(self, expired_token: str, open_sessions) -> str:
+        """
+        Replaces the sessions of the login after GLPI rejected expired_token, and returns the token to use instead.
+
+        open_sessions is a coroutine function returning new (write_token, read_tokens) for the
+        login. Calls failing together renew the sessions once: the others wait and get the new tokens.
+        """
+        write = expired_token in self._write_tokens
+        async with self._renew_lock:
+            if expired_token in self.tokens():
+                self._set_tokens(*await open_sessions(self))
+                self.renewals += 1
+        return self.write_token if write else self.read_token()
+
+
+class SessionStore:
+    """
+    GLPI logins, keyed by login ID, and reaped after idle_ttl seconds without use (0 keeps them).
+
+    A login is also reachable from the MCP session that opened it, for clients keeping a stateful
+    MCP session. Stateless clients get a new MCP session ID on every request, and use the login ID.
+    """
+
+    def __init__(self, idle_ttl: float = 3600.0, clock=time.monotonic):
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        # Least recently used first, so that reaping stops at the first login still in use
+        self._logins = OrderedDict()
+        # MCP session ID -> login ID, and back
+        self._login_ids = {}
+        self._session_ids = {}
+        self.reaped = 0
+
+    def get(self, identity: str) -> GlpiLogin:
+        """Returns the login of a login ID or of an MCP session ID."""
+        login_id = self._login_ids.get(identity, identity)
+        login = self._logins.get(login_id)
+        if login is None:
+            raise Exception("Not logged in to GLPI. Please login first.")
+        login.last_used = self.clock()
+        self._logins.move_to_end(login_id)
+        return login
+
+    def set(self, login_id: str, login: GlpiLogin, session_id: str | None = None) -> GlpiLogin | None:
+        """Stores a login, as the login of the MCP session if given, and returns the login of that session it replaces."""
+        previous = None
+        if session_id is not None:
+            previous_id = self._login_ids.get(session_id)
+            if previous_id is not None:
+                previous = self._remove(previous_id)
+            self._login_ids[session_id] = login_id
+            self._session_ids[login_id] = session_id
+        login.last_used = self.clock()
+        self._logins[login_id] = login
+        return previous
+
+    def _remove(self, login_id: str) -> GlpiLogin | None:
+        session_id = self._session_ids.pop(login_id, None)
+        if session_id is not None:
+            self._login_ids.pop(session_id, None)
+        return self._logins.pop(login_id, None)
+
+    def pop(self, identity: str) -> GlpiLogin | None:
+        """Removes the login of a login ID or of an MCP session ID, and returns it."""
+        return self._remove(self._login_ids.get(identity, identity))
+
+    def reap(self) -> list[GlpiLogin]:
+        """Removes the logins idle for idle_ttl seconds, and returns them so that their GLPI sessions are killed."""
+        reaped = []
+        if self.idle_ttl <= 0:
+            return reaped
+        idle_since = self.clock() - self.idle_ttl
+        while self._logins:
+            login_id, login = next(iter(self._logins.items()))
+            if login.last_used > idle_since:
+                break
+            reaped.append(self._remove(login_id))
+        self.reaped += len(reaped)
+        return reaped
+
+    def __len__(self) -> int:
+        return len(self._logins)
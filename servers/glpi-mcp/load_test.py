@@ -0,0 +1,95 @@
+"""
+Load test of the GLPI tools: many concurrent MCP sessions reading tickets from a mock GLPI server.
+
+    python load_test.py --sessions 64 --calls 50 --latency 0.05
+
+It runs the same load twice, in-process: against a blocking glpi_get_ticket (a sync tool on
+requests, as the tools were before, run on the event loop like FastMCP 2 runs sync tools) and
+against the async tools of server.py, then compares throughput and latency percentiles.
+"""
+import argparse
+import asyncio
+import time
+
+from fastmcp import Client, FastMCP
+
+import server
+from glpi_http import GlpiHttpSession
+from mock_glpi import start_mock
+
+
+def blocking_server(pool_size: int) -> FastMCP:
+    """Builds a server with a blocking glpi_get_ticket, using the GLPI sessions of server.py."""
+    mcp = FastMCP("GLPI MCP Server (blocking)")
+    http = GlpiHttpSession(pool_size=pool_size)
+
+    def glpi_get_ticket(ticket_id: int) -> dict:
+        response = http.get(f"{server.get_glpi_url()}/apirest.php/Ticket/{ticket_id}", headers=server.get_headers())
+        response.raise_for_status()
+        return response.json()
+
+    try:
+        mcp.tool(glpi_get_ticket, run_in_thread=False)
+    except TypeError:
+        # FastMCP 2 has no run_in_thread option: it always runs sync tools on the event loop
+        mcp.tool(glpi_get_ticket)
+    mcp.tool(server.glpi_login)
+    mcp.tool(server.glpi_logout)
+    return mcp
+
+
+def connect(mcp: FastMCP | str) -> Client:
+    """Returns a client of a server or URL, keeping one MCP session, whose GLPI login the tools use."""
+    try:
+        return Client(mcp, mode="legacy")
+    except TypeError:
+        # Before FastMCP 4, clients always open a session with the initialize handshake
+        return Client(mcp)
+
+
+async def run(mcp: FastMCP, glpi_url: str, sessions: int, calls: int, tickets: int) -> dict:
+    """Opens concurrent MCP sessions, each logging in and reading tickets one after another, and returns latency stats."""
+    latencies = []
+
+    async def session(worker: int):
+        async with connect(mcp) as client:
+            await client.call_tool("glpi_login", {"glpi_url": glpi_url, "username": "glpi", "password": "glpi"})
+            for i in range(calls):
+                start = time.perf_counter()
+                await client.call_tool("glpi_get_ticket", {"ticket_id": (worker * calls + i) % tickets + 1})
+                latencies.append(time.perf_counter() - start)
+            await client.call_tool("glpi_logout", {})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(worker) for worker in range(sessions)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "calls/s": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95)],
+        "p99": latencies[int(len(latencies) * 0.99)],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the blocking and async GLPI tools against a mock GLPI.")
+    parser.add_argument("--sessions", type=int, default=32, help="Concurrent MCP sessions (default: 32).")
+    parser.add_argument("--calls", type=int, default=10, help="Tool calls per session (default: 10).")
+    parser.add_argument("--tickets", type=int, default=100, help="Tickets in the mock GLPI (default: 100).")
+    parser.add_argument("--latency", type=float, default=0.05, help="Delay added by the mock GLPI to each call (default: 0.05).")
+    args = parser.parse_args()
+
+    mock, glpi_url = start_mock(tickets=args.tickets, latency=args.latency)
+    # Every call must reach GLPI, or the async run would mostly measure the ticket cache
+    server.TICKET_CACHE.max_size = 0
+    print(f"{args.sessions} sessions x {args.calls} calls, mock GLPI latency {args.latency * 1000:.0f} ms")
+    print(f"{'tools':<10}{'calls/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, mcp in (("blocking", blocking_server(server.HTTP.max_concurrency)), ("async", server.mcp)):
+        stats = await run(mcp, glpi_url, args.sessions, args.calls, args.tickets)
+        print(f"{name:<10}{stats['calls/s']:>10.0f}" + "".join(f"{stats[key] * 1000:>10.1f}" for key in ("p50", "p95", "p99")))
+    mock.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,415 @@
+"""
+Local stand-in for the GLPI REST API, to try and measure the GLPI MCP server without a GLPI install.
+
+    python mock_glpi.py --port 8080 --tickets 1000 --latency 0.02
+
+Then log in with glpi_url 'http://localhost:8080' and any username and password.
+It implements initSession, killSession, Ticket get/list/add/update and ITILFollowup add (one
+item or an array of them), getMultipleItems, and listSearchOptions and search for tickets, with
+the ranges, partial failures, status codes, headers and error messages of GLPI. Data is kept in memory.
+Like GLPI, calls on a writable session (initSession?session_write=true) run one at a time. Idle
+sessions can be made to expire, and a share of calls to fail with 503, to try failure handling.
+"""
+import argparse
+import json
+import random
+import secrets
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+TICKET_STATUSES = {1: "New", 2: "Processing (assigned)", 3: "Processing (planned)", 4: "Pending", 5: "Solved", 6: "Closed"}
+# Largest range served at once, sent in the Accept-Range header
+MAX_RANGE = 990
+TICKET_GROUPS = ["Service desk", "Network", "Workstations", "Applications"]
+# Ticket searchoptions: ID -> (label, table, field, uid)
+TICKET_SEARCH_OPTIONS = {
+    "1": ("Title", "glpi_tickets", "name", "Ticket.name"),
+    "2": ("ID", "glpi_tickets", "id", "Ticket.id"),
+    "3": ("Priority", "glpi_tickets", "priority", "Ticket.priority"),
+    "8": ("Technician group", "glpi_groups", "completename", "Ticket.Group.completename"),
+    "10": ("Urgency", "glpi_tickets", "urgency", "Ticket.urgency"),
+    "11": ("Impact", "glpi_tickets", "impact", "Ticket.impact"),
+    "12": ("Status", "glpi_tickets", "status", "Ticket.status"),
+    "14": ("Type", "glpi_tickets", "type", "Ticket.type"),
+    "15": ("Opening date", "glpi_tickets", "date", "Ticket.date"),
+    "19": ("Last update", "glpi_tickets", "date_mod", "Ticket.date_mod"),
+    "21": ("Description", "glpi_tickets", "content", "Ticket.content"),
+    "80": ("Entity", "glpi_entities", "completename", "Ticket.Entity.completename"),
+}
+# Columns always returned by a search, and the default display preferences
+SEARCH_ALWAYS_DISPLAYED = ["2", "1", "80"]
+SEARCH_DEFAULT_DISPLAY = ["12", "19", "15", "3", "8"]
+TICKET_WORDS = ["printer", "network", "email", "laptop", "password", "vpn", "screen", "license", "backup", "phone"]
+
+
+class GlpiError(Exception):
+    """A GLPI API error, returned as [error_code, message] with an HTTP status."""
+
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+class MockGlpi:
+    """In-memory GLPI instance: sessions, tickets and follow-ups."""
+
+    def __init__(self, tickets: int = 100, latency: float = 0.0, seed: int = 0,
+                 session_timeout: float | None = None, error_rate: float = 0.0):
+        self.latency = latency
+        # Sessions idle for longer expire, like with GLPI's session.gc_maxlifetime
+        self.session_timeout = session_timeout
+        # Share of calls failing with 503 Service Unavailable, to try retries and the circuit breaker
+        self.error_rate = error_rate
+        self.errors = random.Random(seed)
+        # Session token -> lock held by each call on a writable session (None if read-only)
+        self.sessions = {}
+        self.session_used = {}
+        self.tickets = {}
+        # Technician group of each ticket, a linked item in GLPI
+        self.ticket_groups = {}
+        self.followups = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+        rng = random.Random(seed)
+        now = time.time()
+        for i in range(tickets):
+            words = rng.sample(TICKET_WORDS, 2)
+            # Spread tickets over the last 90 days
+            opened = now - rng.uniform(0, 90 * 86400)
+            ticket = self.add_ticket({
+                "name": f"{words[0].capitalize()} issue #{i + 1}",
+                "content": f"The {words[0]} does not work since the last {words[1]} update.",
+                "status": rng.choice(list(TICKET_STATUSES)),
+                "urgency": rng.randint(1, 5),
+                "date": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(opened)),
+                "date_mod": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(rng.uniform(opened, now))),
+            })
+            self.ticket_groups[ticket["id"]] = rng.choice(TICKET_GROUPS)
+
+    def add_ticket(self, fields: dict) -> dict:
+        ticket_id = len(self.tickets) + 1
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        ticket = {
+            "id": ticket_id, "entities_id": 0, "name": "", "date": now, "date_mod": now, "status": 1,
+            "content": "", "urgency": 3, "impact": 3, "priority": 3, "type": 1, "itilcategories_id": 0,
+        }
+        ticket.update(fields)
+        ticket["id"] = ticket_id
+        self.tickets[ticket_id] = ticket
+        return ticket
+
+    def handle(self, method: str, path: str, query: dict, headers, body: bytes) -> tuple[int, dict, object]:
+        """Serves one API call and returns its status, extra headers and JSON payload."""
+        # Like GLPI, calls on a writable session (session_write=true) lock it until they end
+        session_lock = self.sessions.get(headers.get("Session-Token") or query.get("session_token"))
+        with session_lock or nullcontext():
+            return self.serve(method, path, query, headers, body)
+
+    def serve(self, method: str, path: str, query: dict, headers, body: bytes) -> tuple[int, dict, object]:
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.requests += 1
+            if self.error_rate and self.errors.random() < self.error_rate:
+                raise GlpiError(503, "ERROR_SERVICE_UNAVAILABLE", "Service Unavailable")
+            route = path.split("apirest.php/", 1)[-1].strip("/").split("/")
+            if route[0] == "initSession":
+                return self.init_session(query, headers)
+            session_token = headers.get("Session-Token") or query.get("session_token")
+            now = time.monotonic()
+            if self.session_timeout is not None and now - self.session_used.get(session_token, now) > self.session_timeout:
+                self.kill_session(session_token)
+            if session_token not in self.sessions:
+                raise GlpiError(401, "ERROR_SESSION_TOKEN_INVALID", "session_token seems invalid")
+            self.session_used[session_token] = now
+            if route[0] == "killSession":
+                self.kill_session(session_token)
+                return 200, {}, None
+            data = json.loads(body) if body else {}
+            if route[0] == "Ticket":
+                return self.ticket(method, route[1:], query, data)
+            if route[0] == "ITILFollowup" and method == "POST":
+                return self.add_followup(data)
+            if route[0] == "getMultipleItems":
+                return self.get_multiple_items(query)
+            if route == ["listSearchOptions", "Ticket"]:
+                return self.list_search_options()
+            if route == ["search", "Ticket"]:
+                return self.search_tickets(query)
+            raise GlpiError(400, "ERROR_ITEMTYPE_NOT_FOUND_NOR_COMMONDBTM", "resource not found or not an instance of CommonDBTM")
+
+    def init_session(self, query: dict, headers) -> tuple[int, dict, object]:
+        authorization = headers.get("Authorization", "")
+        if not authorization.startswith(("Basic ", "user_token ")):
+            raise GlpiError(400, "ERROR_LOGIN_PARAMETERS_MISSING", "parameter(s) login, password or user_token are missing")
+        session_token = secrets.token_hex(20)
+        self.sessions[session_token] = threading.Lock() if query.get("session_write") == "true" else None
+        self.session_used[session_token] = time.monotonic()
+        return 200, {}, {"session_token": session_token}
+
+    def kill_session(self, session_token: str):
+        self.sessions.pop(session_token, None)
+        self.session_used.pop(session_token, None)
+
+    def get_ticket(self, ticket_id: str) -> dict:
+        ticket = self.tickets.get(int(ticket_id)) if ticket_id.isdigit() else None
+        if ticket is None:
+            raise GlpiError(404, "ERROR_ITEM_NOT_FOUND", "Item not found")
+        return ticket
+
+    def with_links(self, ticket: dict, query: dict) -> dict:
+        if query.get("get_hateoas", "true") == "false":
+            return ticket
+        return {**ticket, "links": [{"rel": "Entity", "href": f"Entity/{ticket['entities_id']}"}]}
+
+    def get_multiple_items(self, query: dict) -> tuple[int, dict, list]:
+        items = {}
+        for key, value in query.items():
+            if key.startswith("items["):
+                index, name = key[len("items["):-1].split("][")
+                items.setdefault(int(index), {})[name] = value
+        if not items:
+            raise GlpiError(400, "ERROR_BAD_ARRAY", "'items' parameter should be an array of objects")
+        results = []
+        for _, item in sorted(items.items()):
+            # Items that cannot be retrieved are returned as errors, in place
+            try:
+                if item.get("itemtype") != "Ticket":
+                    raise GlpiError(400, "ERROR_ITEMTYPE_NOT_FOUND_NOR_COMMONDBTM", "resource not found or not an instance of CommonDBTM")
+                results.append(self.with_links(self.get_ticket(str(item.get("items_id"))), query))
+            except GlpiError as e:
+                results.append([e.code, e.message])
+        return 200, {}, results
+
+    def page(self, items: list, query: dict, itemtype: str = "Ticket") -> tuple[int, dict, list]:
+        """Returns the requested range of sorted items, with its status and Content-Range headers."""
+        start, end = (int(bound) for bound in query.get("range", "0-49").split("-"))
+        total = len(items)
+        if start >= total:
+            raise GlpiError(400, "ERROR_RANGE_EXCEED_TOTAL", f"Provided range exceed total count of data: {total}")
+        end = min(end, total - 1, start + MAX_RANGE - 1)
+        headers = {"Content-Range": f"{start}-{end}/{total}", "Accept-Range": f"{itemtype} {MAX_RANGE}"}
+        return 206 if end - start + 1 < total else 200, headers, items[start:end + 1]
+
+    def list_items(self, items: list[dict], query: dict) -> tuple[int, dict, list[dict]]:
+        """Sorts items and returns the requested range of them, like GLPI's 'Get all items'."""
+        sort = query.get("sort", "id")
+        sort = "id" if sort.isdigit() else sort
+        items = sorted(items, key=lambda item: (item.get(sort) is None, item.get(sort, 0)), reverse=query.get("order") == "DESC")
+        return self.page(items, query)
+
+    def list_search_options(self) -> tuple[int, dict, dict]:
+        options = {"common": "Characteristics"}
+        for option_id, (name, table, field, uid) in TICKET_SEARCH_OPTIONS.items():
+            options[option_id] = {"name": name, "table": table, "field": field, "linkfield": field, "uid": uid}
+        return 200, {}, options
+
+    def search_value(self, ticket: dict, option_id: str):
+        table, field = TICKET_SEARCH_OPTIONS[option_id][1:3]
+        if table == "glpi_groups":
+            return self.ticket_groups.get(ticket["id"])
+        if table == "glpi_entities":
+            return "Root entity"
+        return ticket.get(field)
+
+    @staticmethod
+    def matches(option_id: str, value, searchtype: str, expected: str) -> bool:
+        """Evaluates one search criterion on a value, like GLPI's search engine."""
+        text = "" if value is None else str(value)
+        if searchtype == "contains":
+            # Wildcard search, that ^ and $ anchor at the start and end
+            pattern = expected.lower()
+            text = text.lower()
+            if pattern.startswith("^") and pattern.endswith("$"):
+                return text == pattern[1:-1]
+            if pattern.startswith("^"):
+                return text.startswith(pattern[1:])
+            if pattern.endswith("$"):
+                return text.endswith(pattern[:-1])
+            return pattern in text
+        if searchtype in ("lessthan", "morethan"):
+            try:
+                left, right = float(text), float(expected)
+            except ValueError:
+                left, right = text, expected
+            return left < right if searchtype == "lessthan" else left > right
+        if option_id == "12" and expected in ("notold", "old", "all"):
+            # Special status values: not solved nor closed, solved or closed, and any status
+            equal = expected == "all" or (value in (5, 6)) == (expected == "old")
+        else:
+            equal = text == expected
+        return equal if searchtype in ("equals", "under") else not equal
+
+    def search_tickets(self, query: dict) -> tuple[int, dict, dict]:
+        criteria = {}
+        forcedisplay = []
+        for key, value in query.items():
+            if key.startswith("criteria["):
+                index, name = key[len("criteria["):-1].split("][")
+                criteria.setdefault(int(index), {})[name] = value
+            elif key.startswith("forcedisplay["):
+                forcedisplay.append(value)
+        for option_id in [criterion.get("field") for criterion in criteria.values()] + forcedisplay:
+            if option_id not in TICKET_SEARCH_OPTIONS:
+                raise GlpiError(400, "ERROR_BAD_ARRAY", f"Unknown searchoption: {option_id}")
+
+        found = []
+        for ticket in self.tickets.values():
+            result = None
+            for _, criterion in sorted(criteria.items()):
+                option_id = criterion["field"]
+                match = self.matches(option_id, self.search_value(ticket, option_id), criterion.get("searchtype", "contains"), criterion.get("value", ""))
+                link = criterion.get("link", "AND") if result is not None else "AND"
+                if link.endswith("NOT"):
+                    match = not match
+                result = match if result is None else (result or match if link.startswith("OR") else result and match)
+            if result is None or result:
+                found.append(ticket)
+
+        sort = query.get("sort", "1")
+        found.sort(key=lambda ticket: (self.search_value(ticket, sort) is None, self.search_value(ticket, sort) or 0),
+                   reverse=query.get("order") == "DESC")
+        status, headers, page = self.page(found, query)
+        display = SEARCH_ALWAYS_DISPLAYED + (forcedisplay or SEARCH_DEFAULT_DISPLAY)
+        display += [criterion["field"] for criterion in criteria.values()]
+        display = list(dict.fromkeys(display))
+        data = [{option_id: self.search_value(ticket, option_id) for option_id in display} for ticket in page]
+        return status, headers, {"totalcount": len(found), "count": len(data), "sort": sort, "order": query.get("order", "ASC"), "data": data}
+
+    def add_items(self, itemtype: str, inputs, add) -> tuple[int, dict, object]:
+        """Adds one item (object input) or several (array input) with add(fields), like GLPI's 'Add item(s)'."""
+        if isinstance(inputs, dict):
+            item_id = add(inputs)
+            return 201, {"Location": f"{itemtype}/{item_id}"}, {"id": item_id, "message": ""}
+        results = []
+        for fields in inputs:
+            try:
+                results.append({"id": add(fields), "message": ""})
+            except GlpiError as e:
+                results.append({"id": False, "message": e.message})
+        failed = sum(not result["id"] for result in results)
+        if failed and failed == len(results):
+            return 400, {}, ["ERROR_GLPI_ADD", results]
+        links = {"Link": ",".join(f"{itemtype}/{result['id']}" for result in results if result["id"])}
+        return (207, links, ["ERROR_GLPI_PARTIAL_ADD", results]) if failed else (201, links, results)
+
+    def update_items(self, inputs, route: list[str], update) -> tuple[int, dict, object]:
+        """Updates one item or several (array input, each with its id) with update(id, fields), like GLPI's 'Update item(s)'."""
+        if isinstance(inputs, dict):
+            inputs = [{**inputs, "id": route[0]} if route else inputs]
+        results = []
+        for fields in inputs:
+            item_id = str(fields.get("id", ""))
+            try:
+                update(item_id, fields)
+                results.append({item_id: True, "message": ""})
+            except GlpiError as e:
+                results.append({item_id: False, "message": e.message})
+        failed = sum(not result[next(iter(result))] for result in results)
+        if failed and failed == len(results):
+            return 400, {}, ["ERROR_GLPI_UPDATE", results]
+        return (207, {}, ["ERROR_GLPI_PARTIAL_UPDATE", results]) if failed else (200, {}, results)
+
+    def create_ticket(self, fields: dict) -> int:
+        if not fields.get("content"):
+            raise GlpiError(400, "ERROR_GLPI_ADD", "Mandatory field: Description")
+        return self.add_ticket(fields)["id"]
+
+    def update_ticket(self, ticket_id: str, fields: dict):
+        ticket = self.get_ticket(ticket_id)
+        ticket.update({key: value for key, value in fields.items() if key != "id"})
+        ticket["date_mod"] = time.strftime("%Y-%m-%d %H:%M:%S")
+
+    def ticket(self, method: str, route: list[str], query: dict, data: dict) -> tuple[int, dict, object]:
+        if method == "GET" and route:
+            return 200, {}, self.with_links(self.get_ticket(route[0]), query)
+        if method == "GET":
+            status, headers, tickets = self.list_items(list(self.tickets.values()), query)
+            return status, headers, [self.with_links(ticket, query) for ticket in tickets]
+        if method == "POST":
+            return self.add_items("Ticket", data.get("input", {}), self.create_ticket)
+        if method in ("PUT", "PATCH"):
+            return self.update_items(data.get("input", {}), route, self.update_ticket)
+        raise GlpiError(400, "ERROR_METHOD_NOT_ALLOWED", "Method not allowed")
+
+    def create_followup(self, fields: dict) -> int:
+        if fields.get("itemtype") != "Ticket":
+            raise GlpiError(400, "ERROR_GLPI_ADD", "Follow-ups can only be added to tickets")
+        self.get_ticket(str(fields.get("items_id")))
+        followup_id = len(self.followups) + 1
+        self.followups[followup_id] = {"id": followup_id, **fields}
+        return followup_id
+
+    def add_followup(self, data: dict) -> tuple[int, dict, object]:
+        return self.add_items("ITILFollowup", data.get("input", {}), self.create_followup)
+
+
+class MockGlpiHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive, like the web server in front of a real GLPI
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately: without TCP_NODELAY, kept-alive connections stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def _serve(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            status, headers, payload = self.server.mock.handle(self.command, url.path, query, self.headers, body)
+        except GlpiError as e:
+            status, headers, payload = e.status, {}, [e.code, e.message]
+        content = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _serve
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockGlpiServer(ThreadingHTTPServer):
+    """Threaded HTTP server serving a MockGlpi instance."""
+    request_queue_size = 128
+
+    def __init__(self, address: tuple[str, int], mock: MockGlpi):
+        super().__init__(address, MockGlpiHandler)
+        self.mock = mock
+
+
+def start_mock(host: str = "127.0.0.1", port: int = 0, **kwargs) -> tuple[MockGlpiServer, str]:
+    """Starts a mock GLPI in a background thread and returns the server and its URL."""
+    server = MockGlpiServer((host, port), MockGlpi(**kwargs))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the GLPI REST API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--tickets", type=int, default=100, help="Number of seeded tickets (default: 100).")
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay added to every call, in seconds (default: 0).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--session-timeout", type=float, help="Seconds after which idle sessions expire (default: never).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls failing with 503 (default: 0).")
+    args = parser.parse_args()
+
+    mock = MockGlpi(args.tickets, args.latency, args.seed, session_timeout=args.session_timeout, error_rate=args.error_rate)
+    server = MockGlpiServer((args.host, args.port), mock)
+    print(f"Mock GLPI listening on http://{args.host}:{args.port} with {args.tickets} tickets")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,166 +1,652 @@
+import asyncio
 import base64
+import json
 import os
-import requests
+import secrets
+from contextvars import ContextVar
+from typing import Literal, NamedTuple
+from urllib.parse import urlencode
 
 from dotenv import load_dotenv
 
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
 from fastmcp.exceptions import ToolError
+from fastmcp.server.dependencies import get_context
+from pydantic import BaseModel
+
+from glpi_http import HTTP, HttpError
+from glpi_search import SearchOptions, SearchOptionsCache, search_params
+from glpi_sessions import GlpiLogin, SessionStore
+from ticket_cache import TicketCache
 
 load_dotenv()
 GLPI_TOKEN_API = os.getenv("GLPI_TOKEN_API", "")
+GLPI_USER_TOKEN = os.getenv("GLPI_USER_TOKEN", "")
 
 mcp = FastMCP("GLPI MCP Server")
 
-# In-memory session storage (for demonstration purposes)
+# In-memory storage of the GLPI sessions of each MCP session (for demonstration purposes)
 # In a production environment, use a more persistent storage
-SESSIONS = {}
-GLPI_URL = "http://localhost/glpi"  # Default GLPI URL, can be overridden on login
+# Logins unused for GLPI_LOGIN_IDLE_TTL seconds are dropped, e.g. those of MCP sessions gone without logging out
+SESSIONS = SessionStore(idle_ttl=float(os.getenv("GLPI_LOGIN_IDLE_TTL", "3600")))
+# Read-only GLPI sessions opened by each login, next to its writable session
+READ_SESSIONS = int(os.getenv("GLPI_READ_SESSIONS", "3"))
+
+# Hard cap on the JSON size of the tickets returned by one glpi_list_tickets call
+LIST_MAX_BYTES = int(os.getenv("GLPI_LIST_MAX_BYTES", "1000000"))
+# Page size and number of pages fetched in parallel by glpi_list_tickets, when limit spans several pages
+LIST_PAGE_SIZE = int(os.getenv("GLPI_LIST_PAGE_SIZE", "200"))
+LIST_PARALLEL_PAGES = int(os.getenv("GLPI_LIST_PARALLEL_PAGES", "4"))
+
+# Longest getMultipleItems URL sent by glpi_get_tickets: longer requests are split in chunks
+MAX_URL_LENGTH = int(os.getenv("GLPI_MAX_URL_LENGTH", "4000"))
+
+# Read-through cache of glpi_get_ticket, invalidated by the tools writing to tickets
+TICKET_CACHE = TicketCache(
+    max_size=int(os.getenv("GLPI_TICKET_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("GLPI_TICKET_CACHE_TTL", "60")),
+)
+
+# Items sent per request by the bulk tools, whose chunks are sent in parallel
+BULK_CHUNK_SIZE = int(os.getenv("GLPI_BULK_CHUNK_SIZE", "100"))
+
+# GLPI ticket statuses
+TICKET_SOLVED = 5
+TICKET_CLOSED = 6
+
+# Searchoptions (field name -> ID) of each GLPI instance, for glpi_search_tickets
+SEARCH_OPTIONS = SearchOptionsCache()
+
+# login_id given to the running tool call. Stateless MCP clients (the default with FastMCP 4) get
+# a new MCP session ID on every request, so they name their login with the ID glpi_login returned.
+LOGIN_ID = ContextVar("login_id", default="")
+
+
+def use_login(login_id: str):
+    """Selects the login of the running tool call: login_id if given, else the login of its MCP session."""
+    LOGIN_ID.set(login_id)
+
+
+def get_session_id() -> str:
+    """Returns the ID of the MCP session calling the tool."""
+    try:
+        return get_context().session_id
+    except RuntimeError:
+        # Called outside of an MCP request, e.g. directly from a script
+        return "default"
+
+
+def get_identity() -> str:
+    """Returns the login_id of the tool call, or else the ID of its MCP session, whose GLPI login is used."""
+    return LOGIN_ID.get() or get_session_id()
+
+
+def get_login() -> GlpiLogin:
+    """Returns the GLPI login of the calling MCP session."""
+    return SESSIONS.get(get_identity())
+
 
 def get_glpi_url():
     """Returns the GLPI URL."""
-    if not GLPI_URL:
-        raise Exception("GLPI URL not set. Please login first.")
-    return GLPI_URL
+    return get_login().glpi_url
 
-def get_session_token():
-    """Returns the session token."""
-    if "glpi_session_token" not in SESSIONS:
-        raise Exception("Not logged in to GLPI. Please login first.")
-    #mcp.log(f"Using MCP session id: {mcp.session_id()}")
-    return SESSIONS["glpi_session_token"]
+def get_session_token(write: bool = False):
+    """Returns a read-only session token, or the writable one."""
+    login = get_login()
+    return login.write_token if write else login.read_token()
 
 
-def get_headers(include_app_token: bool = True) -> dict:
-    """Returns the headers for GLPI API calls."""
+def get_headers(include_app_token: bool = True, write: bool = False) -> dict:
+    """Returns the headers for GLPI API calls, on the writable session if write is set."""
     headers = {
         "Content-Type": "application/json",
-        "Session-Token": get_session_token(),
+        "Session-Token": get_session_token(write),
     }
     if include_app_token:
-        headers["App-Token"] = GLPI_TOKEN_API
+        headers["App-Token"] = get_login().app_token
     return headers
 
 
+async def kill_sessions(login: GlpiLogin):
+    """Kills every GLPI session of a login, ignoring those already gone."""
+    async def kill(session_token: str):
+        headers = {"Content-Type": "application/json", "Session-Token": session_token, "App-Token": login.app_token}
+        try:
+            response = await HTTP.get(f"{login.glpi_url}/apirest.php/killSession", headers=headers)
+            response.raise_for_status()
+        except HttpError:
+            pass
+
+    await asyncio.gather(*(kill(session_token) for session_token in login.tokens()))
+
+
+async def reap_idle_logins():
+    """Forgets the logins idle for too long and kills their GLPI sessions."""
+    await asyncio.gather(*(kill_sessions(login) for login in SESSIONS.reap()))
+
+
+async def open_sessions(glpi_url: str, app_token: str, authorization: str) -> tuple[str, list[str]]:
+    """Opens the writable session and the read-only sessions of a login, and returns their tokens."""
+    headers = {
+        "Content-Type": "application/json",
+        "App-Token": app_token,
+        "Authorization": authorization,
+    }
+
+    async def init_session(write: bool) -> str:
+        params = {"session_write": "true"} if write else None
+        response = await HTTP.get(f"{glpi_url}/apirest.php/initSession", headers=headers, params=params)
+        response.raise_for_status()
+        return response.json()["session_token"]
+
+    # The writable session first, so bad credentials fail once
+    write_token = await init_session(write=True)
+    read_tokens = list(await asyncio.gather(*(init_session(write=False) for _ in range(READ_SESSIONS))))
+    return write_token, read_tokens
+
+
+async def renew_sessions(login: GlpiLogin) -> tuple[str, list[str]]:
+    """Replaces the sessions of a login, some of them expired, by new ones opened with its credentials."""
+    _, tokens = await asyncio.gather(kill_sessions(login), open_sessions(login.glpi_url, login.app_token, login.authorization))
+    return tokens
+
+
+async def glpi_request(method: str, url: str, **kwargs):
+    """
+    Sends a GLPI API call of the calling MCP session, through the shared client.
+
+    If GLPI rejects the session token (ERROR_SESSION_TOKEN_INVALID), the GLPI sessions are renewed
+    with the credentials of the login and the call is sent again: GLPI refused it before doing anything.
+    """
+    await reap_idle_logins()
+    response = await HTTP.request(method, url, **kwargs)
+    headers = kwargs.get("headers") or {}
+    if response.status_code == 401 and b"ERROR_SESSION_TOKEN_INVALID" in response.content and "Session-Token" in headers:
+        session_token = await get_login().renew(headers["Session-Token"], renew_sessions)
+        kwargs["headers"] = {**headers, "Session-Token": session_token}
+        response = await HTTP.request(method, url, **kwargs)
+    return response
+
+
 @mcp.tool()
-def glpi_login(glpi_url: str, username: str, password: str, app_token: str = GLPI_TOKEN_API) -> dict:
+async def glpi_login(
+    glpi_url: str,
+    username: str = "",
+    password: str = "",
+    app_token: str = GLPI_TOKEN_API,
+    user_token: str = GLPI_USER_TOKEN,
+) -> dict:
     """
-    Logs in to GLPI using username and password to obtain a session token for subsequent API calls.
+    Logs in to GLPI using username and password, or a user token, to obtain a session token for subsequent API calls.
 
     This tool authenticates the user against the GLPI API and stores the session token in memory.
-    The session token is then automatically used by other tools in this module.
+    The session token is then automatically used by other tools in this module, and renewed
+    when it expires, so there is no need to log in again. The returned login_id names the login:
+    pass it to the other tools, unless the MCP session is stateful.
 
     Args:
         glpi_url (str): The base URL of the GLPI instance (e.g., 'http://your-glpi-server.com').
         username (str): The GLPI username to authenticate with.
         password (str): The password for the GLPI user.
         app_token (str): The App-Token for the GLPI API. Can be found in Setup > General > API.
+        user_token (str): The API token of the GLPI user, used instead of username and password.
+            Can be found in the user preferences, under Remote access keys.
     """
-    global GLPI_URL
-    GLPI_URL = glpi_url
-    # Encode username and password in base64
-    auth_str = f"{username}:{password}"
-    base64_auth_str = base64.b64encode(auth_str.encode()).decode()
+    if username:
+        # Encode username and password in base64
+        auth_str = f"{username}:{password}"
+        base64_auth_str = base64.b64encode(auth_str.encode()).decode()
+        authorization = f"Basic {base64_auth_str}"
+    elif user_token:
+        authorization = f"user_token {user_token}"
+    else:
+        raise ToolError("Error logging in to GLPI: give a username and password, or a user token.")
 
-    headers = {
-        "Content-Type": "application/json",
-        "App-Token": app_token,
-        "Authorization": f"Basic {base64_auth_str}",
-    }
     try:
-        response = requests.get(f"{glpi_url}/apirest.php/initSession", headers=headers)
-        response.raise_for_status()
-        session_token = response.json()["session_token"]
-        # Store the session token in memory
-        SESSIONS["glpi_session_token"] = session_token
-        return {'status': "Successfully logged in to GLPI.", 'Session token': session_token}
-    except requests.exceptions.RequestException as e:
+        write_token, read_tokens = await open_sessions(glpi_url, app_token, authorization)
+    except (HttpError, ValueError) as e:
         raise ToolError(f"Error logging in to GLPI: {e}")
+    await reap_idle_logins()
+    # Store the session tokens and credentials in memory, replacing a previous login of this MCP session
+    login_id = secrets.token_urlsafe(16)
+    login = GlpiLogin(glpi_url, app_token, authorization, write_token, read_tokens)
+    previous = SESSIONS.set(login_id, login, session_id=get_session_id())
+    if previous is not None:
+        await kill_sessions(previous)
+    return {
+        'status': "Successfully logged in to GLPI.",
+        'login_id': login_id,
+        'Session token': write_token,
+        'Read-only sessions': len(read_tokens),
+    }
 
 
 @mcp.tool()
-def glpi_logout() -> str:
+async def glpi_logout(login_id: str = "") -> str:
     """
     Logs out from the current GLPI session and invalidates the session token.
 
     This tool should be called when the user has finished interacting with the GLPI API
     to ensure the session is properly closed.
+
+    Args:
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
     """
+    use_login(login_id)
     try:
-        glpi_url = get_glpi_url()
-        headers = get_headers()
-        response = requests.get(f"{glpi_url}/apirest.php/killSession", headers=headers)
-        response.raise_for_status()
-        # Remove the session token from memory
-        del SESSIONS["glpi_session_token"]
+        login = SESSIONS.pop(get_identity())
+        if login is None:
+            raise Exception("Not logged in to GLPI. Please login first.")
+        await kill_sessions(login)
         return "Successfully logged out from GLPI."
     except Exception as e:
         raise ToolError(f"Error logging out from GLPI: {e}")
 
 
 @mcp.tool()
-def glpi_get_ticket(ticket_id: int) -> dict:
+async def glpi_get_ticket(ticket_id: int, bypass_cache: bool = False, login_id: str = "") -> dict:
     """
     Retrieves detailed information about a specific ticket from GLPI.
 
+    Tickets read recently are served from a short-lived cache, which the tools writing to tickets keep
+    up to date. Changes made outside this server may take a minute to show, unless bypass_cache is set.
+
     Args:
         ticket_id (int): The unique identifier for the ticket to retrieve.
+        bypass_cache (bool): Read the ticket from GLPI even if it is cached. Defaults to False.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
     """
+    use_login(login_id)
     try:
         glpi_url = get_glpi_url()
         headers = get_headers()
-        print(headers)
-        response = requests.get(f"{glpi_url}/apirest.php/Ticket/{ticket_id}", headers=headers)
-        response.raise_for_status()
-        return response.json()
+
+        async def fetch() -> dict:
+            response = await glpi_request("GET", f"{glpi_url}/apirest.php/Ticket/{ticket_id}", headers=headers)
+            response.raise_for_status()
+            return response.json()
+
+        # Cached per login, shared by its read-only sessions
+        return await TICKET_CACHE.get(glpi_url, get_session_token(write=True), ticket_id, fetch, bypass_cache)
     except Exception as e:
         raise ToolError(f"Error getting ticket: {e}")
 
 
+@mcp.resource("stats://glpi/ticket-cache")
+def ticket_cache_stats() -> dict:
+    """Hit, miss and eviction counters of the glpi_get_ticket cache."""
+    return TICKET_CACHE.stats()
+
+
+async def write_tickets(glpi_url: str, method: str, url: str, ticket_ids: list[int], **kwargs):
+    """Sends a request writing to tickets, then drops them from the ticket cache, even if it failed."""
+    try:
+        return await glpi_request(method, url, **kwargs)
+    finally:
+        TICKET_CACHE.invalidate(glpi_url, ticket_ids)
+
+
+def select_fields(item: dict, fields: list[str] | None) -> dict:
+    """Keeps the given fields of an item, or all of them if fields is empty."""
+    return {field: item[field] for field in fields if field in item} if fields else item
+
+
+def items_params(itemtype: str, ids: list[int], start: int = 0) -> list[tuple]:
+    """Encodes items as getMultipleItems parameters (items[0][itemtype]=Ticket&items[0][items_id]=12...)."""
+    params = []
+    for index, item_id in enumerate(ids, start):
+        params += [(f"items[{index}][itemtype]", itemtype), (f"items[{index}][items_id]", item_id)]
+    return params
+
+
+def chunk_ids(itemtype: str, ids: list[int], base_length: int, max_length: int) -> list[list[int]]:
+    """Splits IDs in chunks whose getMultipleItems URL stays within max_length."""
+    chunks, chunk, length = [], [], base_length
+    for item_id in ids:
+        if chunk and length + len(urlencode(items_params(itemtype, [item_id], len(chunk)))) + 1 > max_length:
+            chunks.append(chunk)
+            chunk, length = [], base_length
+        length += len(urlencode(items_params(itemtype, [item_id], len(chunk)))) + 1
+        chunk.append(item_id)
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
 @mcp.tool()
-def glpi_list_tickets() -> list[dict]:
+async def glpi_get_tickets(ids: list[int], fields: list[str] | None = None, login_id: str = "") -> dict:
     """
-    Retrieves a list of all tickets from GLPI.
+    Retrieves several tickets from GLPI at once, e.g. to triage a list of tickets.
 
-    This tool returns a list of all tickets accessible by the authenticated user.
-    The list can be long, so it may be useful to filter the results.
+    Much faster than calling glpi_get_ticket for each ticket. Only return the fields needed
+    (e.g. ['id', 'name', 'status', 'content']) to keep the answer small.
+
+    Args:
+        ids (list[int]): The unique identifiers of the tickets to retrieve.
+        fields (list[str], optional): Ticket fields to return. Defaults to all of them.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
+
+    Returns:
+        dict: 'tickets' found, in the order of ids, and 'errors' for the tickets that could not be retrieved.
     """
+    use_login(login_id)
     try:
         glpi_url = get_glpi_url()
         headers = get_headers()
-        response = requests.get(f"{glpi_url}/apirest.php/Ticket/", headers=headers)
+        ids = list(dict.fromkeys(ids))
+        params = [("get_hateoas", "false")] if fields and "links" not in fields else []
+        url = f"{glpi_url}/apirest.php/getMultipleItems"
+        # Chunks are fetched in parallel, bounded by the concurrency limit of the HTTP client
+        chunks = chunk_ids("Ticket", ids, len(url) + len(urlencode(params)) + 1, MAX_URL_LENGTH)
+
+        async def fetch(chunk: list[int]) -> list:
+            response = await glpi_request("GET", url, headers=headers, params=params + items_params("Ticket", chunk))
+            response.raise_for_status()
+            return response.json()
+
+        results = [item for chunk in await asyncio.gather(*(fetch(chunk) for chunk in chunks)) for item in chunk]
+        tickets, errors = [], []
+        for ticket_id, item in zip(ids, results):
+            # Items that cannot be retrieved come back as [error code, message]
+            if isinstance(item, list):
+                errors.append({"id": ticket_id, "error": ": ".join(str(part) for part in item)})
+            else:
+                tickets.append(select_fields(item, fields))
+        return {"tickets": tickets, "errors": errors}
+    except Exception as e:
+        raise ToolError(f"Error getting tickets: {e}")
+
+
+class TicketPage(NamedTuple):
+    """A range of tickets, with the total number of tickets and the largest range GLPI serves at once."""
+    tickets: list[dict]
+    total: int
+    max_range: int | None
+
+
+def parse_content_range(header: str | None) -> tuple[int, int, int] | None:
+    """Parses a GLPI Content-Range header ('start-end/total')."""
+    try:
+        bounds, total = header.split("/")
+        start, end = bounds.split("-")
+        return int(start), int(end), int(total)
+    except (AttributeError, ValueError):
+        return None
+
+
+def page_starts(start: int, total: int, page_size: int, count: int) -> list[int]:
+    """Returns the start of the next count pages from start, up to total."""
+    return list(range(start, min(total, start + count * page_size), page_size))
+
+
+async def fetch_ticket_page(glpi_url: str, headers: dict, start: int, end: int, params: dict) -> TicketPage:
+    """Fetches the tickets from start to end (included), in the order given by params."""
+    response = await glpi_request("GET", f"{glpi_url}/apirest.php/Ticket/", headers=headers, params={**params, "range": f"{start}-{end}"})
+    if response.status_code == 400 and "ERROR_RANGE_EXCEED_TOTAL" in response.text:
+        # The error message ends with the total: 'Provided range exceed total count of data: 1234'
+        total = response.json()[-1].rsplit(":", 1)[-1].strip()
+        return TicketPage([], int(total) if total.isdigit() else start, None)
+    response.raise_for_status()
+    tickets = response.json()
+    content_range = parse_content_range(response.headers.get("Content-Range"))
+    # Accept-Range is 'itemtype max' (or just 'max' on some versions)
+    accept_range = response.headers.get("Accept-Range", "").split()
+    max_range = int(accept_range[-1]) if accept_range and accept_range[-1].isdigit() else None
+    return TicketPage(tickets, content_range[2] if content_range else start + len(tickets), max_range)
+
+
+@mcp.tool()
+async def glpi_list_tickets(
+    offset: int = 0,
+    limit: int = 50,
+    ticket_range: str | None = None,
+    sort: str | None = None,
+    order: Literal["ASC", "DESC"] = "ASC",
+    fields: list[str] | None = None,
+    max_bytes: int = LIST_MAX_BYTES,
+    login_id: str = "",
+    ctx: Context | None = None,
+) -> dict:
+    """
+    Retrieves a page of tickets from GLPI.
+
+    Tickets are returned page by page: use offset and limit (or a GLPI range) to walk through them,
+    resuming each call at the 'next_offset' of the previous one, and fields to only return the fields
+    needed (e.g. ['id', 'name', 'status']) and keep the answer small. A large limit is fetched several
+    pages at a time, and progress is reported as pages arrive. The tickets returned never exceed
+    max_bytes of JSON: 'truncated' is then true, and 'next_offset' tells where to resume.
+
+    Args:
+        offset (int): Index of the first ticket to return. Defaults to 0.
+        limit (int): Maximum number of tickets to return. Defaults to 50.
+        ticket_range (str, optional): GLPI range of tickets to return, as 'start-end' (e.g. '150-199'). Overrides offset and limit.
+        sort (str, optional): Field to sort tickets by (GLPI sorts by ID by default).
+        order (str): 'ASC' for ascending or 'DESC' for descending sort. Defaults to 'ASC'.
+        fields (list[str], optional): Ticket fields to return. Defaults to all of them.
+        max_bytes (int): Maximum size of the returned tickets, in bytes of JSON. Capped by the server.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
+
+    Returns:
+        dict: 'total' number of tickets in GLPI, 'offset', 'count' and 'tickets' returned,
+        'next_offset' (None after the last ticket) and 'truncated'.
+    """
+    use_login(login_id)
+    try:
+        glpi_url = get_glpi_url()
+        headers = get_headers()
+        if ticket_range:
+            start, end = (int(bound) for bound in ticket_range.split("-"))
+            offset, limit = start, end - start + 1
+        if offset < 0 or limit < 1:
+            raise ValueError("offset must be positive and limit at least 1.")
+        params = {"order": order}
+        if sort:
+            params["sort"] = sort
+        if fields and "links" not in fields:
+            # Relations are not needed: let GLPI skip them
+            params["get_hateoas"] = "false"
+        max_bytes = min(max_bytes, LIST_MAX_BYTES)
+        page_size = min(limit, LIST_PAGE_SIZE)
+
+        tickets, size = [], 0
+
+        def collect(page: list[dict]) -> bool:
+            """Adds the tickets of a page, unless they overflow max_bytes. Returns False once full."""
+            nonlocal size
+            for ticket in page:
+                ticket = select_fields(ticket, fields)
+                # Counts the ', ' separator too, so the whole list fits in max_bytes
+                ticket_size = len(json.dumps(ticket)) + 2
+                if size + ticket_size > max_bytes:
+                    return False
+                tickets.append(ticket)
+                size += ticket_size
+            return True
+
+        first = await fetch_ticket_page(glpi_url, headers, offset, offset + page_size - 1, params)
+        total = first.total
+        truncated = not collect(first.tickets)
+        # The rest of the limit, in pages no larger than GLPI serves, fetched several at a time
+        end = min(total, offset + limit)
+        page_size = min(page_size, first.max_range or page_size)
+        start = offset + len(tickets)
+        while start < end and not truncated:
+            if ctx:
+                await ctx.report_progress(len(tickets), end - offset, f"Fetched {len(tickets)} of {end - offset} tickets")
+            starts = page_starts(start, end, page_size, LIST_PARALLEL_PAGES)
+            pages = await asyncio.gather(*(
+                fetch_ticket_page(glpi_url, headers, page_start, min(page_start + page_size, end) - 1, params)
+                for page_start in starts
+            ))
+            for page_start, page in zip(starts, pages):
+                truncated = not collect(page.tickets)
+                # A short page means tickets were deleted meanwhile: resume right after it
+                if truncated or len(page.tickets) < min(page_size, end - page_start):
+                    break
+            if offset + len(tickets) == start:
+                break
+            start = offset + len(tickets)
+
+        next_offset = offset + len(tickets)
+        return {
+            "total": total,
+            "offset": offset,
+            "count": len(tickets),
+            "tickets": tickets,
+            "next_offset": next_offset if next_offset < total else None,
+            "truncated": truncated,
+        }
+    except Exception as e:
+        raise ToolError(f"Error listing tickets: {e}")
+
+
+async def get_ticket_search_options() -> SearchOptions:
+    """Returns the ticket searchoptions of the current GLPI instance, fetched on first use."""
+    glpi_url = get_glpi_url()
+
+    async def fetch() -> dict:
+        response = await glpi_request("GET", f"{glpi_url}/apirest.php/listSearchOptions/Ticket", headers=get_headers())
         response.raise_for_status()
         return response.json()
+
+    return await SEARCH_OPTIONS.get(glpi_url, "Ticket", fetch)
+
+
+class SearchCriterion(BaseModel):
+    field: str
+    value: str
+    searchtype: Literal["contains", "equals", "notequals", "lessthan", "morethan", "under", "notunder"] = "contains"
+    link: Literal["AND", "OR", "AND NOT", "OR NOT"] = "AND"
+
+
+@mcp.tool()
+async def glpi_list_ticket_search_fields(login_id: str = "") -> list[str]:
+    """
+    Lists the ticket fields that glpi_search_tickets can filter, display and sort by.
+
+    Fields of the ticket itself have their column name (e.g. 'status', 'date_mod'), and linked
+    fields are prefixed by their itemtype (e.g. 'Group.completename' for the assigned group).
+
+    Args:
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
+    """
+    use_login(login_id)
+    try:
+        return (await get_ticket_search_options()).fields()
     except Exception as e:
-        raise ToolError(f"Error listing tickets: {e}")
+        raise ToolError(f"Error listing ticket search fields: {e}")
+
+
+@mcp.tool()
+async def glpi_search_tickets(
+    criteria: list[SearchCriterion] | None = None,
+    fields: list[str] | None = None,
+    offset: int = 0,
+    limit: int = 50,
+    ticket_range: str | None = None,
+    sort: str | None = None,
+    order: Literal["ASC", "DESC"] = "ASC",
+    login_id: str = "",
+) -> dict:
+    """
+    Searches tickets with the GLPI search engine, which filters, selects fields and pages inside GLPI.
+
+    Prefer this tool to glpi_list_tickets to find tickets matching conditions. Criteria are combined
+    in order with their link (AND, OR, AND NOT, OR NOT). Fields are named like 'status', 'name',
+    'date_mod' or 'Group.completename' (see glpi_list_ticket_search_fields); labels like 'Last update'
+    and searchoption IDs work too. Useful values: status 'notold' (with 'equals') matches open
+    tickets, and dates like '2024-06-01 00:00:00' work with 'lessthan' and 'morethan'.
+
+    Args:
+        criteria (list, optional): Conditions, each with a field, a value, a searchtype ('contains' by default,
+            'equals', 'notequals', 'lessthan', 'morethan', 'under', 'notunder') and a link ('AND' by default).
+        fields (list[str], optional): Fields to return for each ticket (the ID is always returned).
+            Defaults to the display preferences of GLPI.
+        offset (int): Index of the first ticket to return. Defaults to 0.
+        limit (int): Maximum number of tickets to return. Defaults to 50.
+        ticket_range (str, optional): GLPI range of tickets to return, as 'start-end'. Overrides offset and limit.
+        sort (str, optional): Field to sort tickets by.
+        order (str): 'ASC' for ascending or 'DESC' for descending sort. Defaults to 'ASC'.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
+
+    Returns:
+        dict: 'total' number of matching tickets, 'offset', 'count' and 'tickets' returned, and 'next_offset'
+        (None after the last ticket).
+    """
+    use_login(login_id)
+    try:
+        glpi_url = get_glpi_url()
+        if ticket_range:
+            start, end = (int(bound) for bound in ticket_range.split("-"))
+            offset, limit = start, end - start + 1
+        if offset < 0 or limit < 1:
+            raise ValueError("offset must be positive and limit at least 1.")
+        options = await get_ticket_search_options()
+        search_criteria = [
+            {"link": criterion.link, "field": options.resolve(criterion.field),
+             "searchtype": criterion.searchtype, "value": criterion.value}
+            for criterion in criteria or []
+        ]
+        forcedisplay = [options.resolve(field) for field in fields or []]
+        params = search_params(
+            search_criteria, forcedisplay, options.resolve(sort) if sort else None, order, offset, offset + limit - 1
+        )
+        response = await glpi_request("GET", f"{glpi_url}/apirest.php/search/Ticket/", headers=get_headers(), params=params)
+        if response.status_code == 400 and "ERROR_RANGE_EXCEED_TOTAL" in response.text:
+            total = response.json()[-1].rsplit(":", 1)[-1].strip()
+            return {"total": int(total) if total.isdigit() else offset, "offset": offset, "count": 0, "tickets": [], "next_offset": None}
+        response.raise_for_status()
+        result = response.json()
+        rows = result.get("data") or []
+        if isinstance(rows, dict):
+            rows = list(rows.values())
+        # Only keep the requested fields, keyed by name instead of searchoption ID
+        wanted = set(forcedisplay) | {options.resolve("id")} if forcedisplay else None
+        tickets = [
+            {options.names.get(option_id, option_id): value for option_id, value in row.items() if wanted is None or option_id in wanted}
+            for row in rows
+        ]
+        total = int(result.get("totalcount", len(tickets)))
+        next_offset = offset + len(tickets)
+        return {
+            "total": total,
+            "offset": offset,
+            "count": len(tickets),
+            "tickets": tickets,
+            "next_offset": next_offset if next_offset < total and tickets else None,
+        }
+    except Exception as e:
+        raise ToolError(f"Error searching tickets: {e}")
 
 
 @mcp.tool()
-def glpi_create_ticket(title: str, content: str) -> dict:
+async def glpi_create_ticket(title: str, content: str, login_id: str = "") -> dict:
     """
     Creates a new ticket in GLPI with a title and content.
 
     Args:
         title (str): The title of the new ticket.
         content (str): The main content or description of the ticket.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
     """
+    use_login(login_id)
     try:
         glpi_url = get_glpi_url()
-        headers = get_headers()
+        headers = get_headers(write=True)
         data = {
             "input": {
                 "name": title,
                 "content": content,
             }
         }
-        response = requests.post(f"{glpi_url}/apirest.php/Ticket", headers=headers, json=data)
+        response = await glpi_request("POST", f"{glpi_url}/apirest.php/Ticket", headers=headers, json=data)
         response.raise_for_status()
         return response.json()
     except Exception as e:
         raise ToolError(f"Error creating ticket: {e}")
 
 @mcp.tool()
-def glpi_update_ticket(ticket_id: int, title: str = None, content: str = None) -> dict:
+async def glpi_update_ticket(ticket_id: int, title: str = None, content: str = None, login_id: str = "") -> list[dict] | str:
     """
     Updates the title and/or content of an existing ticket in GLPI.
 
@@ -168,10 +654,12 @@ def glpi_update_ticket(ticket_id: int, title: str = None, content: str = None) -
         ticket_id (int): The unique identifier for the ticket to update.
         title (str, optional): The new title for the ticket. Defaults to None.
         content (str, optional): The new content for the ticket. Defaults to None.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
     """
+    use_login(login_id)
     try:
         glpi_url = get_glpi_url()
-        headers = get_headers()
+        headers = get_headers(write=True)
         data = {
             "input": {}
         }
@@ -183,7 +671,9 @@ def glpi_update_ticket(ticket_id: int, title: str = None, content: str = None) -
         if not data["input"]:
             return "Nothing to update."
 
-        response = requests.put(f"{glpi_url}/apirest.php/Ticket/{ticket_id}", headers=headers, json=data)
+        response = await write_tickets(
+            glpi_url, "PUT", f"{glpi_url}/apirest.php/Ticket/{ticket_id}", [ticket_id], headers=headers, json=data
+        )
         response.raise_for_status()
         return response.json()
     except Exception as e:
@@ -191,7 +681,7 @@ def glpi_update_ticket(ticket_id: int, title: str = None, content: str = None) -
 
 
 @mcp.tool()
-def glpi_add_ticket_followup(ticket_id: int, content: str) -> dict:
+async def glpi_add_ticket_followup(ticket_id: int, content: str, login_id: str = "") -> dict:
     """
     Adds a follow-up message to an existing ticket in GLPI.
 
@@ -200,10 +690,12 @@ def glpi_add_ticket_followup(ticket_id: int, content: str) -> dict:
     Args:
         ticket_id (int): The unique identifier for the ticket to add a follow-up to.
         content (str): The content of the follow-up message.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
     """
+    use_login(login_id)
     try:
         glpi_url = get_glpi_url()
-        headers = get_headers()
+        headers = get_headers(write=True)
         data = {
             "input": {
                 "itemtype": "Ticket",
@@ -211,7 +703,9 @@ def glpi_add_ticket_followup(ticket_id: int, content: str) -> dict:
                 "content": content,
             }
         }
-        response = requests.post(f"{glpi_url}/apirest.php/ITILFollowup", headers=headers, json=data)
+        response = await write_tickets(
+            glpi_url, "POST", f"{glpi_url}/apirest.php/ITILFollowup", [ticket_id], headers=headers, json=data
+        )
         response.raise_for_status()
         return response.json()
     except Exception as e:
@@ -219,7 +713,7 @@ def glpi_add_ticket_followup(ticket_id: int, content: str) -> dict:
 
 
 @mcp.tool()
-def glpi_solve_ticket(ticket_id: int) -> dict:
+async def glpi_solve_ticket(ticket_id: int, login_id: str = "") -> list[dict]:
     """
     Marks a ticket in GLPI as solved.
 
@@ -227,25 +721,29 @@ def glpi_solve_ticket(ticket_id: int) -> dict:
 
     Args:
         ticket_id (int): The unique identifier for the ticket to mark as solved.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
     """
+    use_login(login_id)
     try:
         glpi_url = get_glpi_url()
-        headers = get_headers()
+        headers = get_headers(write=True)
         data = {
             "input": {
                 "id": ticket_id,
-                "status": 4, # Solved
+                "status": TICKET_SOLVED,
             }
         }
-        response = requests.put(f"{glpi_url}/apirest.php/Ticket/{ticket_id}", headers=headers, json=data)
+        response = await write_tickets(
+            glpi_url, "PUT", f"{glpi_url}/apirest.php/Ticket/{ticket_id}", [ticket_id], headers=headers, json=data
+        )
         response.raise_for_status()
-        return response..json()
+        return response.json()
     except Exception as e:
         raise ToolError(f"Error solving ticket: {e}")
 
 
 @mcp.tool()
-def glpi_close_ticket(ticket_id: int) -> dict:
+async def glpi_close_ticket(ticket_id: int, login_id: str = "") -> list[dict]:
     """
     Marks a ticket in GLPI as closed.
 
@@ -253,23 +751,223 @@ def glpi_close_ticket(ticket_id: int) -> dict:
 
     Args:
         ticket_id (int): The unique identifier for the ticket to mark as closed.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
     """
+    use_login(login_id)
     try:
         glpi_url = get_glpi_url()
-        headers = get_headers()
+        headers = get_headers(write=True)
         data = {
             "input": {
                 "id": ticket_id,
-                "status": 5, # Closed
+                "status": TICKET_CLOSED,
             }
         }
-        response = requests.put(f"{glpi_url}/apirest.php/Ticket/{ticket_id}", headers=headers, json=data)
+        response = await write_tickets(
+            glpi_url, "PUT", f"{glpi_url}/apirest.php/Ticket/{ticket_id}", [ticket_id], headers=headers, json=data
+        )
         response.raise_for_status()
         return response.json()
     except Exception as e:
         raise ToolError(f"Error closing ticket: {e}")
 
 
+def parse_bulk_results(body) -> tuple[str | None, list]:
+    """Returns the error code (like ERROR_GLPI_PARTIAL_UPDATE) and the per-item results of a bulk add or update."""
+    # Partial and total failures are returned as [error code, results]
+    if isinstance(body, list) and len(body) == 2 and isinstance(body[0], str) and isinstance(body[1], list):
+        return body[0], body[1]
+    return None, body if isinstance(body, list) else [body]
+
+
+def item_result(method: str, result, fallback_id: int | None) -> dict:
+    """Turns a GLPI add result ({"id": 8, "message": ""}) or update result ({"8": true, "message": ""}) into a status."""
+    if not isinstance(result, dict):
+        return {"id": fallback_id, "status": "failed", "message": str(result)}
+    message = result.get("message", "")
+    if method == "POST":
+        item_id = result.get("id")
+        return {"id": item_id or None, "status": "created" if item_id else "failed", "message": message}
+    item_id, updated = next(((key, value) for key, value in result.items() if key != "message"), (fallback_id, False))
+    return {"id": int(item_id) if str(item_id).isdigit() else item_id, "status": "updated" if updated else "failed", "message": message}
+
+
+async def bulk_request(method: str, itemtype: str, inputs: list[dict]) -> dict:
+    """
+    Adds (POST) or updates (PUT) items in chunks of BULK_CHUNK_SIZE, sent in parallel.
+
+    Returns one status per input, in order. Partial failures are reported per item, with the GLPI
+    error codes, instead of failing the whole call.
+    """
+    glpi_url = get_glpi_url()
+    headers = get_headers(write=True)
+    chunks = [inputs[start:start + BULK_CHUNK_SIZE] for start in range(0, len(inputs), BULK_CHUNK_SIZE)]
+
+    async def send(chunk: list[dict]) -> tuple[list[str], list[dict]]:
+        fallback_ids = [item.get("id") for item in chunk]
+        try:
+            # Follow-ups change their ticket (items_id), and ticket updates the ticket itself (id)
+            ticket_ids = [item["items_id"] if "items_id" in item else item.get("id") for item in chunk]
+            ticket_ids = [ticket_id for ticket_id in ticket_ids if ticket_id is not None]
+            response = await write_tickets(
+                glpi_url, method, f"{glpi_url}/apirest.php/{itemtype}/", ticket_ids, headers=headers, json={"input": chunk}
+            )
+            body = response.json() if response.content else []
+        except (HttpError, ValueError) as e:
+            return ["ERROR_HTTP"], [{"id": item_id, "status": "failed", "message": str(e)} for item_id in fallback_ids]
+        error, results = parse_bulk_results(body)
+        if response.status_code >= 400 and (error is None or len(results) != len(chunk)):
+            # The whole chunk was rejected, e.g. ERROR_SESSION_TOKEN_INVALID or ERROR_BAD_ARRAY
+            message = ": ".join(str(part) for part in body) if isinstance(body, list) else str(body)
+            if error is None and isinstance(body, list) and body and isinstance(body[0], str):
+                error = body[0]
+            return [error or f"HTTP {response.status_code}"], [
+                {"id": item_id, "status": "failed", "message": message} for item_id in fallback_ids
+            ]
+        return [error] if error else [], [
+            item_result(method, result, item_id) for result, item_id in zip(results, fallback_ids)
+        ]
+
+    errors, results = [], []
+    for chunk_errors, chunk_results in await asyncio.gather(*(send(chunk) for chunk in chunks)):
+        errors += chunk_errors
+        results += chunk_results
+    failed = sum(result["status"] == "failed" for result in results)
+    return {
+        "status": "ok" if not failed else "failed" if failed == len(results) else "partial",
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "errors": list(dict.fromkeys(errors)),
+        "results": results,
+    }
+
+
+class NewTicket(BaseModel):
+    title: str
+    content: str
+
+
+class TicketUpdate(BaseModel):
+    ticket_id: int
+    title: str | None = None
+    content: str | None = None
+
+
+class TicketFollowup(BaseModel):
+    ticket_id: int
+    content: str
+
+
+@mcp.tool()
+async def glpi_create_tickets(tickets: list[NewTicket], login_id: str = "") -> dict:
+    """
+    Creates several tickets in GLPI at once, each with a title and content.
+
+    Args:
+        tickets (list): The tickets to create, each with a 'title' and a 'content'.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
+
+    Returns:
+        dict: overall 'status' ('ok', 'partial' or 'failed'), 'succeeded' and 'failed' counts, GLPI 'errors'
+        and, for each ticket in order, its 'id', 'status' ('created' or 'failed') and 'message'.
+    """
+    use_login(login_id)
+    try:
+        return await bulk_request("POST", "Ticket", [{"name": ticket.title, "content": ticket.content} for ticket in tickets])
+    except Exception as e:
+        raise ToolError(f"Error creating tickets: {e}")
+
+
+@mcp.tool()
+async def glpi_update_tickets(updates: list[TicketUpdate], login_id: str = "") -> dict:
+    """
+    Updates the title and/or content of several existing tickets in GLPI at once.
+
+    Args:
+        updates (list): The updates, each with a 'ticket_id' and a new 'title' and/or 'content'.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
+
+    Returns:
+        dict: overall 'status' ('ok', 'partial' or 'failed'), 'succeeded' and 'failed' counts, GLPI 'errors'
+        and, for each update in order, the ticket 'id', 'status' ('updated' or 'failed') and 'message'.
+    """
+    use_login(login_id)
+    try:
+        inputs = []
+        for update in updates:
+            fields = {"id": update.ticket_id}
+            if update.title:
+                fields["name"] = update.title
+            if update.content:
+                fields["content"] = update.content
+            inputs.append(fields)
+        return await bulk_request("PUT", "Ticket", inputs)
+    except Exception as e:
+        raise ToolError(f"Error updating tickets: {e}")
+
+
+@mcp.tool()
+async def glpi_add_ticket_followups(followups: list[TicketFollowup], login_id: str = "") -> dict:
+    """
+    Adds follow-up messages to several existing tickets in GLPI at once.
+
+    Args:
+        followups (list): The follow-ups, each with a 'ticket_id' and a 'content'.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
+
+    Returns:
+        dict: overall 'status' ('ok', 'partial' or 'failed'), 'succeeded' and 'failed' counts, GLPI 'errors'
+        and, for each follow-up in order, its 'id', 'status' ('created' or 'failed') and 'message'.
+    """
+    use_login(login_id)
+    try:
+        return await bulk_request("POST", "ITILFollowup", [
+            {"itemtype": "Ticket", "items_id": followup.ticket_id, "content": followup.content} for followup in followups
+        ])
+    except Exception as e:
+        raise ToolError(f"Error adding followups to tickets: {e}")
+
+
+@mcp.tool()
+async def glpi_solve_tickets(ticket_ids: list[int], login_id: str = "") -> dict:
+    """
+    Marks several tickets in GLPI as solved at once, e.g. after an incident.
+
+    Args:
+        ticket_ids (list[int]): The unique identifiers of the tickets to mark as solved.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
+
+    Returns:
+        dict: overall 'status' ('ok', 'partial' or 'failed'), 'succeeded' and 'failed' counts, GLPI 'errors'
+        and, for each ticket in order, its 'id', 'status' ('updated' or 'failed') and 'message'.
+    """
+    use_login(login_id)
+    try:
+        return await bulk_request("PUT", "Ticket", [{"id": ticket_id, "status": TICKET_SOLVED} for ticket_id in ticket_ids])
+    except Exception as e:
+        raise ToolError(f"Error solving tickets: {e}")
+
+
+@mcp.tool()
+async def glpi_close_tickets(ticket_ids: list[int], login_id: str = "") -> dict:
+    """
+    Marks several tickets in GLPI as closed at once, e.g. after an incident.
+
+    Args:
+        ticket_ids (list[int]): The unique identifiers of the tickets to mark as closed.
+        login_id (str): The login_id returned by glpi_login. Not needed on a stateful MCP session.
+
+    Returns:
+        dict: overall 'status' ('ok', 'partial' or 'failed'), 'succeeded' and 'failed' counts, GLPI 'errors'
+        and, for each ticket in order, its 'id', 'status' ('updated' or 'failed') and 'message'.
+    """
+    use_login(login_id)
+    try:
+        return await bulk_request("PUT", "Ticket", [{"id": ticket_id, "status": TICKET_CLOSED} for ticket_id in ticket_ids])
+    except Exception as e:
+        raise ToolError(f"Error closing tickets: {e}")
+
+
 def run():
     """Runs the MCP server."""
     mcp.run()
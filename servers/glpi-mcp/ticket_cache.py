@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+
+class CachedTicket(NamedTuple):
+    ticket: dict
+    expires_at: float
+
+
+class TicketCache:
+    """
+    Bounded TTL + LRU read-through cache of GLPI tickets, keyed on (GLPI URL, session identity, ticket ID).
+
+    Tickets are cached per session identity, since GLPI rights differ between users. Writes to a
+    ticket invalidate it for every identity. It is used from the event loop of the server, so it
+    needs no lock: only the fetch awaits, and a write landing during a fetch keeps its result out.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        # (GLPI URL, ticket ID) -> keys of its cached entries, to invalidate every identity at once
+        self._keys_by_ticket = {}
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = self.bypasses = 0
+        # Bumped by every write, so reads racing with a write are not cached
+        self._generation = 0
+
+    def _drop(self, key: tuple):
+        del self._entries[key]
+        keys = self._keys_by_ticket.get((key[0], key[2]))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_ticket[(key[0], key[2])]
+
+    async def get(self, glpi_url: str, identity: str, ticket_id: int, fetch, bypass_cache: bool = False) -> dict:
+        """Returns a ticket from the cache, or from the fetch coroutine function (and caches it)."""
+        if bypass_cache:
+            self.bypasses += 1
+        if self.max_size <= 0 or bypass_cache:
+            return await fetch()
+        key = (glpi_url, identity, ticket_id)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= self.clock():
+            self._drop(key)
+            self.expirations += 1
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.ticket
+        self.misses += 1
+
+        generation = self._generation
+        ticket = await fetch()
+        if generation == self._generation:
+            self._entries[key] = CachedTicket(ticket, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            self._keys_by_ticket.setdefault((glpi_url, ticket_id), set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return ticket
+
+    def invalidate(self, glpi_url: str, ticket_ids: list[int]):
+        """Drops the given tickets for every session identity, after they were written to."""
+        self._generation += 1
+        for ticket_id in ticket_ids:
+            for key in list(self._keys_by_ticket.get((glpi_url, ticket_id), ())):
+                self._drop(key)
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        """Returns the cache counters, to size the cache."""
+        reads = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / reads if reads else 0.0,
+            "bypasses": self.bypasses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
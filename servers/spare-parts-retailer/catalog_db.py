@@ -0,0 +1,464 @@
+"""
+SQLite catalog backend for the spare parts retailer.
+
+The catalog is converted offline into an indexed SQLite file, which the server opens in
+milliseconds and reads through the OS page cache instead of parsing it at import time:
+
+    python catalog_db.py catalog.py catalog.db
+    python catalog_db.py parts.json catalog.db
+    python catalog_db.py parts.csv catalog.db
+
+JSON sources hold a list of parts shaped like SPARE_PARTS_CATALOG. CSV sources have the columns
+name, type, reference_id, model, start_year, end_year and stock, plus optional translation
+columns named <field>_<language> (e.g. name_fr, type_fr, model_fr).
+"""
+import argparse
+import csv
+import importlib.util
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+from catalog_index import CatalogIndex, LanguageIndex, normalize_reference, translated_terms
+
+# Pseudo-language of the untranslated terms, used for languages absent from the catalog
+BASE_LANGUAGE = ""
+
+SCHEMA = """
+CREATE TABLE parts (
+    row INTEGER PRIMARY KEY,
+    reference_id TEXT NOT NULL,
+    reference_key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    model TEXT NOT NULL,
+    start_year INTEGER NOT NULL,
+    end_year INTEGER NOT NULL,
+    stock INTEGER NOT NULL
+);
+CREATE TABLE translations (
+    row INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    name TEXT,
+    type TEXT,
+    model TEXT,
+    PRIMARY KEY (row, language)
+) WITHOUT ROWID;
+CREATE TABLE part_terms (
+    language TEXT NOT NULL,
+    type_term TEXT NOT NULL,
+    model_term TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    PRIMARY KEY (language, type_term, model_term, row)
+) WITHOUT ROWID;
+CREATE INDEX part_terms_model ON part_terms (language, model_term);
+CREATE INDEX part_terms_row ON part_terms (row);
+CREATE TABLE languages (language TEXT PRIMARY KEY);
+CREATE TABLE catalog_version (version INTEGER NOT NULL);
+INSERT INTO catalog_version (version) VALUES (0);
+CREATE TABLE catalog_changes (
+    version INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    type_term TEXT NOT NULL,
+    model_term TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX catalog_changes_version ON catalog_changes (version);
+CREATE TABLE orders (
+    idempotency_key TEXT PRIMARY KEY,
+    reference_key TEXT NOT NULL,
+    customer_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    stock INTEGER NOT NULL
+);
+CREATE TABLE batch_orders (
+    idempotency_key TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    lines TEXT NOT NULL,
+    stocks TEXT NOT NULL
+);
+"""
+
+# The catalog version is bumped by every part added or removed, which logs the match terms it
+# added (+1) or removed (-1) in catalog_changes, so that the workers sharing the file update their
+# vocabularies instead of reloading them. The changes of the last CATALOG_CHANGES_KEPT versions are
+# kept: a worker further behind reloads its vocabularies.
+CATALOG_CHANGES_KEPT = 10_000
+
+PART_COLUMNS = "row, reference_id, name, type, model, start_year, end_year"
+
+
+def insert_part(connection: sqlite3.Connection, part: Mapping, languages: list[str]) -> int:
+    """Inserts a part with its translations and match terms, and returns its row ID."""
+    compatibility = part["compatibility"]
+    row = connection.execute(
+        "INSERT INTO parts (reference_id, reference_key, name, type, model, start_year, end_year, stock) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (part["reference_id"], normalize_reference(part["reference_id"]), part["name"], part["type"],
+         compatibility["model"], compatibility["start_year"], compatibility["end_year"], part["stock"]),
+    ).lastrowid
+    for language, translation in part.get("translations", {}).items():
+        connection.execute(
+            "INSERT INTO translations (row, language, name, type, model) VALUES (?, ?, ?, ?, ?)",
+            (row, language, translation.get("name"), translation.get("type"), translation.get("model")),
+        )
+    for language in [BASE_LANGUAGE, *languages]:
+        connection.execute(
+            "INSERT INTO part_terms (language, type_term, model_term, row) VALUES (?, ?, ?, ?)",
+            (language, *translated_terms(part, language), row),
+        )
+    return row
+
+
+def build_catalog_db(parts: list[dict], path: str):
+    """Writes the parts into a new SQLite catalog file, replacing any existing one."""
+    if os.path.exists(path):
+        os.remove(path)
+    languages = sorted({language for part in parts for language in part.get("translations", {})})
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.executescript(SCHEMA)
+        connection.executemany("INSERT INTO languages (language) VALUES (?)", [(language,) for language in languages])
+        for part in parts:
+            insert_part(connection, part, languages)
+    connection.execute("ANALYZE")
+    # Lets the workers sharing the file read while one of them writes
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.close()
+
+
+def read_parts(source: str) -> list[dict]:
+    """Reads catalog parts from a catalog.py-like module, a JSON file or a CSV file."""
+    extension = os.path.splitext(source)[1].lower()
+    if extension == ".py":
+        spec = importlib.util.spec_from_file_location("catalog_source", source)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.SPARE_PARTS_CATALOG
+    if extension == ".json":
+        with open(source, "r", encoding="utf-8") as f:
+            return json.load(f)
+    if extension == ".csv":
+        with open(source, "r", encoding="utf-8", newline="") as f:
+            return [csv_row_to_part(row) for row in csv.DictReader(f)]
+    raise ValueError(f"Unsupported catalog source: {source}. Use a .py, .json or .csv file.")
+
+
+def csv_row_to_part(row: dict) -> dict:
+    """Converts a flat CSV row into a catalog part."""
+    translations = {}
+    for column, value in row.items():
+        field, _, language = column.partition("_")
+        if language and field in ("name", "type", "model") and value:
+            translations.setdefault(language, {})[field] = value
+    return {
+        "name": row["name"],
+        "type": row["type"],
+        "reference_id": row["reference_id"],
+        "compatibility": {"model": row["model"], "start_year": int(row["start_year"]), "end_year": int(row["end_year"])},
+        "stock": int(row["stock"]),
+        "translations": translations,
+    }
+
+
+class SqliteCatalog:
+    """
+    Connection to a SQLite catalog file, shared by the catalog view and its index.
+
+    Opening the file writes nothing, the schema is created by build_catalog_db. With read_only,
+    the file is opened read-only: lookups work, adding or removing parts and orders do not.
+    """
+
+    def __init__(self, path: str, read_only: bool = False):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Catalog database {path} not found. Build it with: python catalog_db.py catalog.py {path}")
+        uri = f"file:{path}?mode=ro" if read_only else f"file:{path}"
+        self.connection = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+        # Several workers may share the file, wait for their write transactions to finish
+        self.connection.execute("PRAGMA busy_timeout=10000")
+        self.lock = threading.Lock()
+        tables = {name for name, in self.query("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "catalog_changes" not in tables:
+            raise RuntimeError(f"Catalog database {path} was built by an older version. Rebuild it with: python catalog_db.py catalog.py {path}")
+        self.languages = [language for language, in self.query("SELECT language FROM languages")]
+
+    def query(self, sql: str, parameters=()) -> list[tuple]:
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def execute(self, sql: str, parameters=()) -> sqlite3.Cursor:
+        with self.lock:
+            return self.connection.execute(sql, parameters)
+
+    def version(self) -> int:
+        """Returns the catalog version, which changes whenever any worker adds or removes a part."""
+        return self.query("SELECT version FROM catalog_version")[0][0]
+
+    def changes(self, since: int) -> tuple[int, list[tuple]] | None:
+        """
+        Returns the catalog version with the (version, language, type term, model term, count)
+        changes of the match terms after version since, or None when they are no longer all kept.
+        """
+        with self.snapshot() as connection:
+            version = connection.execute("SELECT version FROM catalog_version").fetchone()[0]
+            changes = connection.execute(
+                "SELECT version, language, type_term, model_term, count FROM catalog_changes WHERE version > ? ORDER BY rowid",
+                (since,),
+            ).fetchall()
+        if version > since and (not changes or changes[0][0] != since + 1):
+            return None
+        return version, changes
+
+    def _log_changes(self, connection: sqlite3.Connection, row: int, count: int):
+        """Bumps the catalog version and logs the match terms of a part, added (count 1) or removed (-1)."""
+        connection.execute("UPDATE catalog_version SET version = version + 1")
+        version = connection.execute("SELECT version FROM catalog_version").fetchone()[0]
+        connection.execute(
+            "INSERT INTO catalog_changes (version, language, type_term, model_term, count) "
+            "SELECT ?, language, type_term, model_term, ? FROM part_terms WHERE row = ?",
+            (version, count, row),
+        )
+        connection.execute("DELETE FROM catalog_changes WHERE version <= ?", (version - CATALOG_CHANGES_KEPT,))
+
+    def part(self, values: tuple) -> "SqlitePartView":
+        return SqlitePartView(self, *values)
+
+    def parts(self, where: str = "", parameters=()) -> list["SqlitePartView"]:
+        rows = self.query(f"SELECT {PART_COLUMNS} FROM parts {where}", parameters)
+        return [self.part(values) for values in rows]
+
+    @contextmanager
+    def snapshot(self):
+        """Runs queries in one read transaction, so that they see the same version of the catalog."""
+        with self.lock:
+            self.connection.execute("BEGIN")
+            try:
+                yield self.connection
+            finally:
+                self.connection.execute("COMMIT")
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def add_part(self, part: Mapping) -> int:
+        with self.transaction() as connection:
+            row = insert_part(connection, part, self.languages)
+            self._log_changes(connection, row, 1)
+            return row
+
+    def remove_part(self, row: int):
+        with self.transaction() as connection:
+            self._log_changes(connection, row, -1)
+            for table in ("parts", "translations", "part_terms"):
+                connection.execute(f"DELETE FROM {table} WHERE row = ?", (row,))
+
+
+class SqliteTranslationsView(Mapping):
+    """Translations of a part, fetched from the database on first access."""
+
+    __slots__ = ("_db", "_row", "_translations")
+
+    def __init__(self, db: SqliteCatalog, row: int):
+        self._db = db
+        self._row = row
+        self._translations = None
+
+    def _load(self) -> dict:
+        if self._translations is None:
+            rows = self._db.query("SELECT language, name, type, model FROM translations WHERE row = ?", (self._row,))
+            self._translations = {
+                language: {key: value for key, value in zip(("name", "type", "model"), values) if value is not None}
+                for language, *values in rows
+            }
+        return self._translations
+
+    def __getitem__(self, language: str) -> dict:
+        return self._load()[language]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+
+class SqlitePartView(Mapping):
+    """Dict-like part read from the database. The stock is read and written live."""
+
+    __slots__ = ("_db", "row", "_data")
+
+    def __init__(self, db: SqliteCatalog, row: int, reference_id: str, name: str, part_type: str, car_model: str, start_year: int, end_year: int):
+        self._db = db
+        self.row = row
+        self._data = {
+            "name": name,
+            "type": part_type,
+            "reference_id": reference_id,
+            "compatibility": {"model": car_model, "start_year": start_year, "end_year": end_year},
+        }
+
+    def __getitem__(self, key: str):
+        if key == "stock":
+            rows = self._db.query("SELECT stock FROM parts WHERE row = ?", (self.row,))
+            if not rows:
+                raise KeyError(key)
+            return rows[0][0]
+        if key == "translations":
+            return SqliteTranslationsView(self._db, self.row)
+        return self._data[key]
+
+    def __setitem__(self, key: str, value):
+        if key != "stock":
+            raise TypeError(f"SQLite catalog parts are read-only, except for 'stock' (got '{key}').")
+        self._db.execute("UPDATE parts SET stock = ? WHERE row = ?", (value, self.row))
+
+    def __iter__(self):
+        return iter((*self._data, "stock", "translations"))
+
+    def __len__(self):
+        return len(self._data) + 2
+
+    def __eq__(self, other):
+        if isinstance(other, SqlitePartView):
+            return self._db is other._db and self.row == other.row
+        return super().__eq__(other)
+
+    __hash__ = None
+
+
+class SqliteCatalogView:
+    """List-like view of a SQLite catalog, compatible with the SPARE_PARTS_CATALOG list of dicts."""
+
+    def __init__(self, db: SqliteCatalog):
+        self.db = db
+
+    def __len__(self):
+        return self.db.query("SELECT COUNT(*) FROM parts")[0][0]
+
+    def __getitem__(self, index: int) -> SqlitePartView:
+        order, offset = ("DESC", -index - 1) if index < 0 else ("ASC", index)
+        parts = self.db.parts(f"ORDER BY row {order} LIMIT 1 OFFSET ?", (offset,))
+        if not parts:
+            raise IndexError("catalog index out of range")
+        return parts[0]
+
+    def __iter__(self):
+        return iter(self.db.parts("ORDER BY row"))
+
+    def append(self, part: Mapping):
+        self.db.add_part(part)
+
+    def remove(self, part: SqlitePartView):
+        self.db.remove_part(part.row)
+
+
+class SqliteCatalogIndex(CatalogIndex):
+    """
+    Catalog index backed by the SQLite catalog.
+
+    Only the vocabulary of a language is held in memory, loaded on its first lookup (or at
+    startup for the given languages). Postings, year ranges and reference IDs are resolved by
+    indexed SQL queries, so opening the catalog costs no scan of the parts.
+
+    Several workers may share the catalog file: each lookup checks the catalog version, and after
+    a part was added or removed, by this worker or another, the logged changes of the match terms
+    are applied to the loaded vocabularies.
+    """
+
+    def __init__(self, catalog: SqliteCatalogView, threshold: int, engine: str | None = None, languages: list[str] | None = None):
+        super().__init__([], threshold, engine, languages=[])
+        self.db = catalog.db
+        # Catalog version the vocabularies were last synced to, and the version of each vocabulary
+        self._version = self.db.version()
+        self._versions = {}
+        for language in languages or ():
+            self._language_index(language)
+
+    def catalog_version(self) -> int:
+        return self.db.version()
+
+    def _language_index(self, language: str) -> LanguageIndex:
+        if self.db.version() != self._version:
+            with self._lock:
+                self._sync()
+        return super()._language_index(language)
+
+    def _sync(self):
+        """Applies the changes made to the catalog to the loaded vocabularies, or reloads them if the changes are gone."""
+        synced = self.db.changes(min(self._versions.values(), default=self._version))
+        if synced is None:
+            # Reloaded from the database on their next use
+            self._languages, self._versions = {}, {}
+            self._version = self.db.version()
+            return
+        self._version, changes = synced
+        for version, language, type_term, model_term, count in changes:
+            # A vocabulary loaded after the change already has it
+            if language in self._languages and version > self._versions[language]:
+                self._languages[language].count_terms(type_term, model_term, count)
+        for language in self._versions:
+            self._versions[language] = max(self._versions[language], self._version)
+
+    def _indexed_language(self, language: str) -> str:
+        return language if language in self.db.languages else BASE_LANGUAGE
+
+    def _build_language_index(self, language: str) -> LanguageIndex:
+        index = LanguageIndex(language)
+        with self.db.snapshot() as connection:
+            self._versions[language] = connection.execute("SELECT version FROM catalog_version").fetchone()[0]
+            vocabularies = [
+                (connection.execute(f"SELECT {column}, COUNT(*) FROM part_terms WHERE language = ? GROUP BY {column}", (language,)).fetchall(), terms, grams)
+                for column, terms, grams in (("type_term", index.types, index.type_grams), ("model_term", index.models, index.model_grams))
+            ]
+        for rows, terms, grams in vocabularies:
+            for term, count in rows:
+                terms[term] = count
+                grams.add(term)
+        return index
+
+    def get_part(self, reference_id: str) -> SqlitePartView | None:
+        parts = self.db.parts("WHERE reference_key = ?", (normalize_reference(reference_id),))
+        return parts[0] if parts else None
+
+    def add_part(self, part: Mapping):
+        """Nothing to do: inserting the part logged its terms, applied on the next lookup."""
+
+    def remove_part(self, reference_id: str):
+        """Nothing to do: deleting the part logs its terms, applied on the next lookup."""
+
+    def _matching_parts(self, index: LanguageIndex, matched_types: list[str], matched_models: set[str], year: int | None) -> list[dict]:
+        where = (
+            "WHERE row IN (SELECT row FROM part_terms WHERE language = ? "
+            "AND type_term IN (SELECT value FROM json_each(?)) AND model_term IN (SELECT value FROM json_each(?)))"
+        )
+        parameters = [index.language, json.dumps(matched_types), json.dumps(list(matched_models))]
+        if year is not None:
+            where += " AND start_year <= ? AND end_year >= ?"
+            parameters += [year, year]
+        return self.db.parts(where + " ORDER BY row", parameters)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the SQLite spare parts catalog from catalog.py, JSON or CSV.")
+    parser.add_argument("source", help="Catalog source: a .py module defining SPARE_PARTS_CATALOG, a .json or a .csv file.")
+    parser.add_argument("output", nargs="?", default="catalog.db", help="SQLite file to write (default: catalog.db).")
+    args = parser.parse_args()
+
+    parts = read_parts(args.source)
+    build_catalog_db(parts, args.output)
+    print(f"Wrote {len(parts)} parts to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
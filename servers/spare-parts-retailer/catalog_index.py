@@ -0,0 +1,307 @@
+import os
+import threading
+from typing import NamedTuple
+
+from matching import TrigramIndex, create_matcher, process_text
+
+# Number of candidates shortlisted by the trigram index before exact rescoring
+PREFILTER_TOP_K = int(os.getenv("PREFILTER_TOP_K", "50"))
+# Language of the untranslated terms, used for the languages the catalog has no translations for
+DEFAULT_LANGUAGE = "en"
+
+
+def normalize_term(text: str) -> str:
+    """Normalizes a part type or car model for indexing, as the fuzzy scorers would."""
+    return process_text(text)
+
+
+def normalize_reference(reference_id: str) -> str:
+    """Normalizes a reference ID for lookups (case and whitespace insensitive)."""
+    return "".join(reference_id.split()).upper()
+
+
+def translated_terms(part: dict, language: str) -> tuple[str, str]:
+    """Returns the (type, model) of a part in the given language, falling back to English."""
+    translation = part.get("translations", {}).get(language, {})
+    part_type = translation.get("type", part["type"])
+    car_model = translation.get("model", part["compatibility"]["model"])
+    return normalize_term(part_type), normalize_term(car_model)
+
+
+def compatibility_years(part: dict) -> tuple[int, int]:
+    """Returns the (start_year, end_year) range of vehicle years a part is compatible with."""
+    return part["compatibility"]["start_year"], part["compatibility"]["end_year"]
+
+
+class IntervalIndex:
+    """
+    Centered interval tree mapping keys to values valid over a closed [start, end] range.
+
+    Stabbing queries cost O(log n + k). The tree is rebuilt on the first query after a change,
+    which keeps catalog mutations cheap.
+    """
+
+    def __init__(self):
+        self.items = {}
+        self._ranges = {}
+        self._tree = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, key, start: int, end: int, value):
+        self.items[key] = value
+        self._ranges[key] = (start, end)
+        self._tree = None
+
+    def remove(self, key):
+        if self.items.pop(key, None) is not None:
+            del self._ranges[key]
+            self._tree = None
+
+    @staticmethod
+    def _build(intervals: list) -> tuple | None:
+        if not intervals:
+            return None
+        endpoints = sorted(point for start, end, _ in intervals for point in (start, end))
+        center = endpoints[len(endpoints) // 2]
+        left = [interval for interval in intervals if interval[1] < center]
+        right = [interval for interval in intervals if interval[0] > center]
+        overlapping = [interval for interval in intervals if interval[0] <= center <= interval[1]]
+        by_start = sorted((start, key) for start, _, key in overlapping)
+        by_end = sorted(((end, key) for _, end, key in overlapping), reverse=True)
+        return center, by_start, by_end, IntervalIndex._build(left), IntervalIndex._build(right)
+
+    def build(self):
+        """Builds the interval tree now rather than on the next query."""
+        self._tree = self._build([(start, end, key) for key, (start, end) in self._ranges.items()])
+
+    def stab(self, point: int) -> dict:
+        """Returns the {key: value} items whose range contains the point."""
+        if self._tree is None:
+            self.build()
+        found = {}
+        node = self._tree
+        while node is not None:
+            center, by_start, by_end, left, right = node
+            if point < center:
+                for start, key in by_start:
+                    if start > point:
+                        break
+                    found[key] = self.items[key]
+                node = left
+            else:
+                for end, key in by_end:
+                    if end < point:
+                        break
+                    found[key] = self.items[key]
+                node = right if point > center else None
+        return found
+
+
+class LanguageIndex:
+    """Distinct types and models of the catalog in one language, with postings to their parts."""
+
+    def __init__(self, language: str):
+        self.language = language
+        # Distinct normalized terms with the number of parts using them, and their trigrams
+        self.types = {}
+        self.models = {}
+        self.type_grams = TrigramIndex()
+        self.model_grams = TrigramIndex()
+        # type -> models seen with that type, (type, model) -> parts indexed by compatibility years
+        self.models_by_type = {}
+        self.postings = {}
+        # Bumped when a term enters or leaves the vocabulary, which invalidates the neighbourhoods
+        self.vocabulary_version = 0
+        # Matched term -> (vocabulary version, terms close to it), for types and models
+        self.type_neighbours = {}
+        self.model_neighbours = {}
+
+    def count_terms(self, part_type: str, car_model: str, count: int):
+        """Adds count (possibly negative) usages of a type and a model to the vocabulary."""
+        for terms, grams, term in ((self.types, self.type_grams, part_type), (self.models, self.model_grams, car_model)):
+            if term not in terms:
+                terms[term] = 0
+                grams.add(term)
+                self.vocabulary_version += 1
+            terms[term] += count
+            if not terms[term]:
+                del terms[term]
+                grams.remove(term)
+                self.vocabulary_version += 1
+
+    def add(self, seq: int, part: dict):
+        part_type, car_model = translated_terms(part, self.language)
+        self.count_terms(part_type, car_model, 1)
+        self.models_by_type.setdefault(part_type, set()).add(car_model)
+        self.postings.setdefault((part_type, car_model), IntervalIndex()).add(seq, *compatibility_years(part), part)
+
+    def remove(self, seq: int, part: dict):
+        part_type, car_model = translated_terms(part, self.language)
+        posting = self.postings.get((part_type, car_model))
+        if posting is None or seq not in posting.items:
+            return
+        posting.remove(seq)
+        if not posting:
+            del self.postings[(part_type, car_model)]
+            self.models_by_type[part_type].discard(car_model)
+            if not self.models_by_type[part_type]:
+                del self.models_by_type[part_type]
+        self.count_terms(part_type, car_model, -1)
+
+
+class LookupResult(NamedTuple):
+    """Parts found by a lookup, with the best (term, score) matched for the part type and the car model."""
+    parts: list[dict]
+    part_type_match: tuple[str, int] | None
+    car_model_match: tuple[str, int] | None
+
+
+class CatalogIndex:
+    """
+    Multilingual match index over the spare parts catalog.
+
+    The index is built once per language and kept up to date with add_part/remove_part,
+    so a lookup only fuzzy-matches the distinct vocabulary of the language and then
+    intersects postings, instead of scanning every part of the catalog.
+    """
+
+    def __init__(self, parts: list[dict], threshold: int, engine: str | None = None, languages: list[str] | None = None):
+        """
+        Indexes the parts up front in the given languages, by default only English (the base
+        language), so that other translations are not loaded until requested. Other languages
+        of the catalog are indexed on their first lookup, and languages it has no translations
+        for are looked up in the English index.
+        """
+        self.matcher = create_matcher(threshold, engine)
+        self._next_seq = 0
+        # Normalized reference_id -> (seq, part); seq keeps the catalog order for results
+        self._entries = {}
+        self._languages = {}
+        # Languages with translations in the catalog, plus the default language
+        self._catalog_languages = {DEFAULT_LANGUAGE}
+        # Serializes catalog changes with the build of a language index on first use
+        self._lock = threading.RLock()
+        for part in parts:
+            self._catalog_languages.update(part.get("translations", {}))
+        if languages is None:
+            languages = [DEFAULT_LANGUAGE]
+        for language in dict.fromkeys(map(self._indexed_language, languages)):
+            self._languages[language] = LanguageIndex(language)
+        for part in parts:
+            self.add_part(part)
+        # Build the year interval trees with the catalog rather than on the first query
+        for index in self._languages.values():
+            for posting in index.postings.values():
+                posting.build()
+
+    def catalog_version(self) -> int:
+        """Returns the version of the catalog, which changes when a worker sharing it changes it (constant in memory)."""
+        return 0
+
+    def _indexed_language(self, language: str) -> str:
+        """Returns the language a lookup is indexed under: the default language if the catalog has no such translations."""
+        return language if language in self._catalog_languages else DEFAULT_LANGUAGE
+
+    def _build_language_index(self, language: str) -> LanguageIndex:
+        index = LanguageIndex(language)
+        for seq, part in self._entries.values():
+            index.add(seq, part)
+        return index
+
+    def _language_index(self, language: str) -> LanguageIndex:
+        """Returns the index of a language, building it on first use."""
+        language = self._indexed_language(language)
+        index = self._languages.get(language)
+        if index is None:
+            with self._lock:
+                # Another thread may have built the index while this one waited
+                index = self._languages.get(language)
+                if index is None:
+                    index = self._languages[language] = self._build_language_index(language)
+        return index
+
+    def add_part(self, part: dict):
+        """Indexes a new part, replacing any part with the same reference ID."""
+        with self._lock:
+            self.remove_part(part["reference_id"])
+            seq = self._next_seq
+            self._next_seq += 1
+            self._entries[normalize_reference(part["reference_id"])] = (seq, part)
+            self._catalog_languages.update(part.get("translations", {}))
+            for index in self._languages.values():
+                index.add(seq, part)
+
+    def remove_part(self, reference_id: str):
+        """Removes a part from the index, if present."""
+        with self._lock:
+            entry = self._entries.pop(normalize_reference(reference_id), None)
+            if entry is None:
+                return
+            for index in self._languages.values():
+                index.remove(*entry)
+
+    def part_terms(self, part: dict, language: str) -> tuple[str, str]:
+        """Returns the normalized (type, model) a part is indexed under in a language."""
+        return translated_terms(part, self._indexed_language(language))
+
+    def get_part(self, reference_id: str) -> dict | None:
+        """Returns the part with the given reference ID, ignoring case and whitespace."""
+        entry = self._entries.get(normalize_reference(reference_id))
+        return entry[1] if entry else None
+
+    def _best_match(self, query: str, terms: dict, grams: TrigramIndex) -> tuple[str, int] | None:
+        """Returns the best (term, score) for the query, rescoring a trigram shortlist first on large vocabularies."""
+        if len(terms) > PREFILTER_TOP_K:
+            match = self.matcher.best_match(query, grams.shortlist(query, PREFILTER_TOP_K))
+            if match:
+                return match
+            # Recall safeguard: fuzzy matches may share few trigrams with the query, scan everything
+        return self.matcher.best_match(query, list(terms))
+
+    def match(self, part_type: str, car_model: str, language: str = "en", year: int | None = None) -> LookupResult:
+        """Matches a part type and a car model, returning the matching parts with the best matched terms."""
+        index = self._language_index(language)
+        part_type_match = self._best_match(part_type, index.types, index.type_grams)
+        car_model_match = self._best_match(car_model, index.models, index.model_grams)
+        if not part_type_match or not car_model_match:
+            return LookupResult([], part_type_match, car_model_match)
+
+        # Parts match when their terms are close to the best matched terms
+        matched_types = self._close_matches(index, part_type_match[0], index.types, index.type_neighbours)
+        matched_models = set(self._close_matches(index, car_model_match[0], index.models, index.model_neighbours))
+        parts = self._matching_parts(index, matched_types, matched_models, year)
+        return LookupResult(parts, part_type_match, car_model_match)
+
+    def _close_matches(self, index: LanguageIndex, term: str, terms: dict, neighbours: dict) -> list[str]:
+        """
+        Returns the terms close to a matched term, scoring the whole vocabulary only once per term.
+
+        Many queries resolve to the same matched term, so its neighbourhood is kept until a term
+        enters or leaves the vocabulary, and results stay those of a full scan.
+        """
+        version = index.vocabulary_version
+        cached = neighbours.get(term)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        matches = self.matcher.close_matches(term, list(terms))
+        neighbours[term] = (version, matches)
+        return matches
+
+    def lookup(self, part_type: str, car_model: str, language: str = "en", year: int | None = None) -> list[dict]:
+        """
+        Returns the parts matching a part type and a car model, in catalog order.
+
+        When a year is given, only parts compatible with that vehicle model year are returned.
+        """
+        return self.match(part_type, car_model, language, year).parts
+
+    def _matching_parts(self, index: LanguageIndex, matched_types: list[str], matched_models: set[str], year: int | None) -> list[dict]:
+        """Returns the parts of the postings of the matched (type, model) pairs, in catalog order."""
+        matches = {}
+        for matched_type in matched_types:
+            for matched_model in index.models_by_type[matched_type] & matched_models:
+                posting = index.postings[(matched_type, matched_model)]
+                matches.update(posting.items if year is None else posting.stab(year))
+        return [matches[seq] for seq in sorted(matches)]
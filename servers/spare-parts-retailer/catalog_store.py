@@ -0,0 +1,256 @@
+import marshal
+import os
+import threading
+from array import array
+from collections.abc import Mapping
+
+# Marks a missing translation in the translation columns
+NO_STRING = 0xFFFFFFFF
+
+
+class ColumnarCatalog:
+    """
+    Compact, array-backed spare parts catalog.
+
+    Repeated strings (names, types, models, translations) are interned in a single string
+    table and parts are stored as columns of string IDs, years and stock counts. Translations
+    are kept as one marshal blob per language and only decoded when that language is first
+    requested. Use view() to get the list-of-dicts interface of SPARE_PARTS_CATALOG.
+    """
+
+    def __init__(self):
+        self._strings = []
+        self._string_ids = {}
+        self.reference_ids = []
+        self.names = array("I")
+        self.types = array("I")
+        self.models = array("I")
+        self.start_years = array("H")
+        self.end_years = array("H")
+        self.stock = array("l")
+        # Languages available in the catalog, decoded translation columns and pending blobs
+        self.languages = []
+        self._translations = {}
+        self._translation_blobs = {}
+        # Serializes the decoding of a language, which concurrent tool calls may request together
+        self._translations_lock = threading.Lock()
+        # Row IDs of the parts in catalog order (removed rows are left out)
+        self.rows = []
+
+    @classmethod
+    def from_parts(cls, parts) -> "ColumnarCatalog":
+        """Builds a columnar catalog from part dicts, as found in catalog.py."""
+        store = cls()
+        translations = {}
+        for row, part in enumerate(parts):
+            store._append_row(part)
+            for language, translation in part.get("translations", {}).items():
+                column = translations.setdefault(language, [])
+                column.extend([None] * (row - len(column)))
+                column.append((translation.get("name"), translation.get("type"), translation.get("model")))
+        for language, column in translations.items():
+            column.extend([None] * (len(store.rows) - len(column)))
+            store.add_translations(language, marshal.dumps(column))
+        return store
+
+    def intern(self, text: str | None) -> int:
+        """Returns the ID of a string in the string table, adding it if needed."""
+        if text is None:
+            return NO_STRING
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            string_id = self._string_ids[text] = len(self._strings)
+            self._strings.append(text)
+        return string_id
+
+    def string(self, string_id: int) -> str | None:
+        return None if string_id == NO_STRING else self._strings[string_id]
+
+    def _append_row(self, part: dict) -> int:
+        row = len(self.reference_ids)
+        compatibility = part["compatibility"]
+        self.reference_ids.append(part["reference_id"])
+        self.names.append(self.intern(part["name"]))
+        self.types.append(self.intern(part["type"]))
+        self.models.append(self.intern(compatibility["model"]))
+        self.start_years.append(compatibility["start_year"])
+        self.end_years.append(compatibility["end_year"])
+        self.stock.append(part["stock"])
+        self.rows.append(row)
+        return row
+
+    def add_translations(self, language: str, blob: bytes):
+        """Registers the marshal blob of a language: a list of (name, type, model) or None per row."""
+        if language not in self.languages:
+            self.languages.append(language)
+        self._translation_blobs[language] = blob
+
+    def translation_columns(self, language: str) -> tuple[array, array, array] | None:
+        """Returns the (name, type, model) string ID columns of a language, decoding it on first use."""
+        columns = self._translations.get(language)
+        if columns is None:
+            with self._translations_lock:
+                # Another thread may have decoded the language while this one waited
+                columns = self._translations.get(language)
+                if columns is None:
+                    blob = self._translation_blobs.get(language)
+                    if blob is None:
+                        return None
+                    columns = (array("I"), array("I"), array("I"))
+                    for translation in marshal.loads(blob):
+                        for column, text in zip(columns, translation or (None, None, None)):
+                            column.append(self.intern(text))
+                    self._translations[language] = columns
+                    # Dropped only once the columns are stored, so that no reader finds neither
+                    del self._translation_blobs[language]
+        return columns
+
+    def append(self, part: dict) -> int:
+        """Appends a part and returns its row ID."""
+        # Decode every language first, so the new row lands in the decoded columns
+        for language in self.languages:
+            self.translation_columns(language)
+        row = self._append_row(part)
+        translations = part.get("translations", {})
+        for language in translations:
+            if language not in self.languages:
+                self.languages.append(language)
+                self._translations[language] = tuple(array("I", [NO_STRING] * row) for _ in range(3))
+        for language, columns in self._translations.items():
+            translation = translations.get(language, {})
+            for column, key in zip(columns, ("name", "type", "model")):
+                column.append(self.intern(translation.get(key)))
+        return row
+
+    def remove(self, row: int):
+        """Removes a row from the catalog order. Its columns are kept so that row IDs stay stable."""
+        self.rows.remove(row)
+
+    def view(self) -> "CatalogView":
+        return CatalogView(self)
+
+
+class TranslationsView(Mapping):
+    """Read-only view of the translations of a part, loading each language on first access."""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: ColumnarCatalog, row: int):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, language: str) -> dict:
+        columns = self._store.translation_columns(language) if language in self._store.languages else None
+        if columns is None:
+            raise KeyError(language)
+        translation = {}
+        for key, column in zip(("name", "type", "model"), columns):
+            text = self._store.string(column[self._row])
+            if text is not None:
+                translation[key] = text
+        if not translation:
+            raise KeyError(language)
+        return translation
+
+    def __iter__(self):
+        return iter(self._store.languages)
+
+    def __len__(self):
+        return len(self._store.languages)
+
+
+class PartView(Mapping):
+    """Dict-like view of one part of a columnar catalog. Only the stock can be written."""
+
+    __slots__ = ("_store", "row")
+
+    KEYS = ("name", "type", "reference_id", "compatibility", "stock", "translations")
+
+    def __init__(self, store: ColumnarCatalog, row: int):
+        self._store = store
+        self.row = row
+
+    def __getitem__(self, key: str):
+        store, row = self._store, self.row
+        if key == "name":
+            return store.string(store.names[row])
+        if key == "type":
+            return store.string(store.types[row])
+        if key == "reference_id":
+            return store.reference_ids[row]
+        if key == "compatibility":
+            return {
+                "model": store.string(store.models[row]),
+                "start_year": store.start_years[row],
+                "end_year": store.end_years[row],
+            }
+        if key == "stock":
+            return store.stock[row]
+        if key == "translations":
+            return TranslationsView(store, row)
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        if key != "stock":
+            raise TypeError(f"Columnar catalog parts are read-only, except for 'stock' (got '{key}').")
+        self._store.stock[self.row] = value
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __eq__(self, other):
+        if isinstance(other, PartView):
+            return self._store is other._store and self.row == other.row
+        return super().__eq__(other)
+
+    __hash__ = None
+
+
+class CatalogView:
+    """List-like view of a columnar catalog, compatible with the SPARE_PARTS_CATALOG list of dicts."""
+
+    def __init__(self, store: ColumnarCatalog):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store.rows)
+
+    def __getitem__(self, index: int) -> PartView:
+        return PartView(self.store, self.store.rows[index])
+
+    def __iter__(self):
+        for row in list(self.store.rows):
+            yield PartView(self.store, row)
+
+    def append(self, part: dict):
+        self.store.append(part)
+
+    def remove(self, part: PartView):
+        self.store.remove(part.row)
+
+
+def load_catalog(backend: str | None = None):
+    """
+    Loads the spare parts catalog with the backend selected by `backend` or CATALOG_BACKEND.
+
+    Backends are 'dict' (default, the list of dicts from catalog.py), 'columnar' and 'sqlite'
+    (the prebuilt file at CATALOG_DB, see catalog_db.py). All return a list-like of dict-like parts.
+    """
+    backend = backend or os.getenv("CATALOG_BACKEND", "dict")
+    if backend == "sqlite":
+        # Imported here so that the sqlite backend never imports the catalog.py literal
+        from catalog_db import SqliteCatalog, SqliteCatalogView
+        return SqliteCatalogView(SqliteCatalog(os.getenv("CATALOG_DB", "catalog.db")))
+
+    import catalog
+
+    if backend == "dict":
+        return catalog.SPARE_PARTS_CATALOG
+    if backend == "columnar":
+        # Replace the nested dicts with the compact view, so they can be garbage collected
+        catalog.SPARE_PARTS_CATALOG = ColumnarCatalog.from_parts(catalog.SPARE_PARTS_CATALOG).view()
+        return catalog.SPARE_PARTS_CATALOG
+    raise ValueError(f"Unknown catalog backend: {backend}. Use 'dict', 'columnar' or 'sqlite'.")
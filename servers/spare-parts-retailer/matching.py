@@ -0,0 +1,190 @@
+import heapq
+import logging
+import os
+import re
+import time
+
+from fuzzywuzzy import fuzz as fw_fuzz, process as fw_process
+
+try:
+    from rapidfuzz import fuzz as rf_fuzz, process as rf_process
+except ImportError:  # rapidfuzz is optional, fall back to fuzzywuzzy
+    rf_fuzz = rf_process = None
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, rapidfuzz's parallel cdist needs it
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Threads scoring large vocabularies with rapidfuzz (-1: one per CPU, 1 disables parallel scoring)
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "-1"))
+# Smallest vocabulary scored in parallel: below it, starting the threads costs more than they save
+MATCH_PARALLEL_MIN_CHOICES = int(os.getenv("MATCH_PARALLEL_MIN_CHOICES", "10000"))
+
+# Characters dropped by fuzzywuzzy's scorers (force_ascii=True strips the Latin-1 range)
+_LATIN1_TABLE = {code: None for code in range(128, 256)}
+_NON_WORD = re.compile(r"(?ui)\W")
+
+
+def process_text(text: str) -> str:
+    """
+    Normalizes a string the way fuzzywuzzy's token scorers do before comparing it.
+
+    Vocabularies normalized once with this function score exactly as the raw strings would,
+    so the matching engines can skip processing the choices on every call.
+    """
+    return " ".join(_NON_WORD.sub(" ", text.translate(_LATIN1_TABLE)).lower().split())
+
+
+def trigrams(text: str) -> set[str]:
+    """Returns the trigrams of each word of a normalized string, padded with spaces."""
+    grams = set()
+    for word in text.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to normalized terms, used to shortlist fuzzy match candidates."""
+
+    def __init__(self):
+        self._postings = {}
+
+    def add(self, term: str):
+        for gram in trigrams(term):
+            self._postings.setdefault(gram, set()).add(term)
+
+    def remove(self, term: str):
+        for gram in trigrams(term):
+            terms = self._postings.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._postings[gram]
+
+    def shortlist(self, query: str, k: int) -> list[str]:
+        """Returns the k terms sharing the most trigrams with the query, shorter terms first on ties."""
+        shared = {}
+        for gram in trigrams(process_text(query)):
+            for term in self._postings.get(gram, ()):
+                shared[term] = shared.get(term, 0) + 1
+        return heapq.nsmallest(k, shared, key=lambda term: (-shared[term], len(term)))
+
+
+class FuzzywuzzyMatcher:
+    """Legacy engine: scores each choice with a pure-Python fuzzywuzzy call."""
+
+    name = "fuzzywuzzy"
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+
+    def best_match(self, query: str, choices: list[str]) -> tuple[str, int] | None:
+        """Returns the best (choice, score) for the query, or None below the threshold."""
+        match = fw_process.extractOne(query, choices, scorer=fw_fuzz.token_set_ratio)
+        return match if match and match[1] >= self.threshold else None
+
+    def close_matches(self, term: str, choices: list[str]) -> list[str]:
+        """Returns every choice scoring at least the threshold against the term."""
+        return [choice for choice in choices if fw_fuzz.token_set_ratio(term, choice) >= self.threshold]
+
+
+class RapidfuzzMatcher:
+    """
+    Batched engine: scores a query against the whole vocabulary in one rapidfuzz call.
+
+    Choices are expected to be normalized with process_text. Scores are rounded like
+    fuzzywuzzy's, so FUZZY_MATCH_THRESHOLD keeps the exact same meaning. Vocabularies of at
+    least MATCH_PARALLEL_MIN_CHOICES terms are scored with cdist, split across MATCH_WORKERS threads.
+    """
+
+    name = "rapidfuzz"
+
+    def __init__(self, threshold: int):
+        if rf_process is None:
+            raise RuntimeError("rapidfuzz is not installed. Install it or use the fuzzywuzzy engine.")
+        self.threshold = threshold
+        # Lowest raw score that fuzzywuzzy would round up to the threshold
+        self.score_cutoff = threshold - 0.5
+
+    def _scores(self, query: str, choices: list[str]) -> list[tuple[str, float]]:
+        """Scores every choice on several threads, best first, ties in the order of the choices like extract."""
+        scores = rf_process.cdist(
+            [query], choices, scorer=rf_fuzz.token_set_ratio,
+            score_cutoff=self.score_cutoff, dtype=np.float64, workers=MATCH_WORKERS,
+        )[0]
+        matched = np.flatnonzero(scores >= self.score_cutoff)
+        matched = matched[np.lexsort((matched, -scores[matched]))]
+        return [(choices[i], score) for i, score in zip(matched.tolist(), scores[matched].tolist())]
+
+    def _extract(self, query: str, choices: list[str], limit: int | None) -> list[tuple[str, int]]:
+        query = process_text(query)
+        if np is not None and MATCH_WORKERS != 1 and len(choices) >= MATCH_PARALLEL_MIN_CHOICES:
+            matches = self._scores(query, choices)[:limit]
+        else:
+            matches = [(choice, score) for choice, score, _ in rf_process.extract(
+                query, choices, scorer=rf_fuzz.token_set_ratio, score_cutoff=self.score_cutoff, limit=limit,
+            )]
+        rounded = ((choice, int(round(score))) for choice, score in matches)
+        return [(choice, score) for choice, score in rounded if score >= self.threshold]
+
+    def best_match(self, query: str, choices: list[str]) -> tuple[str, int] | None:
+        """Returns the best (choice, score) for the query, or None below the threshold."""
+        matches = self._extract(query, choices, limit=1)
+        return matches[0] if matches else None
+
+    def close_matches(self, term: str, choices: list[str]) -> list[str]:
+        """Returns every choice scoring at least the threshold against the term."""
+        return [choice for choice, _ in self._extract(term, choices, limit=None)]
+
+
+class CompareMatcher:
+    """Runs the legacy and batched engines side by side and logs any divergence and timings."""
+
+    name = "compare"
+
+    def __init__(self, threshold: int):
+        self.reference = FuzzywuzzyMatcher(threshold)
+        self.candidate = RapidfuzzMatcher(threshold)
+
+    def _run(self, method: str, *args):
+        results = []
+        for engine in (self.reference, self.candidate):
+            start = time.perf_counter()
+            results.append(getattr(engine, method)(*args))
+            results.append(time.perf_counter() - start)
+        reference, reference_time, candidate, candidate_time = results
+        logger.info("%s(%r): fuzzywuzzy %.2f ms, rapidfuzz %.2f ms",
+                    method, args[0], reference_time * 1000, candidate_time * 1000)
+        return reference, candidate
+
+    def best_match(self, query: str, choices: list[str]) -> tuple[str, int] | None:
+        reference, candidate = self._run("best_match", query, choices)
+        # Ties between equally scored choices may resolve differently, only scores must agree
+        if (reference and reference[1]) != (candidate and candidate[1]):
+            logger.warning("best_match(%r) diverges: fuzzywuzzy %r, rapidfuzz %r", query, reference, candidate)
+        return reference
+
+    def close_matches(self, term: str, choices: list[str]) -> list[str]:
+        reference, candidate = self._run("close_matches", term, choices)
+        if set(reference) != set(candidate):
+            logger.warning("close_matches(%r) diverges: fuzzywuzzy %r, rapidfuzz %r", term, reference, candidate)
+        return reference
+
+
+MATCHERS = {matcher.name: matcher for matcher in (FuzzywuzzyMatcher, RapidfuzzMatcher, CompareMatcher)}
+
+
+def create_matcher(threshold: int, engine: str | None = None):
+    """
+    Creates the matching engine selected by `engine` or the MATCH_ENGINE environment variable.
+
+    Engines are 'rapidfuzz' (default when installed), 'fuzzywuzzy' and 'compare'.
+    """
+    engine = engine or os.getenv("MATCH_ENGINE") or ("rapidfuzz" if rf_process else "fuzzywuzzy")
+    if engine not in MATCHERS:
+        raise ValueError(f"Unknown match engine: {engine}. Use one of {', '.join(MATCHERS)}.")
+    return MATCHERS[engine](threshold)
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from catalog_index import CatalogIndex, normalize_reference
+from matching import process_text
+
+
+class CachedLookup(NamedTuple):
+    """Normalized reference IDs found by a lookup, with what is needed to tell whether a catalog change affects them."""
+    reference_ids: list[str]
+    part_type: str
+    car_model: str
+    part_type_match: tuple[str, int] | None
+    car_model_match: tuple[str, int] | None
+    expires_at: float
+
+
+class LookupCache:
+    """
+    Bounded TTL + LRU cache of catalog lookups, keyed on the normalized query.
+
+    Only the reference IDs of the matching parts are cached: parts (and their stock) are
+    resolved again on every hit, so stock changes never go stale. Adding or removing a part
+    invalidates the entries whose results or best matches it could change, and a change of the
+    catalog version (made by any worker sharing a SQLite catalog) invalidates every entry.
+    """
+
+    def __init__(self, index: CatalogIndex, max_size: int = 1024, ttl: float = 300.0, clock=time.monotonic):
+        self.index = index
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+        # Bumped by every catalog change, so lookups racing with a change are not cached
+        self._generation = 0
+        self._catalog_version = index.catalog_version()
+
+    def lookup(self, part_type: str, car_model: str, language: str = "en", year: int | None = None) -> list[dict]:
+        """Returns the parts matching a part type and a car model, like CatalogIndex.lookup."""
+        if self.max_size <= 0:
+            return self.index.lookup(part_type, car_model, language, year)
+        key = (process_text(part_type), process_text(car_model), language, year)
+        catalog_version = self.index.catalog_version()
+        with self._lock:
+            if catalog_version != self._catalog_version:
+                self._catalog_version = catalog_version
+                self._generation += 1
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            generation = self._generation
+        if entry is not None:
+            parts = [self.index.get_part(reference_id) for reference_id in entry.reference_ids]
+            return [part for part in parts if part is not None]
+
+        result = self.index.match(part_type, car_model, language, year)
+        entry = CachedLookup(
+            [normalize_reference(part["reference_id"]) for part in result.parts], key[0], key[1],
+            result.part_type_match, result.car_model_match, self.clock() + self.ttl,
+        )
+        with self._lock:
+            if generation != self._generation:
+                return result.parts
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result.parts
+
+    def _changes_best_match(self, query: str, best_match: tuple[str, int] | None, term: str) -> bool:
+        match = self.index.matcher.best_match(query, [term])
+        return match is not None and (best_match is None or match[1] >= best_match[1])
+
+    def _is_close(self, best_match: tuple[str, int] | None, term: str) -> bool:
+        return best_match is not None and bool(self.index.matcher.close_matches(best_match[0], [term]))
+
+    def _affected_by_added(self, entry: CachedLookup, part_type: str, car_model: str) -> bool:
+        # A new part joins the results when close to both best matches, or may become a better match itself
+        return (
+            (self._is_close(entry.part_type_match, part_type) and self._is_close(entry.car_model_match, car_model))
+            or self._changes_best_match(entry.part_type, entry.part_type_match, part_type)
+            or self._changes_best_match(entry.car_model, entry.car_model_match, car_model)
+        )
+
+    def _affected_by_removed(self, entry: CachedLookup, reference_id: str, part_type: str, car_model: str) -> bool:
+        # A removed part leaves the results, or takes the best matched term away with it
+        return (
+            reference_id in entry.reference_ids
+            or (entry.part_type_match is not None and entry.part_type_match[0] == part_type)
+            or (entry.car_model_match is not None and entry.car_model_match[0] == car_model)
+        )
+
+    def invalidate_part(self, part: dict, removed: bool = False):
+        """Drops the entries affected by a part added to (or removed from) the catalog."""
+        reference_id = normalize_reference(part["reference_id"])
+        with self._lock:
+            self._generation += 1
+            for key, entry in list(self._entries.items()):
+                part_type, car_model = self.index.part_terms(part, key[2])
+                if removed:
+                    affected = self._affected_by_removed(entry, reference_id, part_type, car_model)
+                else:
+                    affected = self._affected_by_added(entry, part_type, car_model)
+                if affected:
+                    del self._entries[key]
+                    self.invalidations += 1
+
+    def stats(self) -> dict:
+        """Returns the cache counters, to size the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
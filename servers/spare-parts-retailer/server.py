@@ -1,75 +1,105 @@
+import os
+
 from fastmcp import FastMCP
-from catalog import SPARE_PARTS_CATALOG
-from fuzzywuzzy import fuzz, process
+from pydantic import BaseModel
+from catalog_db import SqliteCatalogIndex, SqliteCatalogView
+from catalog_index import CatalogIndex
+from catalog_store import load_catalog
+from result_cache import LookupCache
+from stock import IdempotencyConflict, SqliteStockLedger, StockLedger
 
 mcp = FastMCP("Automotive Spare Parts Retailer")
 
 FUZZY_MATCH_THRESHOLD = 75 # Define a threshold for fuzzy matching
 
+# Catalog, as a list of dicts or a compact columnar store (see CATALOG_BACKEND)
+SPARE_PARTS_CATALOG = load_catalog()
+
+# Languages indexed at startup (comma-separated), English by default (none with SQLite)
+INDEX_LANGUAGES = os.getenv("INDEX_LANGUAGES")
+
+# Match index over the catalog, built once per language at startup (on first use with SQLite)
+index_class = SqliteCatalogIndex if isinstance(SPARE_PARTS_CATALOG, SqliteCatalogView) else CatalogIndex
+CATALOG_INDEX = index_class(
+    SPARE_PARTS_CATALOG,
+    threshold=FUZZY_MATCH_THRESHOLD,
+    languages=INDEX_LANGUAGES.split(",") if INDEX_LANGUAGES else None,
+)
+
+# Cache of check_availability lookups, storing part IDs so that stock is always rendered live
+LOOKUP_CACHE = LookupCache(
+    CATALOG_INDEX,
+    max_size=int(os.getenv("LOOKUP_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("LOOKUP_CACHE_TTL", "300")),
+)
+
+# Atomic stock reservations, shared by every worker with the SQLite catalog
+STOCK_LEDGER = SqliteStockLedger(SPARE_PARTS_CATALOG.db) if isinstance(SPARE_PARTS_CATALOG, SqliteCatalogView) else StockLedger()
+
+
+def add_catalog_part(part: dict):
+    """Adds (or replaces) a part in the catalog and keeps the match index up to date."""
+    remove_catalog_part(part["reference_id"])
+    SPARE_PARTS_CATALOG.append(part)
+    CATALOG_INDEX.add_part(SPARE_PARTS_CATALOG[-1])
+    LOOKUP_CACHE.invalidate_part(part)
+
+
+def remove_catalog_part(reference_id: str):
+    """Removes a part from the catalog and from the match index."""
+    part = CATALOG_INDEX.get_part(reference_id)
+    if part is not None:
+        LOOKUP_CACHE.invalidate_part(part, removed=True)
+        CATALOG_INDEX.remove_part(reference_id)
+        SPARE_PARTS_CATALOG.remove(part)
+
 @mcp.tool()
-def check_availability(part_type: str, car_model: str, language: str = "en") -> str:
-    """Check the availability of a certain type of spare part for a specific car model."""
-    available_parts = []
-
-    # Collect all possible translated part types and car models for fuzzy matching
-    all_part_types_translated = []
-    all_car_models_translated = []
-    for part in SPARE_PARTS_CATALOG:
-        if language in part.get("translations", {}):
-            all_part_types_translated.append(part["translations"][language]["type"])
-            all_car_models_translated.append(part["translations"][language]["model"])
-        else: # Fallback to English if translation not available
-            all_part_types_translated.append(part["type"])
-            all_car_models_translated.append(part["compatibility"]["model"])
-
-    # Remove duplicates for fuzzy matching efficiency
-    all_part_types_translated = list(set(all_part_types_translated))
-    all_car_models_translated = list(set(all_car_models_translated))
-
-    # Fuzzy match the input part_type and car_model
-    matched_part_type_info = process.extractOne(part_type, all_part_types_translated, scorer=fuzz.token_set_ratio)
-    matched_car_model_info = process.extractOne(car_model, all_car_models_translated, scorer=fuzz.token_set_ratio)
-
-    best_matched_part_type = matched_part_type_info[0] if matched_part_type_info and matched_part_type_info[1] >= FUZZY_MATCH_THRESHOLD else None
-    best_matched_car_model = matched_car_model_info[0] if matched_car_model_info and matched_car_model_info[1] >= FUZZY_MATCH_THRESHOLD else None
-
-    if not best_matched_part_type or not best_matched_car_model:
-        # If no good fuzzy match, return no parts found
-        return f"No {part_type} found for {car_model}."
-
-
-    for part in SPARE_PARTS_CATALOG:
-        part_type_in_catalog = part["translations"].get(language, {}).get("type", part["type"])
-        car_model_in_catalog = part["translations"].get(language, {}).get("model", part["compatibility"]["model"])
-
-        # Compare against the best fuzzy matched types and models
-        if fuzz.token_set_ratio(best_matched_part_type, part_type_in_catalog) >= FUZZY_MATCH_THRESHOLD and \
-           fuzz.token_set_ratio(best_matched_car_model, car_model_in_catalog) >= FUZZY_MATCH_THRESHOLD:
-            available_parts.append(part)
+def check_availability(part_type: str, car_model: str, language: str = "en", year: int | None = None) -> str:
+    """Check the availability of a certain type of spare part for a specific car model, optionally for a given model year."""
+    available_parts = LOOKUP_CACHE.lookup(part_type, car_model, language, year)
+    vehicle = f"{car_model} ({year})" if year is not None else car_model
 
     if not available_parts:
-        return f"No {part_type} found for {car_model}."
+        return f"No {part_type} found for {vehicle}."
 
-    response = f"Available {part_type} for {car_model}:\n"
+    response = f"Available {part_type} for {vehicle}:\n"
     for part in available_parts:
         # Use translated names for display
         display_name = part["translations"].get(language, {}).get("name", part["name"])
         response += f"- {display_name} (Ref: {part['reference_id']}, Stock: {part['stock']})\n"
     return response
 
+def format_part_details(part: dict) -> str:
+    """Formats the details of a spare part."""
+    return (
+        f"Details for {part['name']}:\n"
+        f"- Reference ID: {part['reference_id']}:\n"
+        f"- Type: {part['type']}\n"
+        f"- Compatibility: {part['compatibility']['model']} ({part['compatibility']['start_year']} - {part['compatibility']['end_year']})\n"
+        f"- Stock: {part['stock']}"
+    )
+
 @mcp.tool()
 def get_part_details(reference_id: str) -> str:
     """Get detailed information about a spare part using its reference ID."""
-    for part in SPARE_PARTS_CATALOG:
-        if part["reference_id"] == reference_id:
-            return (
-                f"Details for {part['name']}:\n"
-                f"- Reference ID: {part['reference_id']}:\n"
-                f"- Type: {part['type']}\n"
-                f"- Compatibility: {part['compatibility']['model']} ({part['compatibility']['start_year']} - {part['compatibility']['end_year']})\n"
-                f"- Stock: {part['stock']}"
-            )
-    return f"Part with reference ID {reference_id} not found."
+    part = CATALOG_INDEX.get_part(reference_id)
+    if part is None:
+        return f"Part with reference ID {reference_id} not found."
+    return format_part_details(part)
+
+@mcp.tool()
+def get_parts_details(reference_ids: list[str]) -> str:
+    """Get detailed information about several spare parts at once using their reference IDs."""
+    details = []
+    for reference_id in reference_ids:
+        part = CATALOG_INDEX.get_part(reference_id)
+        details.append(format_part_details(part) if part else f"Part with reference ID {reference_id} not found.")
+    return "\n\n".join(details)
+
+@mcp.resource("stats://check_availability/cache")
+def lookup_cache_stats() -> dict:
+    """Hit, miss and eviction counters of the check_availability cache."""
+    return LOOKUP_CACHE.stats()
 
 @mcp.prompt()
 def get_customer_id() -> str:
@@ -79,16 +109,83 @@ def get_customer_id() -> str:
     pass
 
 @mcp.tool()
-def order_part(reference_id: str, customer_id: str) -> str:
-    """Order a spare part by its reference ID for a given customer ID. The part must be in stock."""
-    for part in SPARE_PARTS_CATALOG:
-        if part["reference_id"] == reference_id:
-            if part["stock"] > 0:
-                part["stock"] -= 1  # Decrement stock
-                return f"Order successful! Part {part['name']} (Ref: {reference_id}) has been ordered for customer {customer_id}. New stock level: {part['stock']}."
-            else:
-                return f"Error: Part {part['name']} (Ref: {reference_id}) is out of stock."
-    return f"Part with reference ID {reference_id} not found."
+def order_part(reference_id: str, customer_id: str, quantity: int = 1, idempotency_key: str | None = None) -> str:
+    """
+    Order a spare part by its reference ID for a given customer ID. The part must be in stock.
+
+    Pass the same idempotency_key when retrying an order, so that it is not placed twice.
+    """
+    if quantity < 1:
+        return f"Error: Quantity must be at least 1 (got {quantity})."
+    part = CATALOG_INDEX.get_part(reference_id)
+    if part is None:
+        return f"Part with reference ID {reference_id} not found."
+    try:
+        reservation = STOCK_LEDGER.reserve(part, quantity, customer_id, idempotency_key)
+    except IdempotencyConflict as e:
+        return f"Error: {e}"
+    if reservation.replayed:
+        return f"Order already placed with idempotency key {idempotency_key}. Part {part['name']} (Ref: {part['reference_id']}), quantity {quantity}, for customer {customer_id}. Stock level after the order: {reservation.stock}."
+    if reservation.reserved:
+        return f"Order successful! Part {part['name']} (Ref: {part['reference_id']}), quantity {quantity}, has been ordered for customer {customer_id}. New stock level: {reservation.stock}."
+    else:
+        return f"Error: Part {part['name']} (Ref: {part['reference_id']}) is out of stock (requested {quantity}, available {reservation.stock})."
+
+class OrderLine(BaseModel):
+    reference_id: str
+    quantity: int = 1
+
+@mcp.tool()
+def place_order(customer_id: str, lines: list[OrderLine], idempotency_key: str | None = None) -> dict:
+    """
+    Order several spare parts at once for a given customer ID, e.g. a whole cart.
+
+    The order is all-or-nothing: either every line is in stock and ordered, or nothing is ordered.
+    Pass the same idempotency_key when retrying an order, so that it is not placed twice.
+    Returns the status of the order and one result per line.
+    """
+    results, items = [], []
+    for line in lines:
+        quantity = line.quantity
+        part = CATALOG_INDEX.get_part(line.reference_id)
+        result = {"reference_id": line.reference_id, "quantity": quantity}
+        if part is None:
+            result["status"] = "not_found"
+        elif quantity < 1:
+            result["status"] = "invalid_quantity"
+        else:
+            result["reference_id"] = part["reference_id"]
+            result["name"] = part["name"]
+            items.append((part, quantity))
+        results.append(result)
+
+    if not lines or len(items) < len(lines):
+        for result in results:
+            result.setdefault("status", "not_ordered")
+        return {"status": "rejected", "customer_id": customer_id, "lines": results}
+
+    try:
+        reservation = STOCK_LEDGER.reserve_many(items, customer_id, idempotency_key)
+    except IdempotencyConflict as e:
+        for result in results:
+            result["status"] = "not_ordered"
+        return {"status": "rejected", "customer_id": customer_id, "error": str(e), "lines": results}
+    if reservation.reserved:
+        for result, stock in zip(results, reservation.stocks):
+            result.update(status="ordered", stock=stock)
+        order = {"status": "ordered", "customer_id": customer_id, "lines": results}
+        if reservation.replayed:
+            # A retry: the order was already placed with this key, and the stock levels are those after it
+            order["replayed"] = True
+        return order
+
+    # Flag the lines whose part lacks stock for the whole cart, counting repeated parts together
+    needed = {}
+    for part, quantity in items:
+        needed[part["reference_id"]] = needed.get(part["reference_id"], 0) + quantity
+    for result, stock in zip(results, reservation.stocks):
+        result.update(status="out_of_stock" if stock < needed[result["reference_id"]] else "not_ordered", stock=stock)
+    return {"status": "rejected", "customer_id": customer_id, "lines": results}
 
 def run():
     """Runs the MCP server."""
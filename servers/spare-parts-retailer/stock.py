@@ -0,0 +1,206 @@
+import json
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack, nullcontext
+from typing import NamedTuple
+
+from catalog_index import normalize_reference
+
+# Number of idempotency keys remembered by the in-process ledger
+IDEMPOTENCY_KEYS_LIMIT = 100_000
+# Locks shared by the idempotency keys: a key holds its lock from the replay check to the recording
+IDEMPOTENCY_LOCKS = 64
+
+
+class Reservation(NamedTuple):
+    """Outcome of a stock reservation: whether it succeeded and the stock left afterwards."""
+    reserved: bool
+    stock: int
+    replayed: bool = False
+
+
+class BatchReservation(NamedTuple):
+    """Outcome of an all-or-nothing reservation: whether it succeeded and the stock of each line afterwards."""
+    reserved: bool
+    stocks: list[int]
+    replayed: bool = False
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an idempotency key is reused for a different order."""
+
+
+def batch_order(items: list[tuple], customer_id: str) -> tuple:
+    """Identifies a batch order by its customer and its (reference key, quantity) lines."""
+    return customer_id, tuple((normalize_reference(part["reference_id"]), quantity) for part, quantity in items)
+
+
+def replayed_result(idempotency_key: str | None, order: tuple, previous: tuple | None):
+    """Returns what a previous order with the same key reserved, or None if the key is new."""
+    if previous is None:
+        return None
+    previous_order, result = previous
+    if previous_order != order:
+        raise IdempotencyConflict(f"Idempotency key {idempotency_key} was already used for another order.")
+    return result
+
+
+class StockLedger:
+    """
+    In-process stock ledger for the dict and columnar catalogs.
+
+    Check-and-decrement runs under a per-SKU lock, so concurrent orders for the same part
+    never oversell, while orders for different parts do not contend. Successful reservations
+    are remembered by idempotency key, so a retried order is not applied twice. An order with a
+    key also holds the lock of the key, taken before the SKU locks, so two orders sharing a key
+    cannot both pass the replay check, even for different parts.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._orders = OrderedDict()
+        self._orders_lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(IDEMPOTENCY_LOCKS)]
+
+    def _lock(self, reference_id: str) -> threading.Lock:
+        key = normalize_reference(reference_id)
+        with self._locks_lock:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _key_lock(self, idempotency_key: str | None):
+        if idempotency_key is None:
+            return nullcontext()
+        return self._key_locks[hash(idempotency_key) % IDEMPOTENCY_LOCKS]
+
+    def _replay(self, idempotency_key: str | None, order: tuple):
+        with self._orders_lock:
+            previous = self._orders.get(idempotency_key) if idempotency_key is not None else None
+        return replayed_result(idempotency_key, order, previous)
+
+    def _remember(self, idempotency_key: str | None, order: tuple, result):
+        if idempotency_key is None:
+            return
+        with self._orders_lock:
+            self._orders[idempotency_key] = (order, result)
+            while len(self._orders) > IDEMPOTENCY_KEYS_LIMIT:
+                self._orders.popitem(last=False)
+
+    def reserve(self, part, quantity: int, customer_id: str, idempotency_key: str | None = None) -> Reservation:
+        """Atomically takes quantity units of a part out of stock, if enough are available."""
+        order = (normalize_reference(part["reference_id"]), customer_id, quantity)
+        with self._key_lock(idempotency_key), self._lock(part["reference_id"]):
+            replayed = self._replay(idempotency_key, order)
+            if replayed is not None:
+                return Reservation(True, replayed, replayed=True)
+            stock = part["stock"]
+            if stock < quantity:
+                return Reservation(False, stock)
+            part["stock"] = stock - quantity
+            self._remember(idempotency_key, order, stock - quantity)
+            return Reservation(True, stock - quantity)
+
+    def reserve_many(self, items: list[tuple], customer_id: str, idempotency_key: str | None = None) -> BatchReservation:
+        """Atomically reserves every (part, quantity) item, or none of them if one lacks stock."""
+        order = batch_order(items, customer_id)
+        parts, needed = {}, {}
+        for part, quantity in items:
+            key = normalize_reference(part["reference_id"])
+            parts[key] = part
+            needed[key] = needed.get(key, 0) + quantity
+        with ExitStack() as stack:
+            # Lock the key, then the SKUs in a consistent order, so concurrent orders cannot deadlock
+            stack.enter_context(self._key_lock(idempotency_key))
+            for key in sorted(parts):
+                stack.enter_context(self._lock(key))
+            replayed = self._replay(idempotency_key, order)
+            if replayed is not None:
+                return BatchReservation(True, replayed, replayed=True)
+            if any(parts[key]["stock"] < quantity for key, quantity in needed.items()):
+                return BatchReservation(False, [part["stock"] for part, _ in items])
+            for key, quantity in needed.items():
+                parts[key]["stock"] -= quantity
+            stocks = [part["stock"] for part, _ in items]
+            self._remember(idempotency_key, order, stocks)
+            return BatchReservation(True, stocks)
+
+
+class InsufficientStock(Exception):
+    """Rolls back a batch reservation when one of its lines lacks stock."""
+
+
+class SqliteStockLedger:
+    """
+    Stock ledger stored in the SQLite catalog, shared by every worker using the same file.
+
+    Reservations are a conditional UPDATE ... WHERE stock >= quantity, and idempotency keys
+    are recorded in the same transaction: single-part orders in the orders table, batch orders
+    in the batch_orders table (both created by build_catalog_db).
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    @staticmethod
+    def _previous(connection, idempotency_key: str | None) -> tuple | None:
+        """Returns the order recorded under an idempotency key, with what it reserved, or None."""
+        if idempotency_key is None:
+            return None
+        previous = connection.execute(
+            "SELECT reference_key, customer_id, quantity, stock FROM orders WHERE idempotency_key = ?", (idempotency_key,)
+        ).fetchone()
+        if previous:
+            return tuple(previous[:3]), previous[3]
+        previous = connection.execute(
+            "SELECT customer_id, lines, stocks FROM batch_orders WHERE idempotency_key = ?", (idempotency_key,)
+        ).fetchone()
+        if previous:
+            customer_id, lines, stocks = previous
+            return (customer_id, tuple(tuple(line) for line in json.loads(lines))), json.loads(stocks)
+        return None
+
+    def reserve(self, part, quantity: int, customer_id: str, idempotency_key: str | None = None) -> Reservation:
+        """Atomically takes quantity units of a part out of stock, if enough are available."""
+        order = (normalize_reference(part["reference_id"]), customer_id, quantity)
+        with self.db.transaction() as connection:
+            replayed = replayed_result(idempotency_key, order, self._previous(connection, idempotency_key))
+            if replayed is not None:
+                return Reservation(True, replayed, replayed=True)
+            updated = connection.execute(
+                "UPDATE parts SET stock = stock - ? WHERE row = ? AND stock >= ?", (quantity, part.row, quantity)
+            ).rowcount
+            stock = connection.execute("SELECT stock FROM parts WHERE row = ?", (part.row,)).fetchone()[0]
+            if not updated:
+                return Reservation(False, stock)
+            if idempotency_key is not None:
+                connection.execute(
+                    "INSERT INTO orders (idempotency_key, reference_key, customer_id, quantity, stock) VALUES (?, ?, ?, ?, ?)",
+                    (idempotency_key, *order, stock),
+                )
+            return Reservation(True, stock)
+
+    def reserve_many(self, items: list[tuple], customer_id: str, idempotency_key: str | None = None) -> BatchReservation:
+        """Atomically reserves every (part, quantity) item in one transaction, or none of them."""
+        order = batch_order(items, customer_id)
+        try:
+            with self.db.transaction() as connection:
+                replayed = replayed_result(idempotency_key, order, self._previous(connection, idempotency_key))
+                if replayed is not None:
+                    return BatchReservation(True, replayed, replayed=True)
+                for part, quantity in items:
+                    updated = connection.execute(
+                        "UPDATE parts SET stock = stock - ? WHERE row = ? AND stock >= ?", (quantity, part.row, quantity)
+                    ).rowcount
+                    if not updated:
+                        raise InsufficientStock()
+                stocks = [connection.execute("SELECT stock FROM parts WHERE row = ?", (part.row,)).fetchone()[0] for part, _ in items]
+                if idempotency_key is not None:
+                    connection.execute(
+                        "INSERT INTO batch_orders (idempotency_key, customer_id, lines, stocks) VALUES (?, ?, ?, ?)",
+                        (idempotency_key, customer_id, json.dumps(order[1]), json.dumps(stocks)),
+                    )
+            return BatchReservation(True, stocks)
+        except InsufficientStock:
+            return BatchReservation(False, [part["stock"] for part, _ in items])
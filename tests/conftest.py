@@ -0,0 +1,18 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+GLPI_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "servers", "glpi-mcp"))
+
+
+@pytest.fixture
+def glpi_server():
+    """The GLPI server module, whose name is also the spare parts server's."""
+    module = sys.modules.get("server")
+    if module is None or os.path.dirname(os.path.abspath(module.__file__)) != GLPI_DIR:
+        sys.modules.pop("server", None)
+        sys.path.insert(0, GLPI_DIR)
+        module = importlib.import_module("server")
+    return module
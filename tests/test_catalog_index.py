@@ -0,0 +1,209 @@
+import hashlib
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "servers", "spare-parts-retailer"))
+
+from catalog_db import SqliteCatalog, SqliteCatalogIndex, SqliteCatalogView, build_catalog_db
+from catalog_index import CatalogIndex, IntervalIndex, translated_terms
+from matching import create_matcher
+
+THRESHOLD = 75
+TYPES = ["brake pads", "brake disc", "oil filter", "air filter", "gearbox", "clutch kit", "spark plug", "timing belt"]
+MODELS = ["Toyota Corolla", "Toyota Camry", "Honda Civic", "Honda Accord", "Ford Focus", "Ford Fiesta", "Chrysler 300C"]
+
+
+def make_part(i: int, part_type: str, car_model: str, start_year: int = 2000, end_year: int = 2010) -> dict:
+    return {
+        "name": f"{part_type.title()} {i}",
+        "type": part_type,
+        "reference_id": f"REF-{i:05d}",
+        "compatibility": {"model": car_model, "start_year": start_year, "end_year": end_year},
+        "stock": i % 7,
+        "translations": {"fr": {"type": f"{part_type} fr"}},
+    }
+
+
+def make_catalog(count: int = 400, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    parts = []
+    for i in range(count):
+        # Variants of the models, so that neighbourhoods hold several terms
+        car_model = f"{rng.choice(MODELS)} {rng.choice(['', 'II', 'Sport', 'Hybrid', str(rng.randint(1, 40))])}".strip()
+        start_year = rng.randint(1995, 2020)
+        parts.append(make_part(i, rng.choice(TYPES), car_model, start_year, start_year + rng.randint(0, 8)))
+    return parts
+
+
+def full_scan(parts: list[dict], index: CatalogIndex, part_type: str, car_model: str, language: str = "en", year: int | None = None) -> list[dict]:
+    """The lookup without any index: matches the whole catalog against the query, and checks the index agrees."""
+    matcher = create_matcher(THRESHOLD)
+    terms = [translated_terms(part, language) for part in parts]
+    types, models = sorted({t for t, _ in terms}), sorted({m for _, m in terms})
+    result = index.match(part_type, car_model, language, year)
+    # Equally scored terms may tie: the index must find the best score, and its term is then used
+    for match, query, choices in ((result.part_type_match, part_type, types), (result.car_model_match, car_model, models)):
+        best = matcher.best_match(query, choices)
+        assert (match and match[1]) == (best and best[1])
+    if not result.part_type_match or not result.car_model_match:
+        return []
+    close_types = set(matcher.close_matches(result.part_type_match[0], types))
+    close_models = set(matcher.close_matches(result.car_model_match[0], models))
+    return [
+        part for part, (t, m) in zip(parts, terms)
+        if t in close_types and m in close_models
+        and (year is None or part["compatibility"]["start_year"] <= year <= part["compatibility"]["end_year"])
+    ]
+
+
+QUERIES = [
+    ("brake pads", "Toyota Corolla", None),
+    ("brake pad", "toyota corola", None),
+    ("oil filter", "Honda Civic Sport", 2005),
+    ("gear box", "Chrysler 300C", None),
+    ("spark plugs", "Ford Focus 12", 2012),
+    ("wiper blade", "Tesla Model 3", None),
+]
+
+
+def reference_ids(parts) -> list[str]:
+    return [part["reference_id"] for part in parts]
+
+
+def test_lookup_matches_full_scan():
+    parts = make_catalog()
+    index = CatalogIndex(parts, threshold=THRESHOLD)
+    for part_type, car_model, year in QUERIES:
+        # Twice: the second lookup reuses the cached neighbourhoods
+        for _ in range(2):
+            assert reference_ids(index.lookup(part_type, car_model, year=year)) == reference_ids(full_scan(parts, index, part_type, car_model, year=year))
+
+
+def test_lookup_matches_full_scan_after_catalog_changes():
+    parts = make_catalog()
+    index = CatalogIndex(parts, threshold=THRESHOLD)
+    for part_type, car_model, year in QUERIES:
+        index.lookup(part_type, car_model, year=year)
+
+    # A new model variant joins a cached neighbourhood, and removing parts drops terms from it
+    added = [make_part(1000, "brake pads", "Toyota Corolla Verso"), make_part(1001, "oil filter", "Honda Civic Type R", 2000, 2020)]
+    for part in added:
+        parts.append(part)
+        index.add_part(part)
+    for part in [part for part in parts if part["compatibility"]["model"].endswith("Sport")]:
+        parts.remove(part)
+        index.remove_part(part["reference_id"])
+
+    for part_type, car_model, year in QUERIES:
+        assert reference_ids(index.lookup(part_type, car_model, year=year)) == reference_ids(full_scan(parts, index, part_type, car_model, year=year))
+    assert "REF-01000" in reference_ids(index.lookup("brake pads", "Toyota Corolla"))
+
+
+def test_translated_lookup_matches_full_scan():
+    parts = make_catalog()
+    index = CatalogIndex(parts, threshold=THRESHOLD)
+    assert reference_ids(index.lookup("brake pads fr", "Ford Fiesta", "fr")) == reference_ids(full_scan(parts, index, "brake pads fr", "Ford Fiesta", "fr"))
+
+
+def open_sqlite_index(path: str, read_only: bool = False) -> SqliteCatalogIndex:
+    return SqliteCatalogIndex(SqliteCatalogView(SqliteCatalog(path, read_only)), threshold=THRESHOLD)
+
+
+def test_sqlite_workers_apply_each_others_changes(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    parts = make_catalog()
+    build_catalog_db(parts, path)
+    writer, reader = open_sqlite_index(path), open_sqlite_index(path)
+    for part_type, car_model, year in QUERIES:
+        reader.lookup(part_type, car_model, year=year)
+        reader.lookup(part_type, car_model, "fr", year=year)
+    vocabularies = dict(reader._languages)
+
+    added = [make_part(1000, "brake pads", "Toyota Corolla Verso"), make_part(1001, "oil filter", "Honda Civic Type R", 2000, 2020)]
+    for part in added:
+        parts.append(part)
+        writer.db.add_part(part)
+    for part in [part for part in parts if part["compatibility"]["model"].endswith("Sport")]:
+        parts.remove(part)
+        writer.db.remove_part(writer.get_part(part["reference_id"]).row)
+
+    for part_type, car_model, year in QUERIES:
+        assert reference_ids(reader.lookup(part_type, car_model, year=year)) == reference_ids(full_scan(parts, reader, part_type, car_model, year=year))
+    reader.lookup("brake pads fr", "Ford Fiesta", "fr")
+    # The reader updated the vocabularies it had loaded, which match those of a worker opening the catalog now
+    fresh = open_sqlite_index(path, read_only=True)
+    for language, index in vocabularies.items():
+        assert reader._languages[language] is index
+        fresh_index = fresh._language_index(language)
+        assert (index.types, index.models) == (fresh_index.types, fresh_index.models)
+
+
+def test_opening_the_catalog_writes_nothing(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    build_catalog_db(make_catalog(), path)
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    for read_only in (False, True):
+        index = open_sqlite_index(path, read_only)
+        assert reference_ids(index.lookup("brake pads", "Toyota Corolla"))
+        index.db.connection.close()
+    with open(path, "rb") as f:
+        assert hashlib.sha256(f.read()).hexdigest() == digest
+
+
+def test_languages_without_translations_use_the_english_index():
+    parts = make_catalog()
+    index = CatalogIndex(parts, threshold=THRESHOLD)
+    # Only English is indexed up front, French on its first lookup
+    assert set(index._languages) == {"en"}
+    assert reference_ids(index.lookup("brake pads", "Toyota Corolla", "de")) == reference_ids(index.lookup("brake pads", "Toyota Corolla"))
+    assert set(index._languages) == {"en"}
+    index.lookup("brake pads fr", "Toyota Corolla", "fr")
+    assert set(index._languages) == {"en", "fr"}
+
+
+def test_interval_index_matches_brute_force():
+    rng = random.Random(1)
+    intervals = IntervalIndex()
+    ranges = {}
+    for key in range(300):
+        start = rng.randint(1990, 2025)
+        ranges[key] = (start, start + rng.randint(0, 10))
+        intervals.add(key, *ranges[key], f"part {key}")
+    # Removals after a first query, so the tree is rebuilt
+    intervals.stab(2000)
+    for key in rng.sample(sorted(ranges), 100):
+        intervals.remove(key)
+        del ranges[key]
+    for year in range(1985, 2040):
+        assert intervals.stab(year) == {key: f"part {key}" for key, (start, end) in ranges.items() if start <= year <= end}
+
+
+def test_year_filter_includes_both_ends_of_the_range():
+    parts = [make_part(0, "brake pads", "Toyota Corolla", 2000, 2005), make_part(1, "brake pads", "Toyota Corolla", 2006, 2010)]
+    index = CatalogIndex(parts, threshold=THRESHOLD)
+    assert reference_ids(index.lookup("brake pads", "Toyota Corolla", year=2005)) == ["REF-00000"]
+    assert reference_ids(index.lookup("brake pads", "Toyota Corolla", year=2006)) == ["REF-00001"]
+    assert reference_ids(index.lookup("brake pads", "Toyota Corolla", year=2011)) == []
+    assert reference_ids(index.lookup("brake pads", "Toyota Corolla")) == ["REF-00000", "REF-00001"]
+
+
+def test_get_part_ignores_case_and_whitespace(tmp_path):
+    parts = make_catalog(20)
+    path = str(tmp_path / "catalog.db")
+    build_catalog_db(parts, path)
+    for index in (CatalogIndex(parts, threshold=THRESHOLD), open_sqlite_index(path)):
+        assert index.get_part(" ref-00007 ")["reference_id"] == "REF-00007"
+        assert index.get_part("Ref- 00007")["name"] == parts[7]["name"]
+        assert index.get_part("REF-99999") is None
+
+
+def test_get_part_follows_catalog_changes():
+    parts = make_catalog(20)
+    index = CatalogIndex(parts, threshold=THRESHOLD)
+    replacement = make_part(7, "oil filter", "Honda Civic")
+    index.add_part(replacement)
+    assert index.get_part("REF-00007") is replacement
+    index.remove_part("ref-00007")
+    assert index.get_part("REF-00007") is None
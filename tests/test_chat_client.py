@@ -0,0 +1,67 @@
+import asyncio
+import os
+import sys
+from contextlib import AsyncExitStack
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools"))
+
+pytest.importorskip("openai")
+from fastmcp import Client, FastMCP
+
+from chat_client import NAMESPACE_SEPARATOR, ToolRegistry, run_tool_call
+from mcp_fanout import duplicate_names, server_name, unique_server_name
+
+
+def make_server(name: str) -> FastMCP:
+    """A server whose tools have the same names as the other servers'."""
+    mcp = FastMCP(name)
+
+    @mcp.tool()
+    def whoami() -> str:
+        """Returns the name of the server."""
+        return name
+
+    @mcp.tool()
+    def fail() -> str:
+        """Always fails."""
+        raise ValueError(f"{name} failed")
+
+    return mcp
+
+
+def tool_call(name: str, arguments: str = "{}") -> dict:
+    return {"id": "call_1", "type": "function", "function": {"name": name, "arguments": arguments}}
+
+
+def test_tools_with_the_same_name_are_namespaced_by_server():
+    servers = {"parts": make_server("parts"), "glpi": make_server("glpi")}
+
+    async def scenario():
+        async with AsyncExitStack() as stack:
+            clients = {name: await stack.enter_async_context(Client(mcp)) for name, mcp in servers.items()}
+            registry = ToolRegistry()
+            await registry.add_servers(clients)
+            semaphore = asyncio.Semaphore(2)
+            calls = [tool_call(f"{server}{NAMESPACE_SEPARATOR}whoami") for server in servers]
+            calls += [tool_call(f"glpi{NAMESPACE_SEPARATOR}fail"), tool_call("whoami")]
+            messages = await asyncio.gather(*(run_tool_call(call, registry, semaphore, timeout=5) for call in calls))
+            return registry, messages
+
+    registry, messages = asyncio.run(scenario())
+    assert sorted(tool["function"]["name"] for tool in registry.openai_tools) == [
+        "glpi__fail", "glpi__whoami", "parts__fail", "parts__whoami",
+    ]
+    assert [message["content"] for message in messages[:2]] == ["parts", "glpi"]
+    # Failures are returned to the LLM, not raised
+    assert messages[2]["content"].startswith("Error:") and "glpi failed" in messages[2]["content"]
+    assert messages[3]["content"] == "Error: Tool 'whoami' not found."
+
+
+def test_server_names_are_unique_and_usable_in_tool_names():
+    assert server_name("http://localhost:8000/mcp") == "localhost_8000"
+    assert server_name("python server.py") == "python_server_py"
+    assert duplicate_names(["a", "b", "a"]) == ["a"]
+    assert unique_server_name("parts", {"parts", "parts_2"}) == "parts_3"
+    assert unique_server_name("glpi", {"parts"}) == "glpi"
@@ -0,0 +1,50 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools"))
+
+from chat_history import ChatHistory
+
+
+def tool_turn(question: str, result: str) -> list[dict]:
+    tool_call = {"id": "call_1", "type": "function", "function": {"name": "glpi_list_tickets", "arguments": "{}"}}
+    return [
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": None, "tool_calls": [tool_call]},
+        {"role": "tool", "tool_call_id": "call_1", "content": result},
+    ]
+
+
+def test_large_tool_result_is_capped_on_append():
+    history = ChatHistory(2000, max_tool_result_share=0.25)
+    result = json.dumps([{"id": i, "name": f"Ticket {i}", "content": "x" * 200} for i in range(500)])
+    history.extend(tool_turn("List every ticket", result))
+
+    tool_message = history.messages[-1]
+    assert history.count_tokens(tool_message["content"]) <= history.max_tool_result_tokens
+    assert tool_message["content"].startswith(result[:100])
+    assert tool_message["content"].endswith(" characters truncated]")
+    assert tool_message["tool_call_id"] == "call_1"
+    # The current turn fits the budget without dropping it
+    assert history.compact() == {"truncated": 0, "dropped": 0}
+    assert history.tokens <= history.budget_tokens
+
+
+def test_small_tool_result_is_kept_whole():
+    history = ChatHistory(2000)
+    history.extend(tool_turn("Get ticket 1", '{"id": 1}'))
+    assert history.messages[-1]["content"] == '{"id": 1}'
+
+
+def test_capped_result_of_an_old_turn_is_truncated_further():
+    history = ChatHistory(2000, truncated_tool_chars=100)
+    result = "y" * 20000
+    # Each result is capped to a quarter of the budget, so five of them overflow it
+    for question in ("First", "Second", "Third", "Fourth", "Fifth"):
+        history.extend(tool_turn(question, result))
+
+    assert history.compact()["truncated"] >= 1
+    first_result = history.messages[2]["content"]
+    assert first_result == "y" * 100 + f"... [{len(result) - 100} characters truncated]"
+    assert history.tokens <= history.budget_tokens
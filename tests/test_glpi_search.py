@@ -0,0 +1,64 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "servers", "glpi-mcp"))
+
+from glpi_search import SearchOptions, SearchOptionsCache, search_params
+from mock_glpi import MockGlpi
+
+
+def ticket_options() -> SearchOptions:
+    _, _, options = MockGlpi(tickets=0).list_search_options()
+    return SearchOptions("Ticket", options)
+
+
+def test_resolves_fields_by_name_uid_label_and_id():
+    options = ticket_options()
+    assert options.resolve("status") == "12"
+    assert options.resolve("Ticket.date_mod") == "19"
+    assert options.resolve(" Last Update ") == "19"
+    assert options.resolve(12) == "12"
+    assert options.resolve("Group.completename") == "8"
+    assert options.names["8"] == "Group.completename"
+    # Columns of linked tables are only known by their name, uid or label, not their bare column
+    with pytest.raises(ValueError):
+        options.resolve("completename")
+
+
+def test_unknown_fields_list_the_known_ones():
+    with pytest.raises(ValueError, match="Unknown Ticket field 'colour'.*status"):
+        ticket_options().resolve("colour")
+
+
+def test_search_options_are_fetched_once_per_instance():
+    cache = SearchOptionsCache()
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        await asyncio.sleep(0.01)
+        return MockGlpi(tickets=0).list_search_options()[2]
+
+    async def scenario():
+        await asyncio.gather(*(cache.get("http://glpi", "Ticket", fetch) for _ in range(5)))
+        await cache.get("http://other-glpi", "Ticket", fetch)
+        cache.invalidate("http://glpi")
+        await cache.get("http://glpi", "Ticket", fetch)
+
+    asyncio.run(scenario())
+    assert len(fetches) == 3
+
+
+def test_search_params_encode_criteria_and_range():
+    criteria = [
+        {"link": "AND", "field": "12", "searchtype": "equals", "value": "notold"},
+        {"link": "OR", "field": "1", "searchtype": "contains", "value": "vpn"},
+    ]
+    assert search_params(criteria, ["1", "19"], "19", "DESC", 50, 99) == [
+        ("criteria[0][field]", "12"), ("criteria[0][searchtype]", "equals"), ("criteria[0][value]", "notold"),
+        ("criteria[1][link]", "OR"), ("criteria[1][field]", "1"), ("criteria[1][searchtype]", "contains"), ("criteria[1][value]", "vpn"),
+        ("forcedisplay[0]", "1"), ("forcedisplay[1]", "19"), ("sort", "19"), ("order", "DESC"), ("range", "50-99"),
+    ]
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "servers", "glpi-mcp"))
+
+from glpi_sessions import GlpiLogin, SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_login(token: str) -> GlpiLogin:
+    return GlpiLogin("http://glpi", "app", "user_token secret", f"{token}-write", [f"{token}-read"])
+
+
+def test_stale_identity_is_reaped():
+    clock = FakeClock()
+    store = SessionStore(idle_ttl=60, clock=clock)
+    stale, active = make_login("stale"), make_login("active")
+    store.set("stale", stale)
+    store.set("active", active)
+    clock.now = 50
+    store.get("active")
+    clock.now = 100
+
+    assert store.reap() == [stale]
+    assert len(store) == 1 and store.reaped == 1
+    with pytest.raises(Exception, match="Not logged in"):
+        store.get("stale")
+    assert store.get("active") is active
+
+
+def test_zero_ttl_keeps_logins():
+    clock = FakeClock()
+    store = SessionStore(idle_ttl=0, clock=clock)
+    store.set("session", make_login("session"))
+    clock.now = 1e9
+    assert store.reap() == []
+    assert len(store) == 1
+
+
+def test_reaped_login_glpi_sessions_are_killed(glpi_server):
+    server = glpi_server
+    from mock_glpi import start_mock
+
+    mock, glpi_url = start_mock(tickets=1)
+    clock = FakeClock()
+    sessions, server.SESSIONS = server.SESSIONS, SessionStore(idle_ttl=60, clock=clock)
+    try:
+        async def scenario():
+            write_token, read_tokens = await server.open_sessions(glpi_url, "", "user_token secret")
+            login = GlpiLogin(glpi_url, "", "user_token secret", write_token, read_tokens)
+            server.SESSIONS.set("disconnected", login)
+            assert set(login.tokens()) <= set(mock.mock.sessions)
+            clock.now = 61
+            await server.reap_idle_logins()
+            return login
+
+        login = asyncio.run(scenario())
+        assert len(server.SESSIONS) == 0
+        assert not set(login.tokens()) & set(mock.mock.sessions)
+    finally:
+        server.SESSIONS = sessions
+        mock.shutdown()
+
+
+def test_login_id_works_on_a_default_mode_client(glpi_server):
+    server = glpi_server
+    from fastmcp import Client
+    from mock_glpi import start_mock
+
+    mock, glpi_url = start_mock(tickets=3)
+    try:
+        async def scenario():
+            # The default client mode is stateless: each request has a new MCP session ID
+            async with Client(server.mcp) as client:
+                login = await client.call_tool("glpi_login", {"glpi_url": glpi_url, "username": "glpi", "password": "glpi"})
+                login_id = login.data["login_id"]
+                ticket = await client.call_tool("glpi_get_ticket", {"ticket_id": 2, "login_id": login_id})
+                anonymous = await client.call_tool("glpi_get_ticket", {"ticket_id": 2}, raise_on_error=False)
+                logout = await client.call_tool("glpi_logout", {"login_id": login_id})
+            return ticket, anonymous, logout
+
+        ticket, anonymous, logout = asyncio.run(scenario())
+        assert ticket.data["id"] == 2
+        assert anonymous.is_error and "Not logged in" in anonymous.content[0].text
+        assert logout.data == "Successfully logged out from GLPI."
+        assert not mock.mock.sessions
+    finally:
+        mock.shutdown()
+
+
+def test_stateful_session_needs_no_login_id(glpi_server):
+    server = glpi_server
+    from load_test import connect
+    from mock_glpi import start_mock
+
+    mock, glpi_url = start_mock(tickets=3)
+    try:
+        async def scenario():
+            async with connect(server.mcp) as client:
+                await client.call_tool("glpi_login", {"glpi_url": glpi_url, "username": "glpi", "password": "glpi"})
+                return await client.call_tool("glpi_get_ticket", {"ticket_id": 1})
+
+        assert asyncio.run(scenario()).data["id"] == 1
+    finally:
+        mock.shutdown()
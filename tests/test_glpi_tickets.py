@@ -0,0 +1,166 @@
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "servers", "glpi-mcp"))
+
+from mock_glpi import start_mock
+
+TICKETS = 95
+
+
+@pytest.fixture
+def glpi():
+    """The mock GLPI server, with its state at glpi.mock."""
+    server, url = start_mock(tickets=TICKETS)
+    server.url = url
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def glpi_url(glpi):
+    return glpi.url
+
+
+@asynccontextmanager
+async def logged_in(server, glpi_url: str):
+    """A default-mode client logged in to GLPI, with a function calling a tool and returning its data."""
+    from fastmcp import Client
+
+    async with Client(server.mcp) as client:
+        login = await client.call_tool("glpi_login", {"glpi_url": glpi_url, "username": "glpi", "password": "glpi"})
+        login_id = login.data["login_id"]
+
+        async def call(tool: str, **arguments):
+            return (await client.call_tool(tool, {**arguments, "login_id": login_id})).structured_content
+
+        yield call
+
+
+def test_list_tickets_walks_pages_with_next_offset(glpi_server, glpi_url, monkeypatch):
+    # A limit spanning several pages is fetched some pages at a time
+    monkeypatch.setattr(glpi_server, "LIST_PAGE_SIZE", 10)
+    monkeypatch.setattr(glpi_server, "LIST_PARALLEL_PAGES", 3)
+
+    async def walk():
+        pages, offset = [], 0
+        async with logged_in(glpi_server, glpi_url) as call:
+            while offset is not None:
+                page = await call("glpi_list_tickets", offset=offset, limit=40, fields=["id"])
+                pages.append(page)
+                offset = page["next_offset"]
+        return pages
+
+    pages = asyncio.run(walk())
+    assert [page["count"] for page in pages] == [40, 40, 15]
+    assert [ticket["id"] for page in pages for ticket in page["tickets"]] == list(range(1, TICKETS + 1))
+    assert all(page["total"] == TICKETS and not page["truncated"] for page in pages)
+
+
+def test_list_tickets_ticket_range(glpi_server, glpi_url):
+    async def scenario():
+        async with logged_in(glpi_server, glpi_url) as call:
+            return await call("glpi_list_tickets", ticket_range="90-99", fields=["id"])
+
+    page = asyncio.run(scenario())
+    assert page["offset"] == 90
+    assert [ticket["id"] for ticket in page["tickets"]] == list(range(91, TICKETS + 1))
+    assert page["next_offset"] is None
+
+
+def test_ticket_reads_are_cached_until_a_write(glpi_server, glpi):
+    async def scenario():
+        async with logged_in(glpi_server, glpi.url) as call:
+            await call("glpi_get_ticket", ticket_id=3)
+            requests = glpi.mock.requests
+            cached = await call("glpi_get_ticket", ticket_id=3)
+            assert glpi.mock.requests == requests
+            await call("glpi_update_ticket", ticket_id=3, title="Renamed")
+            return cached, await call("glpi_get_ticket", ticket_id=3)
+
+    cached, updated = asyncio.run(scenario())
+    assert cached["id"] == 3 and cached["name"] != "Renamed"
+    assert updated["name"] == "Renamed"
+
+
+def test_bulk_writes_report_partial_failures_per_item(glpi_server, glpi, monkeypatch):
+    # Several chunks, sent in parallel, whose results come back in input order
+    monkeypatch.setattr(glpi_server, "BULK_CHUNK_SIZE", 2)
+
+    async def scenario():
+        async with logged_in(glpi_server, glpi.url) as call:
+            created = await call("glpi_create_tickets", tickets=[
+                {"title": "Printer jam", "content": "Tray 2"}, {"title": "No content", "content": ""},
+                {"title": "VPN down", "content": "Since 9am"},
+            ])
+            updated = await call("glpi_update_tickets", updates=[
+                {"ticket_id": 1, "title": "Renamed"}, {"ticket_id": 9999, "title": "Missing"}, {"ticket_id": 2, "content": "More"},
+            ])
+            followups = await call("glpi_add_ticket_followups", followups=[{"ticket_id": 3, "content": "On it"}])
+            solved = await call("glpi_solve_tickets", ticket_ids=[9998, 9999])
+            return created, updated, followups, solved
+
+    created, updated, followups, solved = asyncio.run(scenario())
+    assert created["status"] == "partial" and (created["succeeded"], created["failed"]) == (2, 1)
+    assert [result["status"] for result in created["results"]] == ["created", "failed", "created"]
+    assert created["results"][0]["id"] == TICKETS + 1
+    assert "ERROR_GLPI_PARTIAL_ADD" in created["errors"]
+
+    assert updated["status"] == "partial"
+    assert [(result["id"], result["status"]) for result in updated["results"]] == [(1, "updated"), (9999, "failed"), (2, "updated")]
+    assert glpi.mock.tickets[1]["name"] == "Renamed"
+
+    assert followups["status"] == "ok" and followups["results"][0]["status"] == "created"
+    assert solved["status"] == "failed" and solved["errors"] == ["ERROR_GLPI_UPDATE"]
+
+
+def test_search_tickets_by_field_name(glpi_server, glpi):
+    async def scenario():
+        async with logged_in(glpi_server, glpi.url) as call:
+            return await call(
+                "glpi_search_tickets",
+                criteria=[{"field": "status", "value": "notold", "searchtype": "equals"}, {"field": "Title", "value": "vpn", "link": "AND"}],
+                fields=["name", "status"], sort="id", limit=5,
+            )
+
+    found = asyncio.run(scenario())
+    expected = sorted(
+        ticket["id"] for ticket in glpi.mock.tickets.values() if ticket["status"] not in (5, 6) and "vpn" in ticket["name"].lower()
+    )
+    assert found["total"] == len(expected)
+    assert [ticket["id"] for ticket in found["tickets"]] == expected[:5]
+    # Only the requested fields, keyed by name
+    assert all(set(ticket) == {"id", "name", "status"} for ticket in found["tickets"])
+
+
+def test_chunks_keep_get_multiple_items_urls_short(glpi_server):
+    from urllib.parse import urlencode
+
+    url = "http://glpi.example.com/apirest.php/getMultipleItems"
+    ids = list(range(1, 200)) + [10 ** 9]
+    chunks = glpi_server.chunk_ids("Ticket", ids, len(url) + 1, 500)
+    assert len(chunks) > 1
+    assert [item_id for chunk in chunks for item_id in chunk] == ids
+    assert all(len(url) + 1 + len(urlencode(glpi_server.items_params("Ticket", chunk))) <= 500 for chunk in chunks)
+
+
+def test_get_tickets_in_several_chunks(glpi_server, glpi, monkeypatch):
+    monkeypatch.setattr(glpi_server, "MAX_URL_LENGTH", 300)
+    ids = [5, 3, 9999, 5, *range(20, 60)]
+
+    async def scenario():
+        async with logged_in(glpi_server, glpi.url) as call:
+            requests = glpi.mock.requests
+            found = await call("glpi_get_tickets", ids=ids, fields=["id", "name"])
+            return found, glpi.mock.requests - requests
+
+    found, requests = asyncio.run(scenario())
+    # In the order asked, once each, and the missing ticket reported as an error
+    assert [ticket["id"] for ticket in found["tickets"]] == [5, 3, *range(20, 60)]
+    assert [error["id"] for error in found["errors"]] == [9999]
+    assert all(set(ticket) == {"id", "name"} for ticket in found["tickets"])
+    assert requests > 1
@@ -0,0 +1,30 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "servers", "spare-parts-retailer"))
+
+import matching
+from matching import RapidfuzzMatcher, process_text
+
+WORDS = ["toyota", "corolla", "corola", "honda", "civic", "ford", "focus", "sport", "hybrid", "camry", "300c"]
+QUERIES = ["Toyota Corola", "honda civic", "Ford", "tesla model 3"]
+
+
+def make_vocabulary(count: int = 3000, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    terms = {process_text(" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) + f" {i % 50}") for i in range(count)}
+    return sorted(terms)
+
+
+def test_parallel_scoring_matches_extract(monkeypatch):
+    pytest.importorskip("numpy")
+    matcher = RapidfuzzMatcher(75)
+    vocabulary = make_vocabulary()
+    monkeypatch.setattr(matching, "MATCH_PARALLEL_MIN_CHOICES", len(vocabulary) + 1)
+    expected = [(matcher.best_match(query, vocabulary), matcher.close_matches(query, vocabulary)) for query in QUERIES]
+    monkeypatch.setattr(matching, "MATCH_PARALLEL_MIN_CHOICES", 0)
+    # Same scores, same order, and ties broken the same way
+    assert [(matcher.best_match(query, vocabulary), matcher.close_matches(query, vocabulary)) for query in QUERIES] == expected
@@ -0,0 +1,103 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "servers", "spare-parts-retailer"))
+
+from catalog_db import SqliteCatalog, SqliteCatalogIndex, SqliteCatalogView, build_catalog_db
+from catalog_index import CatalogIndex
+from result_cache import LookupCache
+
+THRESHOLD = 75
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_part(i: int, part_type: str, car_model: str) -> dict:
+    return {
+        "name": f"{part_type.title()} {i}",
+        "type": part_type,
+        "reference_id": f"REF-{i:03d}",
+        "compatibility": {"model": car_model, "start_year": 2000, "end_year": 2010},
+        "stock": 5,
+        "translations": {},
+    }
+
+
+def make_catalog() -> list[dict]:
+    return [
+        make_part(0, "brake pads", "Toyota Corolla"),
+        make_part(1, "brake pads", "Honda Civic"),
+        make_part(2, "oil filter", "Toyota Corolla"),
+        make_part(3, "spark plug", "Ford Focus"),
+    ]
+
+
+def reference_ids(parts) -> list[str]:
+    return [part["reference_id"] for part in parts]
+
+
+def test_hits_normalized_queries_and_renders_live_stock():
+    parts = make_catalog()
+    cache = LookupCache(CatalogIndex(parts, threshold=THRESHOLD))
+    assert reference_ids(cache.lookup("brake pads", "Toyota Corolla")) == ["REF-000"]
+    parts[0]["stock"] = 1
+    hit = cache.lookup("  Brake PADS ", "toyota corolla!")
+    assert reference_ids(hit) == ["REF-000"] and hit[0]["stock"] == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expires_entries_and_evicts_the_least_recently_used():
+    clock = FakeClock()
+    cache = LookupCache(CatalogIndex(make_catalog(), threshold=THRESHOLD), max_size=2, ttl=10, clock=clock)
+    cache.lookup("brake pads", "Toyota Corolla")
+    cache.lookup("oil filter", "Toyota Corolla")
+    cache.lookup("brake pads", "Toyota Corolla")
+    cache.lookup("spark plug", "Ford Focus")
+    assert cache.evictions == 1
+    # The oil filter lookup was the least recently used
+    cache.lookup("oil filter", "Toyota Corolla")
+    assert cache.misses == 4
+    clock.now = 11
+    cache.lookup("oil filter", "Toyota Corolla")
+    assert cache.expirations == 1
+
+
+def test_catalog_changes_invalidate_affected_entries():
+    parts = make_catalog()
+    index = CatalogIndex(parts, threshold=THRESHOLD)
+    cache = LookupCache(index)
+    cache.lookup("brake pads", "Toyota Corolla")
+    cache.lookup("spark plug", "Ford Focus")
+
+    added = make_part(4, "brake pads", "Toyota Corolla")
+    parts.append(added)
+    index.add_part(added)
+    cache.invalidate_part(added)
+    assert reference_ids(cache.lookup("brake pads", "Toyota Corolla")) == ["REF-000", "REF-004"]
+    # The spark plug lookup was not affected
+    assert cache.invalidations == 1
+
+    removed = index.get_part("REF-000")
+    cache.invalidate_part(removed, removed=True)
+    index.remove_part("REF-000")
+    parts.remove(removed)
+    assert reference_ids(cache.lookup("brake pads", "Toyota Corolla")) == ["REF-004"]
+    assert cache.invalidations == 2
+
+
+def test_changes_made_by_another_worker_clear_the_cache(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    build_catalog_db(make_catalog(), path)
+    writer = SqliteCatalog(path)
+    reader = SqliteCatalogIndex(SqliteCatalogView(SqliteCatalog(path)), threshold=THRESHOLD)
+    cache = LookupCache(reader)
+    assert reference_ids(cache.lookup("brake pads", "Toyota Corolla")) == ["REF-000"]
+    writer.add_part(make_part(4, "brake pads", "Toyota Corolla"))
+    assert reference_ids(cache.lookup("brake pads", "Toyota Corolla")) == ["REF-000", "REF-004"]
+    assert cache.hits == 0
@@ -0,0 +1,150 @@
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "servers", "spare-parts-retailer"))
+
+from catalog_db import SqliteCatalog, build_catalog_db
+from stock import IdempotencyConflict, SqliteStockLedger, StockLedger
+
+ORDERS = 600
+THREADS = 32
+
+
+def make_parts(count: int = 10, stock: int = 20) -> list[dict]:
+    return [
+        {
+            "name": f"Brake Pads {i}",
+            "type": "brake pads",
+            "reference_id": f"REF-{i:05d}",
+            "compatibility": {"model": "Toyota Corolla", "start_year": 2000, "end_year": 2010},
+            "stock": stock,
+        }
+        for i in range(count)
+    ]
+
+
+class SlowPart(dict):
+    """A part whose stock takes a while to read, which widens the window between check and update."""
+
+    def __getitem__(self, key):
+        if key == "stock":
+            time.sleep(0.001)
+        return super().__getitem__(key)
+
+
+def in_memory_workers(parts: list[dict]) -> list[tuple]:
+    return [(StockLedger(), [SlowPart(part) for part in parts])]
+
+
+def sqlite_workers(parts: list[dict], path: str, count: int = 2) -> list[tuple]:
+    """Several connections to the same file, like scaled-out server instances."""
+    build_catalog_db(parts, path)
+    workers = []
+    for _ in range(count):
+        db = SqliteCatalog(path)
+        workers.append((SqliteStockLedger(db), db.parts()))
+    return workers
+
+
+def total_stock(workers: list[tuple]) -> int:
+    _, parts = workers[0]
+    return sum(part["stock"] for part in parts)
+
+
+def place_orders(workers: list[tuple], seed: int = 0) -> int:
+    """Places random orders from a thread pool, retries each one on another worker, and returns the units sold."""
+    rng = random.Random(seed)
+    part_count = len(workers[0][1])
+    plan = [(i, rng.randrange(part_count), rng.randint(1, 3)) for i in range(ORDERS)]
+
+    def order(i: int, index: int, quantity: int) -> int:
+        key = f"order-{i}"
+        ledger, parts = workers[i % len(workers)]
+        result = ledger.reserve(parts[index], quantity, f"customer-{i}", idempotency_key=key)
+        retry_ledger, retry_parts = workers[(i + 1) % len(workers)]
+        retry = retry_ledger.reserve(retry_parts[index], quantity, f"customer-{i}", idempotency_key=key)
+        if result.reserved:
+            assert retry.reserved and retry.replayed and retry.stock == result.stock
+            return quantity
+        # Stock only goes down, so the retry of an out-of-stock order fails as well
+        assert not retry.reserved and not retry.replayed
+        return 0
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        return sum(executor.map(lambda args: order(*args), plan))
+
+
+def reserve_with_one_key(workers: list[tuple]) -> list:
+    """Reserves a different part from each thread, all with the same idempotency key."""
+    part_count = len(workers[0][1])
+    barrier = threading.Barrier(part_count)
+
+    def order(index: int):
+        ledger, parts = workers[index % len(workers)]
+        barrier.wait()
+        try:
+            return ledger.reserve(parts[index], 1, "customer", idempotency_key="shared-key")
+        except IdempotencyConflict as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=part_count) as executor:
+        return list(executor.map(order, range(part_count)))
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def workers(request, tmp_path):
+    parts = make_parts()
+    if request.param == "memory":
+        return in_memory_workers(parts)
+    return sqlite_workers(parts, str(tmp_path / "catalog.db"))
+
+
+def test_concurrent_orders_never_oversell(workers):
+    initial = total_stock(workers)
+    sold = place_orders(workers)
+    _, parts = workers[0]
+    assert all(part["stock"] >= 0 for part in parts)
+    # Every unit that left the stock was sold once, retries took nothing
+    assert initial - total_stock(workers) == sold
+    # The orders exceed the stock, so some of them were turned down
+    assert total_stock(workers) < len(parts) * 3
+
+
+def test_one_key_reserves_once_across_parts(workers):
+    initial = total_stock(workers)
+    results = reserve_with_one_key(workers)
+    reserved = [result for result in results if not isinstance(result, Exception) and result.reserved and not result.replayed]
+    assert len(reserved) == 1
+    assert all(isinstance(result, IdempotencyConflict) for result in results if result is not reserved[0])
+    assert initial - total_stock(workers) == 1
+
+
+def test_batch_orders_replay_by_key(workers):
+    (ledger, parts), (retry_ledger, retry_parts) = workers[0], workers[-1]
+    initial = total_stock(workers)
+    first = ledger.reserve_many([(parts[0], 2), (parts[1], 1)], "customer", idempotency_key="cart")
+    retry = retry_ledger.reserve_many([(retry_parts[0], 2), (retry_parts[1], 1)], "customer", idempotency_key="cart")
+    assert first.reserved and not first.replayed
+    assert retry.reserved and retry.replayed and retry.stocks == first.stocks
+    assert initial - total_stock(workers) == 3
+    # The key of a cart cannot be reused for another cart, nor for a single-part order
+    with pytest.raises(IdempotencyConflict):
+        ledger.reserve_many([(parts[0], 1)], "customer", idempotency_key="cart")
+    with pytest.raises(IdempotencyConflict):
+        retry_ledger.reserve(retry_parts[0], 2, "customer", idempotency_key="cart")
+    assert initial - total_stock(workers) == 3
+
+
+def test_out_of_stock_batch_records_no_key(workers):
+    ledger, parts = workers[0]
+    too_many = [(parts[0], 1), (parts[1], parts[1]["stock"] + 1)]
+    assert not ledger.reserve_many(too_many, "customer", idempotency_key="cart").reserved
+    # Nothing was ordered under the key, so it can place the order once the cart fits the stock
+    reservation = ledger.reserve_many([(parts[0], 1)], "customer", idempotency_key="cart")
+    assert reservation.reserved and not reservation.replayed
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "servers", "glpi-mcp"))
+
+from ticket_cache import TicketCache
+
+GLPI_URL = "http://glpi"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeGlpi:
+    """Counts the fetches of each ticket, whose title changes with every write."""
+
+    def __init__(self):
+        self.fetches = 0
+        self.titles = {}
+
+    def fetch(self, ticket_id: int):
+        async def fetch():
+            self.fetches += 1
+            return {"id": ticket_id, "name": self.titles.get(ticket_id, f"Ticket {ticket_id}")}
+        return fetch
+
+
+def test_caches_tickets_per_identity():
+    glpi, cache = FakeGlpi(), TicketCache()
+
+    async def scenario():
+        await cache.get(GLPI_URL, "alice", 1, glpi.fetch(1))
+        await cache.get(GLPI_URL, "alice", 1, glpi.fetch(1))
+        # Another user may have other rights on the ticket
+        await cache.get(GLPI_URL, "bob", 1, glpi.fetch(1))
+        await cache.get(GLPI_URL, "alice", 1, glpi.fetch(1), bypass_cache=True)
+
+    asyncio.run(scenario())
+    assert glpi.fetches == 3
+    assert (cache.hits, cache.misses, cache.bypasses) == (1, 2, 1)
+
+
+def test_expires_and_evicts_tickets():
+    glpi, clock = FakeGlpi(), FakeClock()
+    cache = TicketCache(max_size=2, ttl=10, clock=clock)
+
+    async def scenario():
+        for ticket_id in (1, 2, 1, 3):
+            await cache.get(GLPI_URL, "alice", ticket_id, glpi.fetch(ticket_id))
+        # Ticket 2 was the least recently used
+        await cache.get(GLPI_URL, "alice", 2, glpi.fetch(2))
+        clock.now = 11
+        await cache.get(GLPI_URL, "alice", 2, glpi.fetch(2))
+
+    asyncio.run(scenario())
+    assert glpi.fetches == 5
+    assert (cache.evictions, cache.expirations) == (2, 1)
+
+
+def test_writes_invalidate_every_identity_and_racing_reads():
+    glpi, cache = FakeGlpi(), TicketCache()
+
+    async def scenario():
+        for identity in ("alice", "bob"):
+            await cache.get(GLPI_URL, identity, 1, glpi.fetch(1))
+        glpi.titles[1] = "Renamed"
+        cache.invalidate(GLPI_URL, [1])
+        assert (await cache.get(GLPI_URL, "bob", 1, glpi.fetch(1)))["name"] == "Renamed"
+
+        # A write landing while a read is fetching keeps the read out of the cache
+        async def racing_fetch():
+            ticket = await glpi.fetch(2)()
+            cache.invalidate(GLPI_URL, [2])
+            return ticket
+
+        await cache.get(GLPI_URL, "alice", 2, racing_fetch)
+        await cache.get(GLPI_URL, "alice", 2, glpi.fetch(2))
+
+    asyncio.run(scenario())
+    assert cache.invalidations == 2
+    assert glpi.fetches == 5
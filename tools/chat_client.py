@@ -2,13 +2,175 @@ import argparse
 import json
 import os
 import asyncio
-from openai import AzureOpenAI
-from mcp.client.aio import Client, Tool
+from fastmcp import Client
+from fastmcp.client.messages import MessageHandler
+from mcp.types import Tool
+from openai import AsyncAzureOpenAI
+
+from chat_history import ChatHistory
+from mcp_fanout import ServerGroup, duplicate_names, server_name, unique_server_name
+
+# Tool calls of one LLM response run at the same time, up to this many
+DEFAULT_TOOL_CONCURRENCY = 8
+# Seconds before a tool call is abandoned and reported to the LLM as timed out
+DEFAULT_TOOL_TIMEOUT = 60.0
+# Seconds given to the servers to connect at startup: later ones are left out
+DEFAULT_CONNECT_TIMEOUT = 15.0
+# Tokens of history sent to the LLM each turn: tool results are capped to a share of it, older ones truncated, then older turns dropped
+DEFAULT_HISTORY_TOKENS = 16000
+# Separates the server name from the tool name in the tool names shown to the LLM
+NAMESPACE_SEPARATOR = "__"
+
+
+class ToolRegistry:
+    """
+    Tools of the connected MCP servers, namespaced by server (server__tool) so names never collide.
+
+    The merged tool list and its OpenAI schemas are built once, and rebuilt only when a server
+    sends a tools/list_changed notification, instead of being converted on every turn.
+    """
+
+    def __init__(self):
+        self.clients = {}
+        self._tools = {}
+        # Namespaced name -> (server name, MCP tool)
+        self.tools_by_name = {}
+        self.openai_tools = []
+        # Pending refreshes, referenced until they end
+        self._refreshes = set()
+
+    def message_handler(self, server: str) -> MessageHandler:
+        """Returns the handler refreshing the tools of a server when its tool list changes."""
+        registry = self
+
+        class ToolListHandler(MessageHandler):
+            async def on_tool_list_changed(self, message):
+                if server in registry.clients:
+                    task = asyncio.create_task(registry.refresh(server))
+                    registry._refreshes.add(task)
+                    task.add_done_callback(registry._refreshes.discard)
+
+        return ToolListHandler()
+
+    async def add_servers(self, clients: dict[str, Client]):
+        self.clients.update(clients)
+        await asyncio.gather(*(self.refresh(server) for server in clients))
+
+    async def refresh(self, server: str):
+        try:
+            self._tools[server] = await self.clients[server].list_tools()
+        except Exception as e:
+            print(f"Failed to list the tools of MCP server {server}: {e}")
+            return
+        self.tools_by_name = {
+            f"{name}{NAMESPACE_SEPARATOR}{tool.name}": (name, tool) for name, tools in self._tools.items() for tool in tools
+        }
+        self.openai_tools = [self.to_openai(name, tool) for name, tool in self.tools_by_name.values()]
+
+    @staticmethod
+    def to_openai(server: str, tool: Tool) -> dict:
+        return {
+            "type": "function",
+            "function": {
+                "name": f"{server}{NAMESPACE_SEPARATOR}{tool.name}",
+                "description": tool.description or "",
+                # Renamed input_schema by MCP SDK v2
+                "parameters": getattr(tool, "input_schema", None) or tool.inputSchema,
+            },
+        }
+
+    async def call(self, name: str, arguments: dict) -> str:
+        """Calls a tool by its namespaced name, and returns its result as text."""
+        server, tool = self.tools_by_name[name]
+        result = await self.clients[server].call_tool(tool.name, arguments, raise_on_error=False)
+        text = "\n".join(getattr(block, "text", str(block)) for block in result.content)
+        return f"Error: {text}" if result.is_error else text
+
+
+async def read_input(prompt: str) -> str:
+    """Reads a line from stdin in a worker thread, so the event loop keeps serving MCP I/O meanwhile."""
+    return await asyncio.to_thread(input, prompt)
+
+
+async def stream_completion(llm_client: AsyncAzureOpenAI, history: ChatHistory, **kwargs) -> dict:
+    """
+    Streams a chat completion on the history, printing its text as it arrives, and returns the assistant message.
+
+    The history is first compacted to its token budget, and the size of the prompt is reported.
+    Tool calls arrive in fragments (name first, then pieces of the JSON arguments): they are
+    assembled by index into the message, in the format of the chat completions API.
+    """
+    compacted = history.compact()
+    print(f"[prompt: {history.tokens} tokens, {len(history.messages)} messages"
+          + (f", {compacted['truncated']} tool results truncated" if compacted["truncated"] else "")
+          + (f", {compacted['dropped']} turns dropped" if compacted["dropped"] else "") + "]")
+    stream = await llm_client.chat.completions.create(stream=True, messages=history.messages, **kwargs)
+    content = []
+    tool_calls = {}
+    async for chunk in stream:
+        if not chunk.choices:
+            # Azure sends a first chunk with the prompt filter results only
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            if not content:
+                print("AI: ", end="", flush=True)
+            content.append(delta.content)
+            print(delta.content, end="", flush=True)
+        for fragment in delta.tool_calls or []:
+            tool_call = tool_calls.setdefault(fragment.index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+            if fragment.id:
+                tool_call["id"] = fragment.id
+            if fragment.function and fragment.function.name:
+                tool_call["function"]["name"] += fragment.function.name
+            if fragment.function and fragment.function.arguments:
+                tool_call["function"]["arguments"] += fragment.function.arguments
+    if content:
+        print()
+    message = {"role": "assistant", "content": "".join(content) or None}
+    if tool_calls:
+        message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+    return message
+
+
+async def run_tool_call(tool_call: dict, registry: ToolRegistry, semaphore: asyncio.Semaphore, timeout: float) -> dict:
+    """Runs one tool call requested by the LLM, and returns its tool message (errors included, so the LLM sees them)."""
+    function_name = tool_call["function"]["name"]
+    try:
+        function_args = json.loads(tool_call["function"]["arguments"] or "{}")
+        print(f"LLM wants to call tool: {function_name} with args: {function_args}")
+        if function_name not in registry.tools_by_name:
+            print(f"Error: Tool '{function_name}' not found.")
+            content = f"Error: Tool '{function_name}' not found."
+        else:
+            async with semaphore:
+                content = await asyncio.wait_for(registry.call(function_name, function_args), timeout)
+    except asyncio.TimeoutError:
+        print(f"Error: Tool '{function_name}' timed out after {timeout:g}s.")
+        content = f"Error: Tool '{function_name}' timed out after {timeout:g} seconds."
+    except Exception as e:
+        print(f"Error: Tool '{function_name}' failed: {e}")
+        content = f"Error: Tool '{function_name}' failed: {e}"
+    return {
+        "tool_call_id": tool_call["id"],
+        "role": "tool",
+        "name": function_name,
+        "content": content,
+    }
+
 
 async def main():
     """Main function to run the MCP client and chat with the Azure AI LLM."""
     parser = argparse.ArgumentParser(description="MCP Client for Azure AI Chat")
     parser.add_argument("config_file", help="Path to the JSON config file with server URLs.")
+    parser.add_argument("--connect-timeout", type=float, default=DEFAULT_CONNECT_TIMEOUT,
+                        help=f"Seconds given to the servers to connect (default: {DEFAULT_CONNECT_TIMEOUT:g}).")
+    parser.add_argument("--tool-concurrency", type=int, default=DEFAULT_TOOL_CONCURRENCY,
+                        help=f"Tool calls of one LLM response run at the same time (default: {DEFAULT_TOOL_CONCURRENCY}).")
+    parser.add_argument("--tool-timeout", type=float, default=DEFAULT_TOOL_TIMEOUT,
+                        help=f"Seconds before a tool call times out (default: {DEFAULT_TOOL_TIMEOUT:g}).")
+    parser.add_argument("--history-tokens", type=int, default=DEFAULT_HISTORY_TOKENS,
+                        help=f"Token budget of the conversation history sent each turn (default: {DEFAULT_HISTORY_TOKENS}).")
     args = parser.parse_args()
 
     # --- 1. Load Configuration ---
@@ -24,17 +186,38 @@ async def main():
         return
 
     # --- 2. Connect to MCP Servers ---
-    mcp_client = Client()
-    for url in server_urls:
-        try:
-            await mcp_client.connect(url)
-            print(f"Successfully connected to MCP server at {url}")
-        except Exception as e:
-            print(f"Failed to connect to MCP server at {url}: {e}")
-    
-    tools = await mcp_client.get_tools()
-    if not tools:
+    # Servers are URLs, or {"name": ..., "url": ...} to choose the prefix of their tools
+    names = [server["name"] for server in server_urls if isinstance(server, dict) and server.get("name")]
+    if duplicate_names(names):
+        print(f"Error: several servers are named {', '.join(duplicate_names(names))} in {args.config_file}")
+        return
+    servers = {}
+    for server in server_urls:
+        url = server["url"] if isinstance(server, dict) else server
+        name = server.get("name") if isinstance(server, dict) else None
+        if not name:
+            # Names derived from URLs may collide (e.g. two paths on one host): suffix the later ones
+            name = unique_server_name(server_name(url), set(servers) | set(names))
+            if name != server_name(url):
+                print(f"Warning: MCP server {url} is named {name}, as another server is named {server_name(url)}")
+        servers[name] = url
+    registry = ToolRegistry()
+    # Connect in parallel: startup takes as long as the slowest server, up to the deadline
+    mcp_servers = await ServerGroup(
+        {name: Client(url, message_handler=registry.message_handler(name)) for name, url in servers.items()},
+        deadline=args.connect_timeout,
+    ).open()
+    for name in servers:
+        if name in mcp_servers.connected:
+            print(f"Successfully connected to MCP server {name} at {servers[name]}")
+        else:
+            print(f"Failed to connect to MCP server {name} at {servers[name]}: {mcp_servers.failed[name]}")
+    await registry.add_servers(mcp_servers.connected)
+
+    if not registry.tools_by_name:
         print("No tools found on any connected MCP server.")
+    # Shared by all turns, so the cap holds for the whole client
+    tool_semaphore = asyncio.Semaphore(args.tool_concurrency)
 
     # --- 3. Setup Azure AI Client ---
     try:
@@ -43,9 +226,10 @@ async def main():
         azure_model_name = os.environ["AZURE_AI_MODEL_NAME"]
     except KeyError as e:
         print(f"Error: Missing environment variable {e}. Please set AZURE_AI_ENDPOINT, AZURE_AI_API_KEY, and AZURE_AI_MODEL_NAME.")
+        await mcp_servers.close()
         return
 
-    azure_llm_client = AzureOpenAI(
+    azure_llm_client = AsyncAzureOpenAI(
         azure_endpoint=azure_endpoint,
         api_key=azure_api_key,
         api_version="2024-02-01", # Adjust if necessary
@@ -55,67 +239,52 @@ async def main():
     print("\n--- MCP Chat Client ---")
     print("Type 'exit' to end the conversation.")
     
-    messages = []
+    # Bounded by a token budget, so long sessions keep a flat per-turn cost
+    history = ChatHistory(args.history_tokens, model=azure_model_name)
 
     while True:
-        user_input = input("\nYou: ")
+        user_input = await read_input("\nYou: ")
         if user_input.lower() == 'exit':
             break
 
-        messages.append({"role": "user", "content": user_input})
+        history.append({"role": "user", "content": user_input})
 
         try:
-            response = azure_llm_client.chat.completions.create(
+            # Streamed: the answer is printed from its first token, not once it is complete
+            response_message = await stream_completion(
+                azure_llm_client,
+                history,
                 model=azure_model_name,
-                messages=messages,
-                tools=[tool.to_openai() for tool in tools],
-                tool_choice="auto",
+                **({"tools": registry.openai_tools, "tool_choice": "auto"} if registry.openai_tools else {}),
             )
-
-            response_message = response.choices[0].message
-            tool_calls = response_message.tool_calls
+            tool_calls = response_message.get("tool_calls")
 
             if tool_calls:
-                messages.append(response_message)
-                for tool_call in tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-                    
-                    print(f"LLM wants to call tool: {function_name} with args: {function_args}")
-
-                    # Find and execute the tool
-                    tool_to_run = next((t for t in tools if t.name == function_name), None)
-                    if tool_to_run:
-                        result = await tool_to_run.run(**function_args)
-                        messages.append(
-                            {
-                                "tool_call_id": tool_call.id,
-                                "role": "tool",
-                                "name": function_name,
-                                "content": str(result),
-                            }
-                        )
-                    else:
-                        print(f"Error: Tool '{function_name}' not found.")
-                
+                history.append(response_message)
+                # Run the tool calls concurrently: the turn takes as long as the slowest one.
+                # gather keeps the results in the order of the calls, each answering its tool_call_id.
+                tool_messages = await asyncio.gather(*(
+                    run_tool_call(tool_call, registry, tool_semaphore, args.tool_timeout)
+                    for tool_call in tool_calls
+                ))
+                history.extend(tool_messages)
+
                 # Get the final response from the LLM after tool execution
-                second_response = azure_llm_client.chat.completions.create(
+                final_message = await stream_completion(
+                    azure_llm_client,
+                    history,
                     model=azure_model_name,
-                    messages=messages,
                 )
-                final_message = second_response.choices[0].message.content
-                print(f"AI: {final_message}")
-                messages.append({"role": "assistant", "content": final_message})
+                history.append({"role": "assistant", "content": final_message["content"]})
             else:
-                ai_message = response_message.content
-                print(f"AI: {ai_message}")
-                messages.append({"role": "assistant", "content": ai_message})
+                history.append(response_message)
 
         except Exception as e:
             print(f"An error occurred: {e}")
-            messages.pop() # Remove the user message that caused the error
+            history.drop_last_turn() # Remove the user message that caused the error, and its tool calls
 
-    await mcp_client.close()
+    await azure_llm_client.close()
+    await mcp_servers.close()
     print("Client shut down.")
 
 if __name__ == "__main__":
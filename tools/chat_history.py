@@ -0,0 +1,138 @@
+"""
+Conversation history of the chat client, kept under a token budget.
+
+Each turn resends the whole history to the LLM, so without a bound the prompt, and with it the
+latency and cost of every turn, grows with the conversation, most of all with large tool results.
+ChatHistory counts the tokens of each message once, when it is added, and caps each tool result
+to a share of the budget, so that a single large result cannot overflow the turn that needs it.
+Before each LLM call, it compacts the older turns to fit the budget:
+
+1. tool results of previous turns are truncated, oldest first;
+2. if that is not enough, the oldest turns are dropped whole, so a tool call is never separated
+   from its result. The current turn is always kept.
+
+Tokens are counted with tiktoken when it is installed, and estimated from the length otherwise.
+"""
+import json
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Tokens added by the chat format around each message
+MESSAGE_OVERHEAD = 4
+# Characters kept of a truncated tool result
+TRUNCATED_TOOL_CHARS = 500
+# Largest share of the token budget a single tool result may take
+MAX_TOOL_RESULT_SHARE = 0.25
+
+
+def token_counter(model: str | None = None):
+    """Returns a function counting the tokens of a text for the model (an estimate without tiktoken)."""
+    if tiktoken is None:
+        # About 4 characters per token for English text and JSON
+        return lambda text: len(text) // 4 + 1
+    try:
+        encoding = tiktoken.encoding_for_model(model or "")
+    except KeyError:
+        # Azure deployment names are not model names
+        encoding = tiktoken.get_encoding("o200k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+class ChatHistory:
+    """Messages of a conversation, in the chat completions format, with their token counts."""
+
+    def __init__(self, budget_tokens: int, model: str | None = None, truncated_tool_chars: int = TRUNCATED_TOOL_CHARS,
+                 max_tool_result_share: float = MAX_TOOL_RESULT_SHARE):
+        self.budget_tokens = budget_tokens
+        self.truncated_tool_chars = truncated_tool_chars
+        self.max_tool_result_tokens = int(budget_tokens * max_tool_result_share)
+        self.count_tokens = token_counter(model)
+        self.messages = []
+        self._message_tokens = []
+        # Whether each message is a truncated tool result already, and the length of its original content
+        self._truncated = []
+        self._content_chars = []
+        self.tokens = 0
+
+    def _tokens_of(self, message: dict) -> int:
+        text = message.get("content") or ""
+        if message.get("tool_calls"):
+            text += json.dumps(message["tool_calls"])
+        return self.count_tokens(text) + MESSAGE_OVERHEAD
+
+    def _shortened(self, message: dict, content_chars: int, kept_chars: int) -> dict:
+        kept = message["content"][:kept_chars]
+        return {**message, "content": f"{kept}... [{content_chars - len(kept)} characters truncated]"}
+
+    def _capped(self, message: dict, tokens: int) -> tuple[dict, int]:
+        """Shortens a tool result to max_tool_result_tokens, keeping as much of its start as fits."""
+        if message["role"] != "tool" or tokens <= self.max_tool_result_tokens:
+            return message, tokens
+        content_chars = len(message["content"])
+        kept_chars = content_chars * self.max_tool_result_tokens // tokens
+        while True:
+            capped = self._shortened(message, content_chars, kept_chars)
+            capped_tokens = self._tokens_of(capped)
+            if capped_tokens <= self.max_tool_result_tokens or not kept_chars:
+                return capped, capped_tokens
+            # Token counts are not proportional to lengths: shrink by the excess, by at least one character
+            kept_chars = min(kept_chars - 1, kept_chars * self.max_tool_result_tokens // capped_tokens)
+
+    def append(self, message: dict):
+        content_chars = len(message.get("content") or "")
+        message, tokens = self._capped(message, self._tokens_of(message))
+        self.messages.append(message)
+        self._message_tokens.append(tokens)
+        self._truncated.append(False)
+        self._content_chars.append(content_chars)
+        self.tokens += tokens
+
+    def extend(self, messages: list[dict]):
+        for message in messages:
+            self.append(message)
+
+    def drop_last_turn(self):
+        """Drops the last user message and the messages answering it, e.g. after the turn failed."""
+        users = [index for index, message in enumerate(self.messages) if message["role"] == "user"]
+        if users:
+            self._drop(users[-1], len(self.messages))
+
+    def _drop(self, start: int, end: int):
+        self.tokens -= sum(self._message_tokens[start:end])
+        del self.messages[start:end]
+        del self._message_tokens[start:end]
+        del self._truncated[start:end]
+        del self._content_chars[start:end]
+
+    def _truncate(self, index: int):
+        truncated_message = self._shortened(self.messages[index], self._content_chars[index], self.truncated_tool_chars)
+        tokens = self._tokens_of(truncated_message)
+        self.tokens += tokens - self._message_tokens[index]
+        self.messages[index] = truncated_message
+        self._message_tokens[index] = tokens
+        self._truncated[index] = True
+
+    def compact(self) -> dict:
+        """Truncates old tool results, then drops old turns, until the history fits the budget. Returns what was done."""
+        truncated = dropped = 0
+        if self.tokens <= self.budget_tokens:
+            return {"truncated": truncated, "dropped": dropped}
+        turns = [index for index, message in enumerate(self.messages) if message["role"] == "user"]
+        current_turn = turns[-1] if turns else len(self.messages)
+        for index in range(current_turn):
+            if self.tokens <= self.budget_tokens:
+                break
+            message = self.messages[index]
+            if message["role"] == "tool" and not self._truncated[index] and len(message.get("content") or "") > self.truncated_tool_chars:
+                self._truncate(index)
+                truncated += 1
+        # Drop whole turns (a user message and the calls and results that answer it), oldest first
+        while self.tokens > self.budget_tokens and len(turns) > 1:
+            end = turns[1]
+            self._drop(turns[0], end)
+            dropped += 1
+            turns = [index - (end - turns[0]) for index in turns[1:]]
+        return {"truncated": truncated, "dropped": dropped}
@@ -0,0 +1,187 @@
+"""
+Headless load generator for MCP servers: no LLM, so it runs fully offline.
+
+    python tools/load_client.py --config tools/load_config_spare_parts.json --sessions 16 --rate 100 --duration 30
+
+It reads the agent_config_*.json format: the server to load is the 'mcp_plugin' (stdio: one
+server process per session, or http: one MCP session each on the same server). The 'load'
+section lists the recorded tool calls to replay, each with a weight in the mix:
+
+    "load": {
+      "sessions": 8, "rate": 50, "duration": 30,
+      "calls": [{"tool": "check_availability", "arguments": {"part_type": "gearbox", "car_model": "Chrysler 300C"}, "weight": 5}]
+    }
+
+Calls are due at the target rate (open loop) and started by whichever session is free; with rate 0
+each session calls back to back. In open loop, latencies count from the time a call was due, so the
+time it waited for a free session shows, and the calls still waiting at the end are dropped and
+counted apart. The report gives the throughput, latency percentiles and error rate of each tool.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+
+from fastmcp import Client
+from fastmcp.client.transports import StdioTransport
+
+from mcp_fanout import ServerGroup
+
+
+def percentile(latencies: list[float], p: float) -> float:
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] if latencies else 0.0
+
+
+def create_client(mcp_plugin_config: dict) -> Client:
+    """Creates a client for the server of an agent configuration: each stdio client starts its own server."""
+    plugin_type = mcp_plugin_config.get('type', 'stdio')
+    if plugin_type == 'stdio':
+        transport = StdioTransport(mcp_plugin_config['command'], mcp_plugin_config.get('args', []), env=mcp_plugin_config.get('env'))
+    elif plugin_type == 'http':
+        transport = mcp_plugin_config['url']
+    else:
+        raise ValueError(f"Unsupported plugin type: {plugin_type}")
+    try:
+        # A stateful MCP session, so state kept by the server between calls (like a login) holds
+        return Client(transport, mode="legacy")
+    except TypeError:
+        # Before FastMCP 4, clients always open a session with the initialize handshake
+        return Client(transport)
+
+
+class LoadStats:
+    """Latencies and errors of the calls, per tool."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_messages = defaultdict(int)
+        # Calls still waiting for a session at the end of the load (open loop)
+        self.dropped = 0
+
+    def record(self, tool: str, latency: float, error: str | None):
+        self.latencies[tool].append(latency)
+        if error is not None:
+            self.errors[tool] += 1
+            self.error_messages[f"{tool}: {error[:100]}"] += 1
+
+    def report(self, elapsed: float, target_rate: float):
+        calls = sum(len(latencies) for latencies in self.latencies.values())
+        errors = sum(self.errors.values())
+        rate = f" (target {target_rate:g}/s, {self.dropped} due but not started by the end)" if target_rate else ""
+        print(f"\n{calls} calls in {elapsed:.1f}s: {calls / elapsed:.1f} calls/s{rate}, {errors} errors ({errors / max(calls, 1):.1%})")
+        print(f"{'tool':<24}{'calls':>8}{'calls/s':>9}{'errors':>8}{'err %':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for tool, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            print(
+                f"{tool:<24}{len(latencies):>8}{len(latencies) / elapsed:>9.1f}{self.errors[tool]:>8}{self.errors[tool] / len(latencies):>7.1%}"
+                + "".join(f"{percentile(latencies, p) * 1000:>9.1f}" for p in (50, 95, 99))
+                + f"{latencies[-1] * 1000:>9.1f}"
+            )
+        for message, count in sorted(self.error_messages.items(), key=lambda item: -item[1])[:5]:
+            print(f"  {count} x {message}")
+
+
+async def call_tool(client: Client, call: dict, timeout: float, stats: LoadStats, due: float | None = None):
+    """Calls a tool and records its latency, counted from the time the call was due if given."""
+    start = time.perf_counter() if due is None else due
+    try:
+        result = await asyncio.wait_for(client.call_tool(call['tool'], call.get('arguments', {}), raise_on_error=False), timeout)
+        error = ("".join(getattr(block, "text", "") for block in result.content) or "error") if result.is_error else None
+    except asyncio.TimeoutError:
+        error = f"timed out after {timeout:g}s"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    stats.record(call['tool'], time.perf_counter() - start, error)
+
+
+async def run_load(clients: list[Client], calls: list[dict], rate: float, duration: float, timeout: float, seed: int) -> tuple[LoadStats, float]:
+    """
+    Replays the weighted mix of calls on the sessions for duration seconds, and returns the stats and elapsed time.
+
+    In open loop, the elapsed time is the scheduled duration: the calls still running at its end
+    are waited for, but not counted in it.
+    """
+    rng = random.Random(seed)
+    weights = [call.get('weight', 1) for call in calls]
+    stats = LoadStats()
+    deadline = time.perf_counter() + duration
+
+    if rate:
+        # Open loop: a call is due every 1/rate seconds, and waits for a free session if all are busy
+        due = asyncio.Queue()
+
+        async def schedule():
+            interval = 1 / rate
+            next_call = time.perf_counter()
+            while next_call < deadline:
+                due.put_nowait((rng.choices(calls, weights)[0], next_call))
+                next_call += interval
+                await asyncio.sleep(max(0.0, next_call - time.perf_counter()))
+            for _ in clients:
+                due.put_nowait(None)
+
+        async def session(client: Client):
+            while (item := await due.get()) is not None:
+                call, due_time = item
+                if time.perf_counter() >= deadline:
+                    stats.dropped += 1
+                    continue
+                await call_tool(client, call, timeout, stats, due_time)
+
+        await asyncio.gather(schedule(), *(session(client) for client in clients))
+        return stats, duration
+    else:
+        async def session(client: Client):
+            while time.perf_counter() < deadline:
+                await call_tool(client, rng.choices(calls, weights)[0], timeout, stats)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(session(client) for client in clients))
+    return stats, time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay a weighted mix of tool calls on concurrent MCP sessions, without an LLM.")
+    parser.add_argument('--config', required=True, help="Agent configuration file, with a 'load' section.")
+    parser.add_argument('--sessions', type=int, help="Concurrent MCP sessions (default: load.sessions, or 8).")
+    parser.add_argument('--rate', type=float, help="Target calls per second over all sessions, 0 for back to back (default: load.rate, or 0).")
+    parser.add_argument('--duration', type=float, help="Seconds of load (default: load.duration, or 30).")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Seconds before a call counts as failed (default: 30).")
+    parser.add_argument('--connect-timeout', type=float, default=60.0, help="Seconds given to the sessions to connect (default: 60).")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the call mix (default: 0).")
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as config_file:
+        config = json.load(config_file)
+    load_config = config.get('load', {})
+    calls = load_config.get('calls', [])
+    if not calls:
+        parser.error(f"no calls to replay in the 'load' section of {args.config}")
+    sessions = args.sessions or load_config.get('sessions', 8)
+    rate = args.rate if args.rate is not None else load_config.get('rate', 0)
+    duration = args.duration or load_config.get('duration', 30)
+
+    # Sessions connect in parallel, so startup takes as long as the slowest one
+    start = time.perf_counter()
+    clients = {f"session-{i}": create_client(config['mcp_plugin']) for i in range(sessions)}
+    async with ServerGroup(clients, deadline=args.connect_timeout) as mcp_sessions:
+        print(f"{len(mcp_sessions.connected)} of {sessions} sessions connected to {config['mcp_plugin'].get('name', 'the server')} "
+              f"in {time.perf_counter() - start:.1f}s")
+        for name, error in list(mcp_sessions.failed.items())[:3]:
+            print(f"  {name} failed: {error}")
+        if not mcp_sessions.connected:
+            return
+        for setup_call in load_config.get('setup', []):
+            # Calls made once per session before the load, like a login
+            await asyncio.gather(*(client.call_tool(setup_call['tool'], setup_call.get('arguments', {}))
+                                   for client in mcp_sessions.connected.values()))
+        print(f"Replaying {len(calls)} recorded calls for {duration:g}s" + (f" at {rate:g} calls/s" if rate else ", back to back"))
+        stats, elapsed = await run_load(list(mcp_sessions.connected.values()), calls, rate, duration, args.timeout, args.seed)
+    stats.report(elapsed, rate)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
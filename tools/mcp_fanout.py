@@ -0,0 +1,88 @@
+"""
+Parallel connection to several MCP servers, shared by the chat clients.
+
+Each connection (a fastmcp Client, a Semantic Kernel MCP plugin, or any async context manager)
+is opened and later closed by its own task: MCP transports run anyio task groups, which must be
+exited by the task that entered them. Startup then takes as long as the slowest server, and a
+deadline keeps a server that does not answer from holding up the others.
+"""
+import asyncio
+import re
+from contextlib import AbstractAsyncContextManager
+from urllib.parse import urlsplit
+
+
+def server_name(url: str) -> str:
+    """Derives a server name usable in tool names (letters, digits, _ and -) from its URL or command."""
+    parts = urlsplit(url)
+    return re.sub(r"[^A-Za-z0-9_-]", "_", parts.netloc or url).strip("_")
+
+
+def duplicate_names(names: list[str]) -> list[str]:
+    """Returns the names given to more than one server."""
+    return sorted({name for name in names if names.count(name) > 1})
+
+
+def unique_server_name(name: str, taken: set[str]) -> str:
+    """Returns the name, or the name with the first free suffix (_2, _3...) if another server has it."""
+    unique, suffix = name, 2
+    while unique in taken:
+        unique, suffix = f"{name}_{suffix}", suffix + 1
+    return unique
+
+
+class ServerGroup:
+    """MCP connections opened in parallel, each held open by its own task until the group is closed."""
+
+    def __init__(self, connections: dict[str, AbstractAsyncContextManager], deadline: float):
+        self.connections = connections
+        self.deadline = deadline
+        # Server name -> value of its async with (the connected client or plugin)
+        self.connected = {}
+        # Server name -> exception of the servers that failed or missed the deadline
+        self.failed = {}
+        self._stop = asyncio.Event()
+        self._tasks = []
+
+    async def _hold(self, connection: AbstractAsyncContextManager, ready: asyncio.Future):
+        try:
+            async with connection as opened:
+                ready.set_result(opened)
+                await self._stop.wait()
+        except asyncio.CancelledError:
+            if not ready.done():
+                ready.cancel()
+            raise
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+
+    async def open(self) -> "ServerGroup":
+        """Connects to every server in parallel, and returns once all are connected, failed or late."""
+        loop = asyncio.get_running_loop()
+        ready = {name: loop.create_future() for name in self.connections}
+        tasks = {name: asyncio.create_task(self._hold(connection, ready[name])) for name, connection in self.connections.items()}
+        self._tasks = list(tasks.values())
+        if ready:
+            await asyncio.wait(ready.values(), timeout=self.deadline)
+        for name, future in ready.items():
+            if not future.done():
+                tasks[name].cancel()
+                self.failed[name] = TimeoutError(f"not connected within {self.deadline:g} seconds")
+            elif future.cancelled():
+                self.failed[name] = TimeoutError("connection cancelled")
+            elif future.exception() is not None:
+                self.failed[name] = future.exception()
+            else:
+                self.connected[name] = future.result()
+        return self
+
+    async def close(self):
+        self._stop.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def __aenter__(self) -> "ServerGroup":
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
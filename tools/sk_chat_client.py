@@ -14,6 +14,8 @@ from semantic_kernel.connectors.mcp import MCPStdioPlugin, MCPStreamableHttpPlug
 from dotenv import load_dotenv
 load_dotenv()
 
+from mcp_fanout import ServerGroup, duplicate_names
+
 #logging.basicConfig(level=logging.DEBUG)
 
 # --- 0) Parse command-line arguments and load configuration ---
@@ -24,8 +26,15 @@ cli_args = parser.parse_args()
 with open(cli_args.config, 'r') as config_file:
     config = json.load(config_file)
 
-mcp_plugin_config = config['mcp_plugin']
+# One server in 'mcp_plugin', or several in 'mcp_plugins': their tools are prefixed by the plugin name
+mcp_plugin_configs = config['mcp_plugins'] if 'mcp_plugins' in config else [config['mcp_plugin']]
+# A plugin with the name of another would replace it, and its tools would be lost
+duplicate_plugins = duplicate_names([mcp_plugin_config['name'] for mcp_plugin_config in mcp_plugin_configs])
+if duplicate_plugins:
+    raise ValueError(f"Several MCP plugins are named {', '.join(duplicate_plugins)} in {cli_args.config}: give each its own name.")
 chat_agent_config = config['chat_agent']
+# Seconds given to the servers to connect at startup: later ones are left out
+connect_timeout = config.get('connect_timeout', 30)
 
 
 # --- 1) Build a Kernel with OpenAI Chat Completion ---
@@ -39,39 +48,50 @@ kernel.add_service(
         )
 )
 
-async def main():
-    # --- 2) Create an MCP client plugin ---
+def create_plugin(mcp_plugin_config: dict):
+    """Creates the MCP client plugin described by one server of the configuration."""
     plugin_type = mcp_plugin_config.get('type', 'stdio')
 
     if plugin_type == 'stdio':
-        plugin = MCPStdioPlugin(
+        return MCPStdioPlugin(
             name=mcp_plugin_config['name'],
             command=mcp_plugin_config['command'],
             args=mcp_plugin_config['args']
         )
     elif plugin_type == 'http':
-        plugin = MCPStreamableHttpPlugin(
+        return MCPStreamableHttpPlugin(
             name=mcp_plugin_config['name'],
             url=mcp_plugin_config['url']
         )
     else:
         raise ValueError(f"Unsupported plugin type: {plugin_type}")
 
-    async with plugin as mcp_plugin:
-        if plugin_type == 'http':
-            await mcp_plugin.connect()
+
+async def main():
+    # --- 2) Create the MCP client plugins, and connect them in parallel ---
+    # Startup takes as long as the slowest server, up to connect_timeout
+    plugins = {mcp_plugin_config['name']: create_plugin(mcp_plugin_config) for mcp_plugin_config in mcp_plugin_configs}
+
+    async with ServerGroup(plugins, deadline=connect_timeout) as mcp_servers:
+        for name, error in mcp_servers.failed.items():
+            print(f"Failed to connect to MCP server {name}: {error}")
+        if not mcp_servers.connected:
+            print("No MCP server connected.")
+            return
 
         # NOTE: In Python SK, MCP plugins are consumed directly by agents or kernels.
         # You usually don't need to manually ‘convert’ tools; the plugin exposes tools to the agent.
+        # Each plugin loads its tools once when it connects, and reloads them when the server
+        # sends a tools/list_changed notification.
 
-        # --- 3+4) Add the MCP plugin to an Agent (tools become callable) ---
+        # --- 3+4) Add the MCP plugins to an Agent (tools become callable, prefixed by the plugin name) ---
         agent = ChatCompletionAgent(
             name=chat_agent_config['name'],
             instructions=chat_agent_config['instructions'],
             # The agent uses the chat completion service from the kernel by default
             kernel=kernel,
             service=None,  # or set a specific service; leaving None uses what's in the kernel
-            plugins=[mcp_plugin],
+            plugins=list(mcp_servers.connected.values()),
         )
 
         # --- 5) Invoke with automatic function calling enabled ---
@@ -81,19 +101,23 @@ async def main():
 
         print(f"Enter your question to the {chat_agent_config['name']} (type 'quit' or 'exit' to stop):")
         while True:
-            question = input("> ").strip()
+            # Read in a worker thread, so the event loop keeps serving the MCP connection meanwhile
+            question = (await asyncio.to_thread(input, "> ")).strip()
             if question.lower() in ("quit", "exit"):
-                if plugin_type == 'http':
-                    await mcp_plugin.close()
+                # Leaving the server group closes every plugin
                 print("Exiting.")
                 break
 
             args = KernelArguments(settings=exec_settings)
-            response_stream = agent.invoke(question, arguments=args)
-            response = None
-            async for msg in response_stream:
-                response = msg  # keep last
-            print(f"\nResponse from the {chat_agent_config['name']}:\n", response.content if response else "(no content)")
+            # Stream the answer: tokens are printed as they arrive, not once the whole answer is complete
+            print(f"\nResponse from the {chat_agent_config['name']}:")
+            has_content = False
+            async for chunk in agent.invoke_stream(question, arguments=args):
+                text = str(chunk.content or "")
+                if text:
+                    print(text, end="", flush=True)
+                    has_content = True
+            print("" if has_content else "(no content)")
             print("\nAsk another question or type 'quit' to exit.")
 
 if __name__ == "__main__":